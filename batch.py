@@ -0,0 +1,375 @@
+"""Headless batch comparison of 3D file pairs
+
+Runs file_comparison.compare_files, the pipeline behind the GUI, over many
+file pairs on a process pool and writes the statistics as JSON and/or CSV,
+e.g. for nightly regression checks of CAD revisions:
+
+    python batch.py old/A.step new/A.step old/B.step new/B.step -o results.json
+    python batch.py --manifest pairs.csv --csv results.csv --workers 8
+    python batch.py --reference golden.step rev_*.step --csv ranking.csv
+    python batch.py --hausdorff 0.05 old/A.step new/A.step
+
+A manifest is either a CSV file with file_a, file_b and optional name
+columns, or a JSON list of {"file_a": ..., "file_b": ..., "name": ...}
+objects. Relative paths are resolved against the manifest's directory.
+With --reference every file is compared against the one reference, whose
+surface index is built once, and the records are ranked best first. With
+--hausdorff each pair only gets a quick pass/fail check of its largest
+deviation; failing pairs make the exit code 1 like errors do.
+"""
+import argparse
+import concurrent.futures
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+from pathlib import Path
+
+import cleanup
+import file_comparison
+import profiling
+import tessellation
+
+# Leading CSV columns; the flattened statistics follow in sorted order
+CSV_COLUMNS = ['name', 'file_a', 'file_b', 'status', 'error', 'seconds']
+
+# Options of compare_files that the out-of-core comparison understands
+OUT_OF_CORE_OPTIONS = ('align', 'init', 'threshold', 'tolerance', 'angular_tolerance')
+
+# Options of compare_files that compare_to_reference understands
+REFERENCE_OPTIONS = ('align', 'init', 'threshold', 'tolerance', 'angular_tolerance',
+                     'rank_by', 'cleanup')
+
+# Command line flags (by dest) that --reference and --out-of-core cannot honour.
+# A manifest lists pairs, whose file_a --reference would replace.
+REFERENCE_UNSUPPORTED = ('hausdorff', 'brep_diff', 'lod', 'max_regions', 'source',
+                         'samples', 'out_of_core', 'manifest')
+OUT_OF_CORE_UNSUPPORTED = ('hausdorff', 'brep_diff', 'lod', 'max_regions', 'source',
+                           'samples', 'cleanup')
+
+
+def read_manifest(manifest_path):
+    """Read file pairs from a CSV or JSON manifest"""
+    manifest_path = Path(manifest_path)
+    if manifest_path.suffix.lower() == '.json':
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            rows = json.load(f)
+    else:
+        with open(manifest_path, 'r', encoding='utf-8', newline='') as f:
+            rows = list(csv.DictReader(f))
+
+    pairs = []
+    for row in rows:
+        if not row.get('file_a') or not row.get('file_b'):
+            raise ValueError(f"Manifest row needs file_a and file_b: {row}")
+        file_a = manifest_path.parent / row['file_a']
+        file_b = manifest_path.parent / row['file_b']
+        pairs.append({
+            "name": row.get('name') or f"{file_a.stem}-{file_b.stem}",
+            "file_a": str(file_a),
+            "file_b": str(file_b)
+        })
+    return pairs
+
+
+def pairs_from_paths(paths):
+    """Group a flat list of paths into consecutive (A, B) pairs"""
+    if len(paths) % 2:
+        raise ValueError("Files must be given in A B pairs")
+    return [{
+        "name": f"{Path(file_a).stem}-{Path(file_b).stem}",
+        "file_a": str(file_a),
+        "file_b": str(file_b)
+    } for file_a, file_b in zip(paths[0::2], paths[1::2])]
+
+
+def compare_pair(pair, options):
+    """Compare one pair and wrap the statistics in a report record
+
+    With an "out_of_core" directory in options the pair is compared by
+    outofcore.compare_files_out_of_core, writing its per-vertex results to
+    a subdirectory named after the pair.
+    """
+    start = time.perf_counter()
+    options = dict(options)
+    out_of_core = options.pop('out_of_core', None)
+    if out_of_core:
+        import outofcore
+
+        result = outofcore.compare_files_out_of_core(
+            pair['file_a'], pair['file_b'], Path(out_of_core) / pair['name'],
+            **{key: options[key] for key in OUT_OF_CORE_OPTIONS if key in options})
+    else:
+        result = file_comparison.compare_files(pair['file_a'], pair['file_b'],
+                                               **options)
+    if "error" in result:
+        status = 'error'
+    elif "hausdorff" in result and not result["hausdorff"]["passed"]:
+        status = 'fail'
+    else:
+        status = 'ok'
+    record = {
+        "name": pair['name'],
+        "file_a": pair['file_a'],
+        "file_b": pair['file_b'],
+        "status": status,
+        "seconds": time.perf_counter() - start
+    }
+    record.update(result)
+    return record
+
+
+def run_reference(reference, candidates, workers=None, options=None):
+    """Compare candidate files against one reference, sharing its index
+
+    Runs file_comparison.compare_to_reference and turns its ranked candidates
+    into report records like compare_pair's, in ranking order.
+    """
+    options = {key: value for key, value in (options or {}).items()
+               if key in REFERENCE_OPTIONS}
+    start = time.perf_counter()
+    result = file_comparison.compare_to_reference(
+        reference, [pair['file_b'] for pair in candidates], workers=workers, **options)
+    if "error" in result:
+        return [dict(pair, status='error', error=result["error"])
+                for pair in candidates]
+
+    seconds = time.perf_counter() - start
+    records = []
+    for candidate in result["candidates"]:
+        record = {
+            "name": candidate.pop("name"),
+            "file_a": str(reference),
+            "file_b": candidate.pop("file"),
+            "status": 'error' if "error" in candidate else 'ok',
+            # The candidates run concurrently, so only the total time is known
+            "seconds": seconds
+        }
+        record.update(candidate)
+        records.append(record)
+    return records
+
+
+def _init_worker(tessellation_workers):
+    # Share the CPUs between the batch workers instead of every worker
+    # starting a full-size tessellation pool of its own
+    tessellation.TESSELLATION_WORKERS = tessellation_workers
+
+
+def run_batch(pairs, workers=None, options=None, progress=None):
+    """Compare file pairs on a process pool
+
+    options are passed to file_comparison.compare_files. progress(done, total,
+    record) is called as each pair finishes. Returns one record per pair,
+    in input order.
+    """
+    options = options or {}
+    cpu_count = os.cpu_count() or 1
+    workers = min(len(pairs), workers or cpu_count)
+    records = [None] * len(pairs)
+
+    if workers <= 1:
+        for index, pair in enumerate(pairs):
+            records[index] = compare_pair(pair, options)
+            if progress:
+                progress(index + 1, len(pairs), records[index])
+        return records
+
+    # Spawn for the same reason as tessellation._get_pool
+    with concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(max(1, cpu_count // workers),)) as pool:
+        futures = {pool.submit(compare_pair, pair, options): index
+                   for index, pair in enumerate(pairs)}
+        for done, future in enumerate(
+                concurrent.futures.as_completed(futures), start=1):
+            index = futures[future]
+            try:
+                records[index] = future.result()
+            except Exception as e:
+                # A crashed worker (e.g. a segfault in OCCT) only fails its pair
+                records[index] = dict(pairs[index], status='error',
+                                      error=f"Worker error: {str(e)}")
+            if progress:
+                progress(done, len(pairs), records[index])
+    return records
+
+
+def flatten_record(record, prefix=''):
+    """Flatten nested statistics into CSV columns such as distance_max"""
+    flat = {}
+    for key, value in record.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten_record(value, f"{name}_"))
+        elif isinstance(value, (list, tuple)):
+            flat[name] = json.dumps(value)
+        else:
+            flat[name] = value
+    return flat
+
+
+def write_json(records, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(records, f, indent=2)
+
+
+def write_csv(records, path):
+    rows = [flatten_record(record) for record in records]
+    extra = sorted({key for row in rows for key in row} - set(CSV_COLUMNS))
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_COLUMNS + extra)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def _print_progress(done, total, record):
+    status = record['status'] if 'error' not in record else \
+        f"{record['status']}: {record['error'].splitlines()[0]}"
+    print(f"[{done}/{total}] {record['name']}: {status} "
+          f"({record.get('seconds', 0.0):.1f} s)", file=sys.stderr)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Compare pairs of 3D files (STL/OBJ/STEP/IGES) without the GUI")
+    parser.add_argument('files', nargs='*',
+                        help="files to compare, as consecutive A B pairs "
+                             "(or all candidates with --reference)")
+    parser.add_argument('-r', '--reference',
+                        help="compare every file against this reference, "
+                             "ranked by --rank-by")
+    parser.add_argument('--rank-by', default='rms',
+                        choices=file_comparison.RANK_KEYS,
+                        help="distance statistic ranking the candidates of --reference")
+    parser.add_argument('-m', '--manifest',
+                        help="CSV or JSON manifest listing file_a/file_b pairs")
+    parser.add_argument('-o', '--json', dest='json_path',
+                        help="write the records as JSON to this path")
+    parser.add_argument('--csv', dest='csv_path',
+                        help="write the records as CSV to this path")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="parallel worker processes (default: CPU count)")
+    parser.add_argument('--no-align', action='store_true',
+                        help="compare the files in their original poses")
+    parser.add_argument('--init', default='pca', choices=['pca', 'fpfh', 'none'],
+                        help="global initialization before ICP")
+    parser.add_argument('--source', default='vertices',
+                        choices=['vertices', 'samples'],
+                        help="measure distances from A's vertices or surface samples")
+    parser.add_argument('--samples', type=int, default=100000,
+                        help="surface samples on A when --source samples")
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help="vertex matching distance threshold")
+    parser.add_argument('--max-regions', type=int, default=10,
+                        help="list this many of the largest regions deviating "
+                             "by more than --threshold (0 = none)")
+    parser.add_argument('--brep-diff', action='store_true',
+                        help="compare STEP/IGES pairs face by face and measure "
+                             "only the changed faces")
+    parser.add_argument('--hausdorff', type=float, metavar='TOL',
+                        help="only check whether the Hausdorff distance is within "
+                             "TOL, stopping as soon as it is decided; pairs "
+                             "beyond TOL get the status 'fail'")
+    parser.add_argument('--tolerance', type=float,
+                        default=tessellation.DEFAULT_TOLERANCE,
+                        help="STEP/IGES linear tessellation tolerance")
+    parser.add_argument('--angular-tolerance', type=float,
+                        default=tessellation.DEFAULT_ANGULAR_TOLERANCE,
+                        help="STEP/IGES angular tessellation tolerance")
+    parser.add_argument('--cleanup', default=cleanup.DEFAULT_CLEANUP,
+                        choices=sorted(cleanup.CLEANUP_PROFILES),
+                        help="mesh cleanup profile applied after loading")
+    parser.add_argument('--lod', type=int, default=0,
+                        help="measure on this level of detail (0 = full mesh) "
+                             "for a quick preview")
+    parser.add_argument('--out-of-core', metavar='DIR',
+                        help="compare meshes larger than memory in tiles, "
+                             "writing per-vertex results to DIR/<name>")
+    parser.add_argument('--profile', action='store_true',
+                        help="add per-stage timings and memory to each record")
+    parser.add_argument('--profile-log',
+                        help="also append the stage profiles to this JSON-lines file")
+    args = parser.parse_args(argv)
+    if args.reference:
+        if not args.files:
+            parser.error("give the candidate files to compare with --reference")
+    elif not args.files and not args.manifest:
+        parser.error("give file pairs or --manifest")
+
+    # Rather than run a different comparison than asked for, e.g. a full one
+    # that reports 'ok' instead of a --hausdorff verdict
+    for mode, unsupported in (('reference', REFERENCE_UNSUPPORTED),
+                              ('out_of_core', OUT_OF_CORE_UNSUPPORTED)):
+        if getattr(args, mode) is None:
+            continue
+        given = [dest for dest in unsupported
+                 if getattr(args, dest) != parser.get_default(dest)]
+        if given:
+            flags = ', '.join('--' + dest.replace('_', '-') for dest in given)
+            parser.error(f"--{mode.replace('_', '-')} cannot be combined with {flags}")
+    if args.reference is None and args.rank_by != parser.get_default('rank_by'):
+        parser.error("--rank-by only ranks the candidates of --reference")
+    return args
+
+
+def main(argv=None):
+    """Command line entry point; returns 1 if any comparison failed"""
+    args = parse_args(argv)
+    try:
+        if args.reference:
+            pairs = [{"name": Path(path).stem, "file_a": args.reference, "file_b": path}
+                     for path in args.files]
+        else:
+            pairs = pairs_from_paths(args.files)
+            if args.manifest:
+                pairs += read_manifest(args.manifest)
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+
+    if args.profile or args.profile_log:
+        # Spawned workers pick the settings up when they import profiling
+        os.environ['COMPARISON_PROFILE'] = '1'
+        if args.profile_log:
+            args.profile_log = str(Path(args.profile_log).resolve())
+            os.environ['COMPARISON_PROFILE_LOG'] = args.profile_log
+        profiling.set_enabled(True, args.profile_log)
+
+    options = {
+        "align": not args.no_align,
+        "init": args.init,
+        "source": args.source,
+        "num_samples": args.samples,
+        "threshold": args.threshold,
+        "tolerance": args.tolerance,
+        "angular_tolerance": args.angular_tolerance,
+        "lod": args.lod,
+        "max_regions": args.max_regions,
+        "brep_diff": args.brep_diff,
+        "hausdorff": args.hausdorff,
+        "cleanup": args.cleanup,
+        "out_of_core": args.out_of_core
+    }
+    if args.reference:
+        options["rank_by"] = args.rank_by
+        records = run_reference(args.reference, pairs, args.workers, options)
+    else:
+        records = run_batch(pairs, args.workers, options, progress=_print_progress)
+
+    if args.json_path:
+        write_json(records, args.json_path)
+    if args.csv_path:
+        write_csv(records, args.csv_path)
+    if not args.json_path and not args.csv_path:
+        json.dump(records, sys.stdout, indent=2)
+        print()
+
+    return 1 if any(record['status'] != 'ok' for record in records) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,366 @@
+"""Benchmarks of the loading and comparison stages across mesh sizes
+
+Times each stage of the pipeline (file reading, JSON serialization, STEP
+tessellation, alignment, distances and vertex matching) on synthetic
+height-field meshes from 1k to 5M triangles and on the files in exsample/,
+recording wall time and the peak memory allocated by the stage. Results are
+saved as JSON together with the git commit, so runs of different commits
+can be compared:
+
+    python benchmark.py --sizes 1000 100000
+    python benchmark.py --compare benchmark_results/bench-<old commit>.json
+
+Peak memory is measured with tracemalloc in a separate, untimed run of each
+stage. It covers Python and NumPy allocations but not memory allocated
+inside Open3D or OCCT.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+import comparison
+import readers
+from mesh_utils import face_normals
+from registration import apply_transform
+
+REPO_DIR = Path(__file__).parent
+
+# Stages in the order they are run for each case
+STAGES = ('read_stl_manual', 'read_stl_to_json', 'read_obj_to_json',
+          'json_serialization', 'step_tessellation', 'align_meshes',
+          'calculate_mesh_distance', 'find_matching_vertices')
+
+# Synthetic mesh sizes (triangle counts)
+DEFAULT_SIZES = (1000, 10000, 100000, 1000000, 5000000)
+
+# Ratio above which --compare reports a stage as a regression
+DEFAULT_REGRESSION_RATIO = 1.25
+
+
+def grid_mesh(triangles):
+    """Wavy height-field grid with about the requested number of triangles"""
+    side = max(2, int(round(np.sqrt(triangles / 2))) + 1)
+    u = np.linspace(0.0, 100.0, side)
+    x, y = np.meshgrid(u, u)
+    z = 5.0 * np.sin(x / 7.0) * np.cos(y / 11.0)
+    vertices = np.column_stack([x.ravel(), y.ravel(), z.ravel()])
+
+    index = np.arange(side * side).reshape(side, side)
+    a, b = index[:-1, :-1].ravel(), index[:-1, 1:].ravel()
+    c, d = index[1:, 1:].ravel(), index[1:, :-1].ravel()
+    triangles = np.concatenate([np.column_stack([a, b, c]),
+                                np.column_stack([a, c, d])])
+    return vertices, triangles.astype(np.uint32)
+
+
+def revised_mesh(vertices, triangles):
+    """A 'revision' of a grid: a local bump, slightly rotated and moved"""
+    vertices = vertices.copy()
+    bump = np.exp(-np.sum((vertices[:, :2] - 60.0) ** 2, axis=1) / 50.0)
+    vertices[:, 2] += 0.5 * bump
+
+    angle = np.radians(2.0)
+    transformation = np.eye(4)
+    transformation[:3, :3] = [[np.cos(angle), -np.sin(angle), 0],
+                              [np.sin(angle), np.cos(angle), 0],
+                              [0, 0, 1]]
+    transformation[:3, 3] = [1.0, -0.5, 0.2]
+    return apply_transform(vertices, transformation), triangles
+
+
+def write_stl(path, vertices, triangles):
+    records = np.zeros(len(triangles), dtype=readers.STL_TRIANGLE_DTYPE)
+    records['normal'] = face_normals(vertices, triangles)
+    records['vertices'] = vertices[triangles]
+    with open(path, 'wb') as f:
+        f.write(b'benchmark'.ljust(80, b'\x00'))
+        f.write(len(triangles).to_bytes(4, 'little'))
+        f.write(records.tobytes())
+
+
+def write_obj(path, vertices, triangles):
+    with open(path, 'w') as f:
+        np.savetxt(f, vertices, fmt='v %.6f %.6f %.6f')
+        np.savetxt(f, triangles + 1, fmt='f %d %d %d')
+
+
+def measure(func, setup=None, repeat=1, memory=True):
+    """Best wall time of func(*setup()) over repeat runs, plus peak memory
+
+    Returns a dict with seconds, peak_bytes (None without memory) and
+    error (the "error" of a result dict, or the exception raised).
+    """
+    record = {"seconds": None, "peak_bytes": None, "error": None}
+    try:
+        times = []
+        for _ in range(repeat):
+            args = setup() if setup else ()
+            start = time.perf_counter()
+            result = func(*args)
+            times.append(time.perf_counter() - start)
+            if isinstance(result, dict) and "error" in result:
+                record["error"] = str(result["error"]).splitlines()[0]
+                return record
+        record["seconds"] = min(times)
+
+        if memory:
+            args = setup() if setup else ()
+            tracemalloc.start()
+            try:
+                baseline = tracemalloc.get_traced_memory()[0]
+                func(*args)
+                record["peak_bytes"] = tracemalloc.get_traced_memory()[1] - baseline
+            finally:
+                tracemalloc.stop()
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    return record
+
+
+def _load(file_path):
+    """load_mesh_file, with exceptions (e.g. a missing CadQuery) as errors"""
+    try:
+        return readers.load_mesh_file(file_path)
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}"}
+
+
+def _store_pair(mesh_a, mesh_b):
+    """Store fresh copies of both meshes, so no stage sees cached indices"""
+    comparison.store_mesh('bench_A', mesh_a)
+    comparison.store_mesh('bench_B', mesh_b)
+    return ('bench_A', 'bench_B')
+
+
+def benchmark_case(name, file_a, file_b=None, stages=STAGES, repeat=1,
+                   memory=True, extra_files=None):
+    """Run the stages that apply to one file (or file pair)
+
+    extra_files maps a reading stage to an alternative input, e.g. an OBJ
+    export of file_a for read_obj_to_json.
+    """
+    file_a = Path(file_a)
+    extra_files = extra_files or {}
+    suffix = file_a.suffix.lower()
+    results = []
+
+    def run(stage, func, setup=None):
+        record = measure(func, setup, repeat, memory)
+        record.update({"case": name, "stage": stage})
+        results.append(record)
+        status = (f"error: {record['error']}" if record['error']
+                  else format_seconds(record['seconds']))
+        print(f"  {name:<24} {stage:<24} {status}", file=sys.stderr)
+        return record
+
+    stl_path = extra_files.get('read_stl_manual', file_a if suffix == '.stl' else None)
+    obj_path = extra_files.get('read_obj_to_json', file_a if suffix == '.obj' else None)
+
+    if stl_path and 'read_stl_manual' in stages:
+        run('read_stl_manual', lambda: readers.read_stl_manual(str(stl_path)))
+    if stl_path and 'read_stl_to_json' in stages:
+        run('read_stl_to_json', lambda: readers.read_stl_to_json(str(stl_path)))
+    if obj_path and 'read_obj_to_json' in stages:
+        run('read_obj_to_json', lambda: readers.read_obj_to_json(str(obj_path)))
+    if suffix in readers.BREP_FORMATS and 'step_tessellation' in stages:
+        run('step_tessellation', lambda: readers.load_mesh_file(file_a))
+
+    if 'json_serialization' in stages:
+        mesh_data = _load(file_a)
+        if "error" not in mesh_data:
+            payload = {key: comparison._as_list(np.asarray(mesh_data[key]))
+                       for key in ('vertices', 'normals', 'indices')}
+            run('json_serialization', lambda: json.dumps(payload))
+
+    pair_stages = [s for s in ('align_meshes', 'calculate_mesh_distance',
+                               'find_matching_vertices') if s in stages]
+    if file_b is None or not pair_stages:
+        return results
+
+    mesh_a = _load(file_a)
+    mesh_b = _load(file_b)
+    if "error" in mesh_a or "error" in mesh_b:
+        return results
+
+    def setup():
+        return _store_pair(mesh_a, mesh_b)
+
+    if 'align_meshes' in stages:
+        run('align_meshes',
+            lambda a, b: comparison.align_meshes(a, b, transport='binary'), setup)
+    if 'calculate_mesh_distance' in stages:
+        run('calculate_mesh_distance', comparison.calculate_mesh_distance, setup)
+    if 'find_matching_vertices' in stages:
+        run('find_matching_vertices',
+            lambda a, b: comparison.find_matching_vertices(a, b, 0.1, 'binary'),
+            setup)
+
+    comparison.release_mesh('bench_A')
+    comparison.release_mesh('bench_B')
+    return results
+
+
+def benchmark_synthetic(size, work_dir, stages=STAGES, repeat=1, memory=True):
+    """Benchmark a synthetic mesh pair of about size triangles"""
+    vertices, triangles = grid_mesh(size)
+    name = f"grid-{len(triangles)}"
+    file_a = Path(work_dir) / f"{name}-a.stl"
+    file_b = Path(work_dir) / f"{name}-b.stl"
+    write_stl(file_a, vertices, triangles)
+    write_stl(file_b, *revised_mesh(vertices, triangles))
+
+    extra_files = {}
+    if 'read_obj_to_json' in stages:
+        obj_path = Path(work_dir) / f"{name}-a.obj"
+        write_obj(obj_path, vertices, triangles)
+        extra_files['read_obj_to_json'] = obj_path
+
+    results = benchmark_case(name, file_a, file_b, stages, repeat, memory,
+                             extra_files)
+    for record in results:
+        record["triangles"] = int(len(triangles))
+    for path in [file_a, file_b] + list(extra_files.values()):
+        path.unlink()
+    return results
+
+
+def exsample_cases(exsample_dir=REPO_DIR / 'exsample'):
+    """(name, file_a, file_b) for the example files, pairing revisions"""
+    pairs = [('box1.stl', 'box2.stl'), ('PA.step', 'PB.step'),
+             ('example1.step', 'example2.step')]
+    cases = []
+    for name_a, name_b in pairs:
+        file_a = Path(exsample_dir) / name_a
+        file_b = Path(exsample_dir) / name_b
+        if file_a.exists():
+            cases.append((name_a, file_a, file_b if file_b.exists() else None))
+    return cases
+
+
+def environment_info():
+    """Commit and machine details stored with the results"""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+            capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S'),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count()
+    }
+
+
+def max_rss_kb():
+    """Peak resident set size of this process in KiB, or None if unknown"""
+    try:
+        # Unix only
+        import resource
+    except ImportError:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def format_seconds(seconds):
+    if seconds is None:
+        return '-'
+    if seconds < 1:
+        return f"{seconds * 1000:.1f} ms"
+    return f"{seconds:.2f} s"
+
+
+def compare_results(current, baseline, ratio=DEFAULT_REGRESSION_RATIO):
+    """Rows of (case, stage, baseline s, current s, ratio, regressed)"""
+    previous = {(r["case"], r["stage"]): r["seconds"] for r in baseline["results"]}
+    rows = []
+    for record in current["results"]:
+        before = previous.get((record["case"], record["stage"]))
+        after = record["seconds"]
+        if not before or after is None:
+            continue
+        rows.append((record["case"], record["stage"], before, after,
+                     after / before, after / before > ratio))
+    return rows
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark the loading and comparison stages")
+    parser.add_argument('--sizes', type=int, nargs='*', default=list(DEFAULT_SIZES),
+                        help="synthetic mesh sizes in triangles")
+    parser.add_argument('--stages', nargs='*', default=list(STAGES),
+                        choices=STAGES, help="stages to run")
+    parser.add_argument('--no-exsample', action='store_true',
+                        help="skip the files in exsample/")
+    parser.add_argument('--repeat', type=int, default=1,
+                        help="timed runs per stage (the best is kept)")
+    parser.add_argument('--no-memory', action='store_true',
+                        help="skip the tracemalloc peak memory runs")
+    parser.add_argument('-o', '--output',
+                        help="results path "
+                             "(default: benchmark_results/bench-<commit>.json)")
+    parser.add_argument('--compare', help="earlier results file to compare against")
+    parser.add_argument('--regression-ratio', type=float,
+                        default=DEFAULT_REGRESSION_RATIO,
+                        help="slowdown ratio reported as a regression")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Command line entry point; returns 1 if --compare found a regression"""
+    args = parse_args(argv)
+    report = {"environment": environment_info(), "results": []}
+    memory = not args.no_memory
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        for size in args.sizes:
+            print(f"synthetic mesh, {size} triangles", file=sys.stderr)
+            report["results"] += benchmark_synthetic(
+                size, work_dir, args.stages, args.repeat, memory)
+
+    if not args.no_exsample:
+        for name, file_a, file_b in exsample_cases():
+            print(f"exsample {name}", file=sys.stderr)
+            report["results"] += benchmark_case(
+                name, file_a, file_b, args.stages, args.repeat, memory)
+
+    report["environment"]["max_rss_kb"] = max_rss_kb()
+
+    output = Path(args.output) if args.output else (
+        REPO_DIR / 'benchmark_results' /
+        f"bench-{report['environment']['commit'] or 'unknown'}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"results written to {output}", file=sys.stderr)
+
+    if not args.compare:
+        return 0
+
+    with open(args.compare, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressed = False
+    for case, stage, before, after, ratio, slower in compare_results(
+            report, baseline, args.regression_ratio):
+        regressed |= slower
+        flag = '  REGRESSION' if slower else ''
+        print(f"{case:<24} {stage:<24} {format_seconds(before):>10} -> "
+              f"{format_seconds(after):>10}  x{ratio:.2f}{flag}")
+    return 1 if regressed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,157 @@
+"""Topology-level diff of B-rep models through per-face signatures
+
+Every face of a STEP/IGES shape gets a compact geometric signature: its
+surface type, area, centroid, bounding box and principal moments of
+inertia. Signatures are quantized and hashed, and faces of A and B with the
+same hash are taken as unchanged. Only the triangles of the remaining,
+changed faces need the expensive mesh distance computation; the face of
+every triangle is recorded when the shape is tessellated (see
+tessellation.face_triangle_counts).
+
+Signatures are computed in the coordinates of the source file, so moving a
+part in CAD changes the signatures of all of its faces.
+"""
+import hashlib
+
+import numpy as np
+
+# Per-mesh arrays of B-rep face data: the face of each triangle and the
+# signature of each face. They are cached with the mesh (see mesh_cache).
+FACE_ARRAYS = ('face_ids', 'face_signatures')
+
+# Surface type codes, as named by CadQuery's Face.geomType()
+SURFACE_TYPES = ('PLANE', 'CYLINDER', 'CONE', 'SPHERE', 'TORUS', 'BEZIER',
+                 'BSPLINE', 'REVOLUTION', 'EXTRUSION', 'OFFSET', 'OTHER')
+
+# Signature columns: type code, area, centroid, bounding box min / max and
+# the principal moments of inertia in ascending order
+SIGNATURE_SIZE = 14
+TYPE_COLUMN = 0
+AREA_COLUMN = 1
+LENGTH_COLUMNS = slice(2, 11)
+MOMENT_COLUMNS = slice(11, 14)
+
+# Lengths are compared on a grid of this size (model units); area and
+# moments, which scale with the square and fourth power of the size, to
+# this many significant digits
+SIGNATURE_PRECISION = 1e-3
+SIGNIFICANT_DIGITS = 6
+
+
+def face_signature(face):
+    """Signature row (see SIGNATURE_SIZE) of a CadQuery Face"""
+    from OCP.BRepGProp import BRepGProp
+    from OCP.GProp import GProp_GProps
+
+    props = GProp_GProps()
+    BRepGProp.SurfaceProperties_s(face.wrapped, props)
+    centre = props.CentreOfMass()
+    # The matrix of inertia is taken about the centre of mass
+    matrix = props.MatrixOfInertia()
+    inertia = np.array([[matrix.Value(row, col) for col in (1, 2, 3)]
+                        for row in (1, 2, 3)])
+
+    box = face.BoundingBox()
+    geom_type = face.geomType()
+    code = SURFACE_TYPES.index(geom_type if geom_type in SURFACE_TYPES else 'OTHER')
+    return np.concatenate([
+        [code, props.Mass(), centre.X(), centre.Y(), centre.Z()],
+        [box.xmin, box.ymin, box.zmin, box.xmax, box.ymax, box.zmax],
+        np.linalg.eigvalsh(inertia)
+    ])
+
+
+def face_signatures(shape):
+    """(faces, SIGNATURE_SIZE) float64 signatures in shape.Faces() order"""
+    faces = shape.Faces()
+    signatures = np.zeros((len(faces), SIGNATURE_SIZE))
+    for i, face in enumerate(faces):
+        signatures[i] = face_signature(face)
+    return signatures
+
+
+def _round_significant(values, digits):
+    """Round values to a number of significant digits"""
+    magnitude = np.zeros_like(values)
+    nonzero = values != 0
+    magnitude[nonzero] = np.floor(np.log10(np.abs(values[nonzero])))
+    scale = 10.0 ** (digits - 1 - magnitude)
+    return np.round(values * scale) / scale
+
+
+def quantize_signatures(signatures, precision=SIGNATURE_PRECISION,
+                        digits=SIGNIFICANT_DIGITS):
+    """Signatures rounded so that equal faces give bitwise equal rows"""
+    signatures = np.asarray(signatures, dtype=np.float64).reshape(-1, SIGNATURE_SIZE)
+    quantized = np.empty_like(signatures)
+    quantized[:, TYPE_COLUMN] = signatures[:, TYPE_COLUMN]
+    quantized[:, LENGTH_COLUMNS] = np.round(signatures[:, LENGTH_COLUMNS] / precision)
+    quantized[:, AREA_COLUMN] = _round_significant(signatures[:, AREA_COLUMN], digits)
+    quantized[:, MOMENT_COLUMNS] = _round_significant(
+        signatures[:, MOMENT_COLUMNS], digits)
+    # -0.0 and 0.0 must hash the same
+    quantized += 0.0
+    return quantized
+
+
+def signature_hashes(signatures, precision=SIGNATURE_PRECISION,
+                     digits=SIGNIFICANT_DIGITS):
+    """64-bit hash of every quantized face signature"""
+    quantized = quantize_signatures(signatures, precision, digits)
+    hashes = np.empty(len(quantized), dtype=np.uint64)
+    for i, row in enumerate(quantized):
+        digest = hashlib.blake2b(row.tobytes(), digest_size=8).digest()
+        hashes[i] = np.frombuffer(digest, dtype='<u8')[0]
+    return hashes
+
+
+def _occurrence(hashes):
+    """How many earlier entries share each entry's hash (0 for the first)"""
+    order = np.argsort(hashes, kind='stable')
+    sorted_hashes = hashes[order]
+    starts = np.flatnonzero(np.r_[True, sorted_hashes[1:] != sorted_hashes[:-1]])
+    group_start = np.repeat(starts, np.diff(np.r_[starts, len(hashes)]))
+    occurrence = np.empty(len(hashes), dtype=np.int64)
+    occurrence[order] = np.arange(len(hashes)) - group_start
+    return occurrence
+
+
+def _matched(hashes, other):
+    """Entries of hashes that find a partner among the other hashes"""
+    values, counts = np.unique(other, return_counts=True)
+    if not len(values):
+        return np.zeros(len(hashes), dtype=bool)
+    position = np.minimum(np.searchsorted(values, hashes), len(values) - 1)
+    available = np.where(values[position] == hashes, counts[position], 0)
+    return _occurrence(hashes) < available
+
+
+def match_faces(hashes_a, hashes_b):
+    """Pair faces of A and B with equal signature hashes
+
+    Repeated hashes (e.g. the faces of a pattern) are paired one to one, so
+    a face added to a pattern still shows up as changed. Returns boolean
+    (matched_a, matched_b) masks over the faces.
+    """
+    hashes_a = np.asarray(hashes_a, dtype=np.uint64)
+    hashes_b = np.asarray(hashes_b, dtype=np.uint64)
+    return _matched(hashes_a, hashes_b), _matched(hashes_b, hashes_a)
+
+
+def face_vertices(triangles, face_ids, faces):
+    """Indices of the vertices of the triangles on the selected faces
+
+    faces is a boolean mask over the faces. Vertices on the edge between a
+    selected and an unselected face are included.
+    """
+    triangles = np.asarray(triangles).reshape(-1, 3)
+    selected = np.asarray(faces, dtype=bool)[np.asarray(face_ids)]
+    return np.unique(triangles[selected])
+
+
+def face_maxima(face_ids, triangles, vertex_values, face_count):
+    """Largest vertex value on each face (-inf for faces without values)"""
+    corner_values = np.asarray(vertex_values)[np.asarray(triangles).reshape(-1, 3)]
+    maxima = np.full(face_count, -np.inf)
+    np.maximum.at(maxima, np.asarray(face_ids), corner_values.max(axis=1))
+    return maxima
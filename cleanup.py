@@ -0,0 +1,245 @@
+"""Configurable, vectorized cleanup of loaded triangle meshes
+
+A cleanup profile selects the stages run over a freshly loaded mesh:
+
+    none  keep the mesh as read (STL corners are only welded exactly)
+    fast  weld vertices within a tolerance, drop degenerate and duplicate
+          triangles and unreferenced vertices; enough for unsigned distances
+    full  fast, plus a consistent outward orientation of the triangles,
+          which signed deviations rely on (the default)
+
+Every stage is a handful of NumPy / SciPy passes over the arrays (grid
+hashing instead of pairwise searches, graph components instead of a walk
+over the triangles), and reports its time and the number of elements it
+removed.
+"""
+import time
+
+import numpy as np
+
+import profiling
+
+CLEANUP_PROFILES = {
+    'none': (),
+    'fast': ('weld', 'degenerate_triangles', 'duplicate_triangles',
+             'unreferenced_vertices'),
+    'full': ('weld', 'degenerate_triangles', 'duplicate_triangles',
+             'unreferenced_vertices', 'orient')
+}
+
+# Oriented by default: the sign of every deviation comes from the face
+# normals of the mesh measured against, and scans are often wound inconsistently
+DEFAULT_CLEANUP = 'full'
+
+# Vertices closer than this fraction of the bounding box diagonal are welded
+WELD_TOLERANCE = 1e-6
+
+# Bits per axis when three grid cell coordinates are packed into one int64
+_PACK_BITS = 21
+
+
+def group_cells(cells):
+    """Group equal integer grid cells
+
+    Returns (first, labels): the index of the first point of every group
+    and the group of every point.
+    """
+    cells = cells - cells.min(axis=0)
+    if (cells.max(axis=0) < (1 << _PACK_BITS)).all():
+        # Pack the cell into a single key so one 1-D sort groups them
+        keys = ((cells[:, 0] << (2 * _PACK_BITS)) | (cells[:, 1] << _PACK_BITS) |
+                cells[:, 2])
+        _, first, labels = np.unique(keys, return_index=True, return_inverse=True)
+        return first, labels.reshape(-1)
+
+    order = np.lexsort((cells[:, 2], cells[:, 1], cells[:, 0]))
+    sorted_cells = cells[order]
+    is_new = np.empty(len(order), dtype=bool)
+    is_new[0] = True
+    np.any(sorted_cells[1:] != sorted_cells[:-1], axis=1, out=is_new[1:])
+    labels = np.empty(len(order), dtype=np.int64)
+    labels[order] = np.cumsum(is_new) - 1
+    return order[is_new], labels
+
+
+def weld_tolerance_for(vertices, tolerance=WELD_TOLERANCE):
+    """Weld distance for a mesh: tolerance times its bounding box diagonal"""
+    if not len(vertices):
+        return 0.0
+    vertices = np.asarray(vertices, dtype=np.float64)
+    diagonal = np.linalg.norm(vertices.max(axis=0) - vertices.min(axis=0))
+    return float(tolerance * diagonal)
+
+
+def weld(vertices, triangles, epsilon):
+    """Merge vertices that fall into the same grid cell of size epsilon
+
+    A second pass on a grid shifted by half a cell merges most pairs that a
+    cell boundary split. Every group keeps its lowest-index vertex. Returns
+    (vertices, triangles, source), where source is the input index of every
+    output vertex.
+    """
+    points = np.asarray(vertices, dtype=np.float64).reshape(-1, 3)
+    source = np.arange(len(points))
+    inverse = np.arange(len(points))
+    if epsilon > 0 and len(points):
+        for shift in (0.0, 0.5):
+            cells = np.floor(points / epsilon + shift).astype(np.int64)
+            first, labels = group_cells(cells)
+            points = points[first]
+            source = source[first]
+            inverse = labels[inverse]
+    triangles = inverse[np.asarray(triangles, dtype=np.int64).reshape(-1, 3)]
+    return points.astype(np.float32), triangles, source
+
+
+def degenerate_triangles(vertices, triangles):
+    """Mask of triangles with a repeated corner or zero area"""
+    repeated = ((triangles[:, 0] == triangles[:, 1]) |
+                (triangles[:, 1] == triangles[:, 2]) |
+                (triangles[:, 0] == triangles[:, 2]))
+    corners = np.asarray(vertices, dtype=np.float64)[triangles]
+    cross = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    return repeated | ~np.any(cross, axis=1)
+
+
+def duplicate_triangles(triangles):
+    """Mask of triangles over the same three vertices as an earlier one"""
+    corners = np.sort(triangles, axis=1)
+    order = np.lexsort((corners[:, 2], corners[:, 1], corners[:, 0]))
+    sorted_corners = corners[order]
+    duplicate = np.zeros(len(triangles), dtype=bool)
+    duplicate[order[1:]] = np.all(sorted_corners[1:] == sorted_corners[:-1], axis=1)
+    return duplicate
+
+
+def _edge_pairs(triangles):
+    """Triangles sharing a manifold edge and whether they wind it oppositely
+
+    Returns (first, second, consistent, open_triangles); open_triangles
+    marks triangles with a boundary or non-manifold edge.
+    """
+    starts = triangles.reshape(-1)
+    ends = triangles[:, [1, 2, 0]].reshape(-1)
+    owners = np.repeat(np.arange(len(triangles)), 3)
+    low, high = np.minimum(starts, ends), np.maximum(starts, ends)
+
+    order = np.lexsort((high, low))
+    low, high = low[order], high[order]
+    group_starts = np.flatnonzero(np.r_[True, (low[1:] != low[:-1]) |
+                                        (high[1:] != high[:-1])])
+    counts = np.diff(np.r_[group_starts, len(order)])
+
+    pairs = group_starts[counts == 2]
+    one, two = order[pairs], order[pairs + 1]
+    open_triangles = np.zeros(len(triangles), dtype=bool)
+    open_triangles[owners[order[np.repeat(counts != 2, counts)]]] = True
+    # Neighbours agree when they run along the shared edge in opposite directions
+    return owners[one], owners[two], starts[one] != starts[two], open_triangles
+
+
+def orient(vertices, triangles):
+    """Flip triangles so that connected patches are consistently wound
+
+    The flip of every triangle relative to its neighbours is a two-colouring
+    of the edge graph, solved with one connected components pass over a
+    doubled graph (triangle kept / triangle flipped). Closed patches are
+    then turned outward (positive volume); open patches keep the winding of
+    most of their area. Edges shared by more than two triangles, as in
+    non-manifold scan data, do not constrain the orientation, and
+    non-orientable patches are left as they are. Returns (triangles,
+    flipped mask).
+    """
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+
+    count = len(triangles)
+    if not count:
+        return triangles, np.zeros(0, dtype=bool)
+    one, two, consistent, open_triangles = _edge_pairs(triangles)
+
+    # Node t is "t as is", node t + count is "t flipped"
+    rows = np.concatenate([one, one + count])
+    cols = np.concatenate([np.where(consistent, two, two + count),
+                           np.where(consistent, two + count, two)])
+    graph = coo_matrix((np.ones(len(rows), dtype=np.int8), (rows, cols)),
+                       shape=(2 * count, 2 * count)).tocsr()
+    _, labels = connected_components(graph, directed=False)
+    kept_label, flipped_label = labels[:count], labels[count:]
+    orientable = kept_label != flipped_label
+    # The side with the lower label of every patch is taken as "unflipped"
+    flipped = orientable & (kept_label > flipped_label)
+    patches = np.unique(np.minimum(kept_label, flipped_label), return_inverse=True)[1]
+    patch_count = patches.max() + 1
+
+    oriented = np.where(flipped[:, None], triangles[:, [0, 2, 1]], triangles)
+    corners = np.asarray(vertices, dtype=np.float64)[oriented]
+    volume = np.bincount(patches, minlength=patch_count, weights=np.einsum(
+        'ij,ij->i', corners[:, 0], np.cross(corners[:, 1], corners[:, 2])))
+    areas = 0.5 * np.linalg.norm(np.cross(corners[:, 1] - corners[:, 0],
+                                          corners[:, 2] - corners[:, 0]), axis=1)
+    flipped_area = np.bincount(patches, weights=areas * flipped, minlength=patch_count)
+    total_area = np.bincount(patches, weights=areas, minlength=patch_count)
+
+    is_open = np.bincount(patches, weights=open_triangles, minlength=patch_count) > 0
+    turn = np.where(is_open, flipped_area > total_area / 2, volume < 0)
+    flipped ^= turn[patches] & orientable
+
+    return np.where(flipped[:, None], triangles[:, [0, 2, 1]], triangles), flipped
+
+
+def cleanup_mesh(vertices, triangles, profile=DEFAULT_CLEANUP,
+                 weld_tolerance=WELD_TOLERANCE):
+    """Run the stages of a cleanup profile over a mesh
+
+    weld_tolerance is relative to the bounding box diagonal. Returns
+    (vertices, triangles, (vertex_source, triangle_source), stages): the
+    cleaned float32/uint32 arrays, the input index of every output vertex
+    and triangle (to carry per-element data along), and one dict per stage
+    with its name, seconds and the number of vertices or triangles it
+    removed (triangles it flipped for 'orient').
+    """
+    if profile not in CLEANUP_PROFILES:
+        raise ValueError(f"Unknown cleanup profile: {profile}")
+
+    vertices = np.asarray(vertices, dtype=np.float32).reshape(-1, 3)
+    triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+    vertex_source = np.arange(len(vertices))
+    triangle_source = np.arange(len(triangles))
+    stages = []
+
+    for stage in CLEANUP_PROFILES[profile]:
+        profiling.mark(f'cleanup: {stage}', vertices=len(vertices),
+                       triangles=len(triangles))
+        start = time.perf_counter()
+        removed = {}
+        if stage == 'weld':
+            epsilon = weld_tolerance_for(vertices, weld_tolerance)
+            before = len(vertices)
+            vertices, triangles, source = weld(vertices, triangles, epsilon)
+            vertex_source = vertex_source[source]
+            removed = {"removed_vertices": before - len(vertices), "epsilon": epsilon}
+        elif stage in ('degenerate_triangles', 'duplicate_triangles'):
+            if stage == 'degenerate_triangles':
+                drop = degenerate_triangles(vertices, triangles)
+            else:
+                drop = duplicate_triangles(triangles)
+            triangles = triangles[~drop]
+            triangle_source = triangle_source[~drop]
+            removed = {"removed_triangles": int(np.count_nonzero(drop))}
+        elif stage == 'unreferenced_vertices':
+            used = np.zeros(len(vertices), dtype=bool)
+            used[triangles.reshape(-1)] = True
+            remap = np.cumsum(used) - 1
+            vertices = vertices[used]
+            vertex_source = vertex_source[used]
+            triangles = remap[triangles]
+            removed = {"removed_vertices": int(np.count_nonzero(~used))}
+        elif stage == 'orient':
+            triangles, flipped = orient(vertices, triangles)
+            removed = {"flipped_triangles": int(np.count_nonzero(flipped))}
+        stages.append(dict(stage=stage, seconds=time.perf_counter() - start, **removed))
+
+    return (np.ascontiguousarray(vertices, dtype=np.float32),
+            np.ascontiguousarray(triangles, dtype=np.uint32),
+            (vertex_source, triangle_source), stages)
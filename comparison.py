@@ -0,0 +1,789 @@
+"""Headless mesh loading and comparison pipeline
+
+Everything the GUI does to a pair of 3D files, without Eel: loading
+STL/OBJ/STEP/IGES files (see readers) into the server-side mesh store,
+aligning them, and measuring their distances and matching vertices. main.py
+exposes these functions to the browser, and file_comparison runs them over
+whole file pairs for batch.py. Functions return result dicts, with an
+"error" key on failure, so they can be passed straight to the UI.
+"""
+import base64
+import itertools
+import os
+import traceback
+from pathlib import Path
+
+import numpy as np
+
+import jobs
+import profiling
+from cleanup import CLEANUP_PROFILES, DEFAULT_CLEANUP, WELD_TOLERANCE
+from brep_diff import (FACE_ARRAYS, SURFACE_TYPES, signature_hashes, match_faces,
+                       face_vertices, face_maxima)
+from mesh_cache import MeshCache, CACHE_ARRAYS, DEFAULT_MAX_BYTES
+from distance import (SurfaceIndex, distance_statistics, deviation_range,
+                      quantize_deviation, distance_histogram, tolerance_bands)
+from hausdorff import check_directed
+from jobs import report_stage
+from lod import lod_targets, build_lod_level
+from mesh import Mesh
+from mesh_utils import sample_surface
+from readers import SUPPORTED_FORMATS, BREP_FORMATS, load_mesh_file
+from regions import MAX_REGIONS, deviation_regions
+from registration import register
+from tessellation import DEFAULT_TOLERANCE, DEFAULT_ANGULAR_TOLERANCE
+
+# Persistent cache of processed meshes; MESH_CACHE_MAX_BYTES=0 disables it.
+# The directory is only created when the first entry is written.
+MESH_CACHE = MeshCache(
+    os.environ.get('MESH_CACHE_DIR', Path('temp') / 'mesh_cache'),
+    max_bytes=int(os.environ.get('MESH_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES)))
+
+# Processed meshes keyed by file_id, so the comparison functions only need
+# a handle instead of the full vertex lists sent back from the browser
+MESH_STORE = {}
+
+# Increases on every store, so caches keyed on another mesh notice updates
+_mesh_versions = itertools.count(1)
+
+
+def store_mesh(file_id, mesh_data):
+    """Store mesh data as a compact Mesh under the given file_id
+
+    Arrays that are already float32/uint32 are stored without a copy. The
+    B-rep face data of STEP/IGES meshes (see brep_diff.FACE_ARRAYS) is kept
+    in derived['brep_faces'], and carried over when a stored Mesh is
+    replaced by a moved copy of itself.
+    """
+    entry = Mesh.from_data(mesh_data, version=next(_mesh_versions))
+    if isinstance(mesh_data, Mesh):
+        brep_faces = mesh_data.derived.get('brep_faces')
+    elif mesh_data.get('face_ids') is not None:
+        brep_faces = {name: np.asarray(mesh_data[name]) for name in FACE_ARRAYS}
+    else:
+        brep_faces = None
+    if brep_faces is not None:
+        entry.derived['brep_faces'] = brep_faces
+    MESH_STORE[file_id] = entry
+    return entry
+
+
+def get_mesh(mesh, lod=0):
+    """Resolve a file_id handle (or Mesh, or legacy mesh data dict) to a Mesh
+
+    lod > 0 selects a coarser level of detail (see get_lod).
+    """
+    if lod:
+        return get_lod(get_mesh(mesh), lod)
+    if isinstance(mesh, Mesh):
+        return mesh
+    if isinstance(mesh, dict):
+        # Legacy callers still pass the full mesh data
+        return Mesh.from_data(mesh)
+
+    if mesh not in MESH_STORE:
+        raise KeyError(f"Mesh '{mesh}' is not loaded")
+    return MESH_STORE[mesh]
+
+
+def get_lod(mesh, level):
+    """Arrays of a level of detail of a mesh, decimated on first use
+
+    Level 0 is the mesh itself; levels past the coarsest one return the
+    coarsest. Levels are stored like meshes (with their own derived data and
+    version) and dropped together with the full mesh.
+    """
+    full = get_mesh(mesh)
+    derived = full.derived
+    if 'lods' not in derived:
+        derived['lod_targets'] = lod_targets(len(full.indices))
+        derived['lods'] = {}
+
+    level = min(int(level), len(derived['lod_targets']))
+    if level <= 0:
+        return full
+    if level not in derived['lods']:
+        vertices, normals, triangles = build_lod_level(
+            full.vertices, full.indices, derived['lod_targets'][level - 1])
+        derived['lods'][level] = Mesh(vertices, triangles, normals,
+                                      version=next(_mesh_versions), lod=level)
+    return derived['lods'][level]
+
+
+def lod_levels(mesh):
+    """Approximate triangle count of each level of detail, level 0 first"""
+    full = get_mesh(mesh)
+    return [len(full.indices)] + lod_targets(len(full.indices))
+
+
+def encode_mesh_binary(arrays):
+    """Encode mesh arrays as base64 little-endian float32/uint32 buffers
+
+    The browser decodes these straight into an ArrayBuffer, avoiding the
+    list-of-floats JSON round trip.
+    """
+    def to_base64(array, dtype):
+        data = np.ascontiguousarray(array, dtype=dtype)
+        return base64.b64encode(data.tobytes()).decode('ascii')
+
+    return {
+        "encoding": "base64",
+        "vertices": to_base64(arrays['vertices'], '<f4'),
+        "normals": to_base64(arrays['normals'], '<f4'),
+        "indices": to_base64(arrays['indices'], '<u4'),
+        "vertex_count": int(len(arrays['vertices'])),
+        "triangle_count": int(len(arrays['indices']))
+    }
+
+
+def release_mesh(file_id):
+    """Drop a stored mesh when the file is cleared in the UI"""
+    MESH_STORE.pop(file_id, None)
+    return {"success": True}
+
+
+# Bump when the loading/cleanup pipeline changes so stale cache entries miss
+MESH_PIPELINE_VERSION = 5
+
+
+def mesh_processing_params(file_ext, tolerance=DEFAULT_TOLERANCE,
+                           angular_tolerance=DEFAULT_ANGULAR_TOLERANCE,
+                           cleanup=DEFAULT_CLEANUP):
+    """Parameters that affect the processed mesh, used in the cache key"""
+    params = {"pipeline": MESH_PIPELINE_VERSION, "cleanup": cleanup}
+    if 'weld' in CLEANUP_PROFILES.get(cleanup, ()):
+        params["weld_tolerance"] = WELD_TOLERANCE
+    if file_ext in BREP_FORMATS:
+        params["tolerance"] = float(tolerance)
+        params["angular_tolerance"] = float(angular_tolerance)
+    return params
+
+
+def load_mesh(file_path, file_id, tolerance=DEFAULT_TOLERANCE,
+              angular_tolerance=DEFAULT_ANGULAR_TOLERANCE, content_digest=None,
+              cleanup=DEFAULT_CLEANUP):
+    """Load a 3D file into the mesh store under file_id
+
+    Processed meshes are cached on disk, keyed by the file contents, so
+    reloading the same file skips the pipeline. content_digest is the file's
+    content hash if already known (see MeshCache.key_for). cleanup is the
+    cleanup profile (see cleanup.CLEANUP_PROFILES); the report of its stages
+    is kept in derived['cleanup'] when the file was processed, not cached.
+    Returns the stored entry, or a dict with an "error" key.
+    """
+    file_path = Path(file_path)
+    file_ext = file_path.suffix.lower()
+
+    if file_ext not in SUPPORTED_FORMATS:
+        return {"error": f"Unsupported file format: {file_ext}"}
+    if cleanup not in CLEANUP_PROFILES:
+        return {"error": f"Unknown cleanup profile: {cleanup}"}
+
+    cache_key = None
+    cached = None
+    report_stage('cache lookup', 0.05)
+    if MESH_CACHE.enabled:
+        cache_key = MESH_CACHE.key_for(file_path, mesh_processing_params(
+            file_ext, tolerance, angular_tolerance, cleanup), content_digest)
+        cached = MESH_CACHE.get(cache_key)
+
+    if cached is not None:
+        return store_mesh(file_id, cached)
+
+    mesh_data = load_mesh_file(file_path, tolerance, angular_tolerance, cleanup)
+    if "error" in mesh_data:
+        return mesh_data
+
+    entry = store_mesh(file_id, mesh_data)
+    if "cleanup" in mesh_data:
+        entry.derived['cleanup'] = mesh_data["cleanup"]
+    if cache_key is not None:
+        arrays = {name: entry[name] for name in CACHE_ARRAYS}
+        arrays.update(entry.derived.get('brep_faces', {}))
+        MESH_CACHE.put(cache_key, arrays)
+    return entry
+
+
+def _as_list(values):
+    """Flatten NumPy arrays into plain lists for JSON transport"""
+    if isinstance(values, np.ndarray):
+        return values.reshape(-1).tolist()
+    return values
+
+
+def encode_mesh(arrays, transport='json'):
+    """Mesh arrays as lists for JSON, or as base64 buffers for 'binary'"""
+    if transport == 'binary':
+        return encode_mesh_binary(arrays)
+    return {
+        "vertices": _as_list(arrays['vertices']),
+        "normals": _as_list(arrays['normals']),
+        "indices": _as_list(arrays['indices'])
+    }
+
+
+@profiling.profiled
+def process_3d_file(file_path, file_id, transport='json',
+                    tolerance=DEFAULT_TOLERANCE,
+                    angular_tolerance=DEFAULT_ANGULAR_TOLERANCE,
+                    progressive=False, content_digest=None,
+                    cleanup=DEFAULT_CLEANUP):
+    """Process various 3D file formats and return mesh data for Three.js
+
+    transport='binary' returns base64 encoded buffers (see encode_mesh_binary)
+    instead of Python lists. tolerance / angular_tolerance set the
+    tessellation precision of STEP/IGES files. With progressive=True the
+    coarsest level of detail is returned, with its level in "lod" and the
+    triangle counts of all levels in "lod_levels"; the finer levels are then
+    fetched with get_mesh_lod. content_digest and the cleanup profile are
+    passed on to load_mesh; "cleanup" holds the report of the cleanup
+    stages, or None for a mesh from the cache.
+    """
+    try:
+        entry = load_mesh(file_path, file_id, tolerance, angular_tolerance,
+                          content_digest, cleanup)
+        if "error" in entry:
+            return entry
+        cleanup_stages = entry.derived.get('cleanup')
+
+        levels = [len(entry.indices)]
+        if progressive:
+            levels = lod_levels(file_id)
+            report_stage('building LOD', 0.7, triangles=levels[-1])
+            entry = get_lod(file_id, len(levels) - 1)
+
+        report_stage('encoding', 0.9, vertices=len(entry.vertices),
+                     triangles=len(entry.indices), transport=transport)
+        mesh_data = encode_mesh(entry, transport)
+        mesh_data["file_id"] = file_id
+        mesh_data["lod"] = entry.lod
+        mesh_data["lod_levels"] = levels
+        mesh_data["cleanup"] = cleanup_stages
+        return mesh_data
+
+    except Exception as e:
+        return {"error": f"Processing error: {str(e)}\n{traceback.format_exc()}"}
+
+
+@profiling.profiled
+def get_mesh_lod(file_id, lod, transport='json'):
+    """Mesh data of one level of detail of a stored mesh, for Three.js"""
+    try:
+        report_stage('building LOD', 0.1)
+        level = get_lod(file_id, lod)
+
+        report_stage('encoding', 0.9, vertices=len(level.vertices),
+                     triangles=len(level.indices), transport=transport)
+        mesh_data = encode_mesh(level, transport)
+        mesh_data["file_id"] = file_id
+        mesh_data["lod"] = level.lod
+        return mesh_data
+
+    except Exception as e:
+        return {"error": f"LOD error: {str(e)}"}
+
+
+# Points sampled on each mesh surface for registration
+REGISTRATION_SAMPLES = 50000
+
+
+def get_registration_samples(mesh):
+    """Surface samples of a mesh for registration, drawn once per stored mesh"""
+    target = get_mesh(mesh)
+    derived = target.derived
+    if 'registration_samples' not in derived:
+        derived['registration_samples'] = sample_surface(
+            target.vertices, target.indices, REGISTRATION_SAMPLES,
+            areas=target.face_areas)
+    return derived['registration_samples']
+
+
+def register_meshes(mesh_a, mesh_b, init='pca'):
+    """Rigidly register mesh B onto mesh A
+
+    When mesh_b is a handle, the stored mesh B is replaced by its aligned
+    version. Returns (aligned Mesh, transformation, registration info),
+    where the info reports fitness and inlier RMSE for every stage.
+    """
+    full_b = get_mesh(mesh_b)
+
+    # Sample points from meshes for registration
+    report_stage('sampling', 0.05)
+    points_a = get_registration_samples(mesh_a)
+    points_b = get_registration_samples(mesh_b)
+
+    transformation, stages = register(points_b, points_a, init=init,
+                                      report=jobs.report)
+
+    # Apply transformation to mesh B
+    report_stage('transforming', 0.95)
+    aligned = full_b.transformed(transformation)
+    if 'brep_faces' in full_b.derived:
+        # Face signatures stay in file coordinates (see compare_brep)
+        aligned.derived['brep_faces'] = full_b.derived['brep_faces']
+
+    # Keep the stored mesh in sync so later comparisons use the aligned pose
+    if not isinstance(mesh_b, dict):
+        store_mesh(mesh_b, aligned)
+
+    registration_info = {
+        "stages": stages,
+        "fitness": stages[-1]["fitness"] if stages else 0.0,
+        "inlier_rmse": stages[-1]["inlier_rmse"] if stages else 0.0
+    }
+    if stages and "error" in stages[-1]:
+        registration_info["error"] = stages[-1]["error"]
+    return aligned, transformation, registration_info
+
+
+@profiling.profiled
+def align_meshes(mesh_a, mesh_b, transport='json', init='pca'):
+    """Align mesh B onto mesh A with global initialization and multi-scale ICP
+
+    mesh_a / mesh_b are file_id handles of stored meshes. init is 'pca',
+    'fpfh' or 'none' (see registration.register). See register_meshes for
+    the registration details included in the result.
+    """
+    try:
+        aligned, transformation, registration_info = register_meshes(
+            mesh_a, mesh_b, init)
+
+        if transport == 'binary':
+            result = encode_mesh_binary(aligned)
+            result["transformation"] = transformation.tolist()
+            result["registration"] = registration_info
+            return result
+
+        # Convert back to JSON format
+        return {
+            "vertices": aligned.vertices.flatten().tolist(),
+            "normals": aligned.normals.flatten().tolist(),
+            "indices": aligned.indices.flatten().tolist(),
+            "transformation": transformation.tolist(),
+            "registration": registration_info
+        }
+
+    except Exception as e:
+        return {"error": f"Alignment error: {str(e)}"}
+
+
+def get_surface_index(mesh, lod=0):
+    """Closest-point index over a mesh's triangles, built once per stored mesh"""
+    target = get_mesh(mesh, lod)
+    derived = target.derived
+    if 'surface_index' not in derived:
+        derived['surface_index'] = SurfaceIndex(
+            target.vertices, target.indices, face_normals=target.face_normals)
+    return derived['surface_index']
+
+
+def surface_distances(mesh_a, mesh_b, source='vertices', num_samples=100000,
+                      lod=0):
+    """Signed distances from A's vertices or surface samples to B's triangles"""
+    source_mesh = get_mesh(mesh_a, lod)
+    if source == 'samples':
+        points = sample_surface(source_mesh.vertices, source_mesh.indices,
+                                int(num_samples), areas=source_mesh.face_areas)
+    else:
+        points = source_mesh.vertices
+
+    report_stage('building surface index', 0.1,
+                 triangles=len(get_mesh(mesh_b, lod).indices))
+    index = get_surface_index(mesh_b, lod)
+
+    report_stage('distances', 0.3, points=len(points))
+    distances, _, _ = index.query(points)
+    return distances
+
+
+@profiling.profiled
+def calculate_mesh_distance(mesh_a, mesh_b, method='surface', source='vertices',
+                            num_samples=100000, transport='json', lod=0):
+    """Calculate distance statistics between two meshes
+
+    method='surface' measures from A's vertices (source='vertices') or from
+    num_samples points sampled on A (source='samples') to the closest point
+    on B's triangles, signed by B's face normals. method='vertex' is the
+    old nearest-vertex distance. The result holds a histogram of all signed
+    distances; with transport='binary' the full per-point signed distances
+    are also returned as a base64 float32 buffer. lod > 0
+    measures between coarser levels of detail of both meshes, as a quick
+    preview.
+    """
+    try:
+        if method == 'vertex':
+            return _vertex_distance(mesh_a, mesh_b, lod)
+
+        distances = surface_distances(mesh_a, mesh_b, source, num_samples, lod)
+
+        result = distance_statistics(distances)
+        result["method"] = method
+        result["source"] = source
+        result["lod"] = get_mesh(mesh_a, lod).lod
+        result["histogram"] = distance_histogram(distances)
+        result["distances"] = distances[:1000].tolist()  # Limit for performance
+        if transport == 'binary':
+            result["per_point_distances"] = base64.b64encode(
+                distances.astype('<f4').tobytes()).decode('ascii')
+        return result
+
+    except Exception as e:
+        return {"error": f"Distance calculation error: {str(e)}"}
+
+
+def _vertex_distance(mesh_a, mesh_b, lod=0):
+    """Nearest-vertex distance statistics using Open3D point clouds"""
+    import open3d as o3d
+
+    vertices_a = get_mesh(mesh_a, lod).vertices
+    vertices_b = get_mesh(mesh_b, lod).vertices
+
+    # Create point clouds
+    pcd_a = o3d.geometry.PointCloud()
+    pcd_a.points = o3d.utility.Vector3dVector(vertices_a.astype(np.float64))
+
+    pcd_b = o3d.geometry.PointCloud()
+    pcd_b.points = o3d.utility.Vector3dVector(vertices_b.astype(np.float64))
+
+    # Compute distances
+    report_stage('distances', 0.3)
+    distances = pcd_a.compute_point_cloud_distance(pcd_b)
+    distances = np.array(distances)
+
+    return {
+        "min": float(np.min(distances)),
+        "max": float(np.max(distances)),
+        "mean": float(np.mean(distances)),
+        "std": float(np.std(distances)),
+        "method": 'vertex',
+        "histogram": distance_histogram(distances),
+        "distances": distances.tolist()[:1000]  # Limit for performance
+    }
+
+
+# Default number of histogram bins for the deviation field
+DEVIATION_BINS = 64
+
+
+def get_vertex_deviation(mesh_a, mesh_b, lod=0):
+    """Signed distance from each vertex of A to the surface of B
+
+    Like get_nearest_distances, the result is cached on A for the current
+    version of B, so a new colour range or tolerance is only requantized.
+    """
+    target_a = get_mesh(mesh_a, lod)
+    target_b = get_mesh(mesh_b, lod)
+    key = (mesh_b if isinstance(mesh_b, str) else None, target_b.version)
+
+    cached = target_a.derived.get('vertex_deviation')
+    if key[0] is not None and cached is not None and cached[0] == key:
+        return cached[1]
+
+    distances = surface_distances(mesh_a, mesh_b, 'vertices', lod=lod)
+    distances = distances.astype(np.float32)
+    target_a.derived['vertex_deviation'] = (key, distances)
+    return distances
+
+
+@profiling.profiled
+def deviation_field(mesh_a, mesh_b, max_deviation=None, tolerance=0.1, bits=8,
+                    bins=DEVIATION_BINS, lod=0):
+    """Per-vertex signed deviation of A from B's surface, for a colormap
+
+    The deviation of every vertex of A is returned as a base64 buffer of
+    uint8 or uint16 levels (bits) over [-max_deviation, +max_deviation],
+    decoded as offset + level * step; max_deviation=None covers the largest
+    deviation. The result also holds the distance statistics, a histogram
+    over the same range and the vertex counts under, within and over the
+    +-tolerance band. With lod > 0 the levels refer to the vertices of that
+    level of detail of A.
+    """
+    try:
+        distances = get_vertex_deviation(mesh_a, mesh_b, lod)
+        if max_deviation is None or float(max_deviation) <= 0:
+            max_deviation = deviation_range(distances)
+        max_deviation = float(max_deviation)
+
+        report_stage('quantizing', 0.9, points=len(distances))
+        levels, offset, step = quantize_deviation(distances, max_deviation, int(bits))
+
+        result = distance_statistics(distances)
+        result.update({
+            "lod": get_mesh(mesh_a, lod).lod,
+            "range": max_deviation,
+            "bits": int(bits),
+            "offset": offset,
+            "step": step,
+            "levels": base64.b64encode(levels.tobytes()).decode('ascii'),
+            "histogram": distance_histogram(distances, max_deviation, bins),
+            "bands": tolerance_bands(distances, float(tolerance))
+        })
+        return result
+
+    except Exception as e:
+        return {"error": f"Deviation calculation error: {str(e)}"}
+
+
+@profiling.profiled
+def find_deviation_regions(mesh_a, mesh_b, tolerance=0.1, min_area=0.0,
+                           limit=MAX_REGIONS, lod=0):
+    """Connected regions of A that deviate from B by more than tolerance
+
+    Returns the regions (see regions.deviation_regions) sorted by area,
+    at most limit of them, and the total number of regions of at least
+    min_area. The vertex deviations are shared with deviation_field.
+    """
+    try:
+        distances = get_vertex_deviation(mesh_a, mesh_b, lod)
+        target = get_mesh(mesh_a, lod)
+
+        report_stage('clustering regions', 0.9, triangles=len(target.indices))
+        regions, total = deviation_regions(
+            target.vertices, target.indices, distances, float(tolerance),
+            target.face_areas, float(min_area), int(limit))
+        return {
+            "regions": regions,
+            "region_count": total,
+            "tolerance": float(tolerance),
+            "lod": target.lod
+        }
+
+    except Exception as e:
+        return {"error": f"Region calculation error: {str(e)}"}
+
+
+@profiling.profiled
+def hausdorff_check(mesh_a, mesh_b, tolerance=0.1, symmetric=True, lod=0):
+    """Quick pass/fail check of the largest deviation against a tolerance
+
+    Decides whether every vertex of A lies within tolerance of B's surface
+    (and, if symmetric, every vertex of B within tolerance of A's) with the
+    early-exit bounds of hausdorff.check_directed, instead of measuring
+    every distance. "passed" is the verdict; lower_bound and upper_bound
+    enclose the largest distance, and upper_bound is None when the check
+    stopped early at a point beyond tolerance. "a_to_b" and "b_to_a" hold
+    the result of each direction (b_to_a is None if it was not needed).
+    """
+    try:
+        tolerance = float(tolerance)
+        if tolerance < 0:
+            return {"error": f"Tolerance must not be negative: {tolerance}"}
+
+        result = {"tolerance": tolerance, "symmetric": bool(symmetric),
+                  "lod": get_mesh(mesh_a, lod).lod, "a_to_b": None, "b_to_a": None}
+        directions = [('a_to_b', mesh_a, mesh_b, 0.1)]
+        if symmetric:
+            directions.append(('b_to_a', mesh_b, mesh_a, 0.55))
+        for key, source, target, progress in directions:
+            report_stage(f'building surface index ({key})', progress,
+                         triangles=len(get_mesh(target, lod).indices))
+            index = get_surface_index(target, lod)
+            points = get_mesh(source, lod).vertices
+            report_stage(f'bounding distances ({key})', progress + 0.1,
+                         points=len(points))
+            result[key] = check_directed(points, index, tolerance)
+            if not result[key]["passed"]:
+                break
+
+        checked = [result[key] for key, _, _, _ in directions
+                   if result[key] is not None]
+        result["passed"] = all(check["passed"] for check in checked)
+        result["lower_bound"] = max(check["lower_bound"] for check in checked)
+        result["upper_bound"] = (max(check["upper_bound"] for check in checked)
+                                 if result["passed"] else None)
+        return result
+
+    except Exception as e:
+        return {"error": f"Hausdorff check error: {str(e)}"}
+
+
+# Changed faces listed per side by compare_brep
+MAX_CHANGED_FACES = 100
+
+
+def _changed_faces(target, brep_faces, changed, points, distances, limit):
+    """Changed faces of one side with their largest deviation, largest first"""
+    face_ids = brep_faces['face_ids']
+    signatures = brep_faces['face_signatures']
+    deviation = np.zeros(len(target.vertices))
+    deviation[points] = np.abs(distances)
+
+    selected = changed[face_ids]
+    maxima = face_maxima(face_ids[selected], target.indices[selected],
+                         deviation, len(signatures))
+    faces = np.flatnonzero(changed)
+    faces = faces[np.argsort(-maxima[faces], kind='stable')]
+    return [{
+        "face": int(face),
+        "type": SURFACE_TYPES[int(signatures[face, 0])],
+        "area": float(signatures[face, 1]),
+        "centroid": signatures[face, 2:5].tolist(),
+        # Faces without triangles have no measured deviation
+        "max_deviation": float(maxima[face]) if np.isfinite(maxima[face]) else None
+    } for face in faces[:limit]]
+
+
+@profiling.profiled
+def compare_brep(mesh_a, mesh_b, threshold=0.1, limit=MAX_CHANGED_FACES):
+    """Compare two STEP/IGES meshes face by face, measuring only changed faces
+
+    The B-rep faces of A and B are matched by their signatures (see
+    brep_diff); matched faces are reported as unchanged without any
+    distance computation. Only the vertices of unmatched faces are measured,
+    those of A against B's full surface and those of B against A's. Returns
+    the face counts, distance statistics and +-threshold bands of the
+    measured vertices of each side (None when a side has no changed faces),
+    and up to limit changed faces per side with their type, area, centroid
+    and largest deviation. Faces are matched in the coordinates of the
+    source files, while distances use the stored (possibly aligned) meshes.
+    """
+    try:
+        targets = {'a': get_mesh(mesh_a), 'b': get_mesh(mesh_b)}
+        brep_faces = {side: target.derived.get('brep_faces')
+                      for side, target in targets.items()}
+        if brep_faces['a'] is None or brep_faces['b'] is None:
+            return {"error": "B-rep comparison needs two STEP/IGES files"}
+
+        report_stage('matching faces', 0.05,
+                     faces_a=len(brep_faces['a']['face_signatures']),
+                     faces_b=len(brep_faces['b']['face_signatures']))
+        matched = dict(zip('ab', match_faces(
+            signature_hashes(brep_faces['a']['face_signatures']),
+            signature_hashes(brep_faces['b']['face_signatures']))))
+
+        result = {
+            "threshold": float(threshold),
+            "matched_faces": int(np.count_nonzero(matched['a']))
+        }
+        others = {'a': mesh_b, 'b': mesh_a}
+        for side, progress in (('a', 0.1), ('b', 0.55)):
+            target = targets[side]
+            changed = ~matched[side]
+            points = face_vertices(target.indices, brep_faces[side]['face_ids'],
+                                   changed)
+            result[f"faces_{side}"] = len(changed)
+            result[f"changed_faces_{side}"] = int(np.count_nonzero(changed))
+            result[f"total_vertices_{side}"] = len(target.vertices)
+            result[f"measured_vertices_{side}"] = len(points)
+
+            distances = np.zeros(0)
+            result[f"distance_{side}"] = None
+            result[f"bands_{side}"] = None
+            if len(points):
+                report_stage(f'distances {side.upper()}', progress, points=len(points))
+                distances, _, _ = get_surface_index(others[side]).query(
+                    target.vertices[points])
+                result[f"distance_{side}"] = distance_statistics(distances)
+                result[f"bands_{side}"] = tolerance_bands(distances, float(threshold))
+            result[f"changed_{side}"] = _changed_faces(
+                target, brep_faces[side], changed, points, distances, int(limit))
+        return result
+
+    except Exception as e:
+        return {"error": f"B-rep comparison error: {str(e)}"}
+
+
+# Nearest-neighbour distances are sent as uint16 multiples of
+# MATCHING_RANGE / 65534 so the UI can re-threshold without a round trip;
+# 65535 means "further than MATCHING_RANGE"
+MATCHING_RANGE = 5.0
+MATCHING_LEVELS = 65535
+
+
+def get_vertex_tree(mesh, lod=0):
+    """KD-tree over a mesh's vertices, built once per stored mesh"""
+    from scipy.spatial import cKDTree
+
+    target = get_mesh(mesh, lod)
+    derived = target.derived
+    if 'vertex_tree' not in derived:
+        derived['vertex_tree'] = cKDTree(target.vertices)
+    return derived['vertex_tree']
+
+
+def get_nearest_distances(mesh_a, mesh_b, lod=0):
+    """Distance from each vertex of A to the nearest vertex of B
+
+    The result does not depend on the matching threshold, so it is cached on
+    A for the current version of B.
+    """
+    target_a = get_mesh(mesh_a, lod)
+    target_b = get_mesh(mesh_b, lod)
+    key = (mesh_b if isinstance(mesh_b, str) else None, target_b.version)
+
+    cached = target_a.derived.get('nearest_distances')
+    if key[0] is not None and cached is not None and cached[0] == key:
+        return cached[1]
+
+    distances, _ = get_vertex_tree(mesh_b, lod).query(target_a.vertices, workers=-1)
+    distances = distances.astype(np.float32)
+    # Only the latest pair is kept to bound memory
+    target_a.derived['nearest_distances'] = (key, distances)
+    return distances
+
+
+def quantize_distances(distances, max_distance=MATCHING_RANGE):
+    """Encode distances as uint16 steps of max_distance / (MATCHING_LEVELS - 1)
+
+    Levels round down, so level * step is at most one step below the
+    distance: a vertex within a threshold is never quantized beyond it.
+    Distances beyond max_distance get MATCHING_LEVELS.
+    """
+    distances = np.asarray(distances)
+    step = max_distance / (MATCHING_LEVELS - 1)
+    levels = np.where(distances > max_distance, MATCHING_LEVELS,
+                      np.floor(np.minimum(distances, max_distance) / step))
+    return levels.astype('<u2'), step
+
+
+def matching_statistics(distances_a, distances_b, threshold):
+    """Count the vertices of A and B whose nearest neighbour is within threshold"""
+    num_matching_a = int(np.count_nonzero(distances_a <= threshold))
+    num_matching_b = int(np.count_nonzero(distances_b <= threshold))
+    return {
+        "num_matching_a": num_matching_a,
+        "num_matching_b": num_matching_b,
+        "percent_matching_a": float(num_matching_a / len(distances_a) * 100),
+        "percent_matching_b": float(num_matching_b / len(distances_b) * 100),
+        "total_vertices_a": len(distances_a),
+        "total_vertices_b": len(distances_b)
+    }
+
+
+@profiling.profiled
+def find_matching_vertices(mesh_a, mesh_b, threshold=0.1, transport='json', lod=0):
+    """Find matching vertices between two meshes within a distance threshold
+
+    KD-trees and nearest-neighbour distances are cached per mesh pair, so a
+    new threshold only costs a vectorized comparison. transport='binary'
+    returns the quantized distances (see quantize_distances) instead of the
+    per-vertex booleans, for thresholding in the browser. With lod > 0 the
+    per-vertex results refer to the vertices of that level of detail.
+    """
+    try:
+        # Find nearest neighbors for each vertex in A and B
+        report_stage('matching A to B', 0.1)
+        distances_a = get_nearest_distances(mesh_a, mesh_b, lod)
+
+        report_stage('matching B to A', 0.5)
+        distances_b = get_nearest_distances(mesh_b, mesh_a, lod)
+
+        result = {
+            "stats": matching_statistics(distances_a, distances_b, threshold),
+            "lod": get_mesh(mesh_a, lod).lod
+        }
+
+        if transport == 'binary':
+            levels_a, step = quantize_distances(distances_a)
+            levels_b, _ = quantize_distances(distances_b)
+            result["distance_step"] = step
+            for key, levels in (("nearest_distances_a", levels_a),
+                                ("nearest_distances_b", levels_b)):
+                result[key] = base64.b64encode(levels.tobytes()).decode('ascii')
+        else:
+            result["matching_vertices_a"] = (distances_a <= threshold).tolist()
+            result["matching_vertices_b"] = (distances_b <= threshold).tolist()
+        return result
+
+    except Exception as e:
+        return {"error": f"Matching calculation error: {str(e)}"}
@@ -0,0 +1,336 @@
+"""Point-to-surface distances against an indexed triangle mesh
+
+SurfaceIndex is built once per reference mesh and answers closest-point
+queries against its triangles, not just its vertices. It uses Open3D's
+RaycastingScene (a BVH) when available and otherwise a SciPy KD-tree over
+triangle centroids, refined until the result is provably the closest
+triangle. Distances are signed by the normal of the closest triangle.
+The helpers at the end summarize and quantize signed distances for the
+deviation colormap.
+"""
+import numpy as np
+
+from mesh_utils import face_normals as unit_face_normals
+
+# Query points are processed in chunks to bound temporary memory
+QUERY_CHUNK = 65536
+
+# Candidate triangles per point are doubled up to this count before falling
+# back to a radius search for the few points that are still unresolved
+MAX_CANDIDATES = 64
+
+
+def closest_points_on_triangles(points, a, b, c):
+    """Closest point on each triangle (a[i], b[i], c[i]) to points[i]
+
+    Vectorized version of the region tests from Ericson, Real-Time Collision
+    Detection (5.1.5).
+    """
+    ab = b - a
+    ac = c - a
+    ap = points - a
+    bp = points - b
+    cp = points - c
+
+    def dot(u, v):
+        return np.einsum('ij,ij->i', u, v)
+
+    d1, d2 = dot(ab, ap), dot(ac, ap)
+    d3, d4 = dot(ab, bp), dot(ac, bp)
+    d5, d6 = dot(ab, cp), dot(ac, cp)
+    va = d3 * d6 - d5 * d4
+    vb = d5 * d2 - d1 * d6
+    vc = d1 * d4 - d3 * d2
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Interior of the face
+        denom = va + vb + vc
+        v = vb / denom
+        w = vc / denom
+        result = a + ab * v[:, None] + ac * w[:, None]
+
+        # Edge and vertex regions, applied so that earlier tests win
+        m = (va <= 0) & (d4 - d3 >= 0) & (d5 - d6 >= 0)
+        t = (d4[m] - d3[m]) / ((d4[m] - d3[m]) + (d5[m] - d6[m]))
+        result[m] = b[m] + (c[m] - b[m]) * t[:, None]
+
+        m = (vb <= 0) & (d2 >= 0) & (d6 <= 0)
+        t = d2[m] / (d2[m] - d6[m])
+        result[m] = a[m] + ac[m] * t[:, None]
+
+        m = (d6 >= 0) & (d5 <= d6)
+        result[m] = c[m]
+
+        m = (vc <= 0) & (d1 >= 0) & (d3 <= 0)
+        t = d1[m] / (d1[m] - d3[m])
+        result[m] = a[m] + ab[m] * t[:, None]
+
+        m = (d3 >= 0) & (d4 <= d3)
+        result[m] = b[m]
+
+        m = (d1 <= 0) & (d2 <= 0)
+        result[m] = a[m]
+
+    # Degenerate triangles can leave NaNs; their first vertex is a fair answer
+    invalid = ~np.isfinite(result).all(axis=1)
+    result[invalid] = a[invalid]
+    return result
+
+
+class SurfaceIndex:
+    """Closest-point acceleration structure over a mesh's triangles
+
+    Float32 / uint32 mesh arrays (see mesh.Mesh) are shared rather than
+    copied; only the triangles examined for a chunk of query points are
+    widened to float64. face_normals can be passed in if already known.
+    """
+
+    def __init__(self, vertices, triangles, backend=None, face_normals=None):
+        vertices = np.asarray(vertices)
+        if vertices.dtype not in (np.float32, np.float64):
+            vertices = vertices.astype(np.float64)
+        self.vertices = np.ascontiguousarray(vertices.reshape(-1, 3))
+        triangles = np.asarray(triangles)
+        if triangles.dtype.kind not in 'iu':
+            triangles = triangles.astype(np.int64)
+        self.triangles = np.ascontiguousarray(triangles.reshape(-1, 3))
+        if len(self.triangles) == 0:
+            raise ValueError("Reference mesh has no triangles")
+
+        if face_normals is None:
+            face_normals = unit_face_normals(self.vertices, self.triangles)
+        self.face_normals = face_normals
+        self.backend = backend or ('open3d' if _open3d_available() else 'kdtree')
+
+        if self.backend == 'open3d':
+            self._build_raycasting_scene()
+        else:
+            self._build_centroid_tree()
+
+    def _build_raycasting_scene(self):
+        import open3d as o3d
+
+        self._scene = o3d.t.geometry.RaycastingScene()
+        self._scene.add_triangles(
+            o3d.core.Tensor(self.vertices.astype(np.float32, copy=False)),
+            o3d.core.Tensor(self.triangles.astype(np.uint32, copy=False)))
+
+    def _build_centroid_tree(self):
+        from scipy.spatial import cKDTree
+
+        corners = self.vertices[self.triangles]
+        self._centroids = corners.mean(axis=1, dtype=np.float64)
+        # No point of a triangle is further than this from its centroid
+        radii = np.linalg.norm(corners - self._centroids[:, None, :],
+                               axis=2).max(axis=1)
+        self._max_radius = float(radii.max())
+        self._tree = cKDTree(self._centroids)
+
+    def _closest_to_candidates(self, points, candidates):
+        """Best of the candidate triangles (m, k) for each of points (m, 3)"""
+        m, k = candidates.shape
+        triangles = self.triangles[candidates.reshape(-1)]
+        corners = self.vertices[triangles].astype(np.float64)
+        repeated = np.repeat(points, k, axis=0)
+        closest = closest_points_on_triangles(
+            repeated, corners[:, 0], corners[:, 1], corners[:, 2])
+
+        sq_dist = np.sum((repeated - closest) ** 2, axis=1).reshape(m, k)
+        best = np.argmin(sq_dist, axis=1)
+        rows = np.arange(m)
+        return (sq_dist[rows, best], candidates[rows, best],
+                closest.reshape(m, k, 3)[rows, best])
+
+    def _query_tree(self, points):
+        num_triangles = len(self.triangles)
+        sq_dist = np.full(len(points), np.inf)
+        triangle_ids = np.zeros(len(points), dtype=np.int64)
+        closest = np.zeros_like(points)
+
+        unresolved = np.arange(len(points))
+        k = min(8, num_triangles)
+        while len(unresolved) and k <= MAX_CANDIDATES:
+            centroid_dist, candidates = self._tree.query(points[unresolved], k=k,
+                                                         workers=-1)
+            centroid_dist = centroid_dist.reshape(len(unresolved), -1)
+            candidates = candidates.reshape(len(unresolved), -1)
+
+            best_sq, best_tri, best_point = self._closest_to_candidates(
+                points[unresolved], candidates)
+            sq_dist[unresolved] = best_sq
+            triangle_ids[unresolved] = best_tri
+            closest[unresolved] = best_point
+
+            # Every triangle not yet checked is at least this far away
+            lower_bound = centroid_dist[:, -1] - self._max_radius
+            done = (np.sqrt(best_sq) <= lower_bound) | (k >= num_triangles)
+            unresolved = unresolved[~done]
+            k = min(k * 2, num_triangles)
+
+        # Remaining points: check every triangle whose centroid could be closer
+        if len(unresolved):
+            radii = np.sqrt(sq_dist[unresolved]) + self._max_radius
+            neighbours = self._tree.query_ball_point(
+                points[unresolved], radii, workers=-1)
+            for index, candidates in zip(unresolved, neighbours):
+                best_sq, best_tri, best_point = self._closest_to_candidates(
+                    points[index:index + 1], np.asarray(candidates)[None, :])
+                if best_sq[0] < sq_dist[index]:
+                    sq_dist[index] = best_sq[0]
+                    triangle_ids[index] = best_tri[0]
+                    closest[index] = best_point[0]
+
+        return closest, triangle_ids
+
+    def _query_scene(self, points):
+        import open3d as o3d
+
+        answer = self._scene.compute_closest_points(
+            o3d.core.Tensor(points.astype(np.float32)))
+        return (answer['points'].numpy().astype(np.float64),
+                answer['primitive_ids'].numpy().astype(np.int64))
+
+    def query(self, points):
+        """Closest surface points for each query point
+
+        Returns (signed_distances, closest_points, triangle_ids). Points on the
+        side the closest triangle's normal faces get positive distances.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        closest = np.zeros_like(points)
+        triangle_ids = np.zeros(len(points), dtype=np.int64)
+
+        for start in range(0, len(points), QUERY_CHUNK):
+            chunk = slice(start, start + QUERY_CHUNK)
+            if self.backend == 'open3d':
+                closest[chunk], triangle_ids[chunk] = self._query_scene(points[chunk])
+            else:
+                closest[chunk], triangle_ids[chunk] = self._query_tree(points[chunk])
+
+        offsets = points - closest
+        distances = np.linalg.norm(offsets, axis=1)
+        side = np.einsum('ij,ij->i', offsets, self.face_normals[triangle_ids])
+        signed = np.where(side < 0, -distances, distances)
+        return signed, closest, triangle_ids
+
+    def distance_bounds(self, points, k=1):
+        """Cheap bounds on the unsigned distance of each point to the surface
+
+        Returns (lower, upper). upper is the distance to the closest of the
+        k triangles with the nearest centroids; no other triangle can be
+        nearer than lower. Open3D answers exactly, so there both are the
+        distance itself.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        if self.backend == 'open3d':
+            distances = np.abs(self.query(points)[0])
+            return distances, distances
+
+        k = min(k, len(self.triangles))
+        lower = np.empty(len(points))
+        upper = np.empty(len(points))
+        for start in range(0, len(points), QUERY_CHUNK):
+            chunk = slice(start, start + QUERY_CHUNK)
+            centroid_dist, candidates = self._tree.query(points[chunk], k=k, workers=-1)
+            centroid_dist = centroid_dist.reshape(len(candidates), -1)
+            best_sq, _, _ = self._closest_to_candidates(
+                points[chunk], candidates.reshape(len(candidates), -1))
+            upper[chunk] = np.sqrt(best_sq)
+            if k >= len(self.triangles):
+                lower[chunk] = upper[chunk]
+            else:
+                # Triangles beyond the k nearest centroids are at least this far away
+                beyond = np.maximum(centroid_dist[:, -1] - self._max_radius, 0)
+                lower[chunk] = np.minimum(upper[chunk], beyond)
+        return lower, upper
+
+
+def _open3d_available():
+    try:
+        import open3d as o3d
+        return hasattr(o3d, 't')
+    except Exception:
+        return False
+
+
+def distance_statistics(distances):
+    """Summary statistics of a (signed) distance array"""
+    distances = np.asarray(distances, dtype=np.float64)
+    absolute = np.abs(distances)
+    return {
+        "min": float(np.min(absolute)),
+        "max": float(np.max(absolute)),
+        "mean": float(np.mean(absolute)),
+        "std": float(np.std(absolute)),
+        "rms": float(np.sqrt(np.mean(distances ** 2))),
+        "signed_min": float(np.min(distances)),
+        "signed_max": float(np.max(distances)),
+        "signed_mean": float(np.mean(distances)),
+        "count": int(len(distances))
+    }
+
+
+def deviation_range(distances):
+    """Symmetric colour range covering every distance (1.0 if all are zero)"""
+    largest = float(np.max(np.abs(distances))) if len(distances) else 0.0
+    return largest if largest > 0 else 1.0
+
+
+def quantize_deviation(distances, max_deviation, bits=8, beyond=False):
+    """Encode signed distances as uint8/uint16 levels over [-max, +max]
+
+    Level 0 is -max_deviation and the top level +max_deviation; distances
+    beyond the range are clamped to the ends. With beyond=True the top
+    level is instead reserved for distances that are not finite, whose
+    sign is unknown (e.g. the inf of outofcore beyond its search range),
+    and the range spans the levels below it. Returns (levels, offset,
+    step), with distance ~= offset + level * step.
+    """
+    if bits not in (8, 16):
+        raise ValueError(f"bits must be 8 or 16, not {bits}")
+    top = (1 << bits) - 1
+    highest = top - 1 if beyond else top
+    step = 2.0 * max_deviation / highest
+    distances = np.asarray(distances, dtype=np.float64)
+    levels = np.rint((distances + max_deviation) / step)
+    np.clip(levels, 0, highest, out=levels)
+    if beyond:
+        levels[~np.isfinite(distances)] = top
+    return levels.astype('<u1' if bits == 8 else '<u2'), -max_deviation, step
+
+
+def distance_histogram(distances, max_deviation=None, bins=64):
+    """Histogram of signed distances over [-max_deviation, +max_deviation]
+
+    Distances outside the range are counted in "below" and "above" instead
+    of the end bins.
+    """
+    distances = np.asarray(distances)
+    if max_deviation is None:
+        max_deviation = deviation_range(distances)
+    counts, edges = np.histogram(distances, bins=int(bins),
+                                 range=(-max_deviation, max_deviation))
+    return {
+        "counts": counts.tolist(),
+        "edges": edges.tolist(),
+        "below": int(np.count_nonzero(distances < -max_deviation)),
+        "above": int(np.count_nonzero(distances > max_deviation))
+    }
+
+
+def tolerance_bands(distances, tolerance):
+    """Counts of distances under, within and over a +-tolerance band"""
+    distances = np.asarray(distances)
+    total = max(len(distances), 1)
+    under = int(np.count_nonzero(distances < -tolerance))
+    over = int(np.count_nonzero(distances > tolerance))
+    within = len(distances) - under - over
+    return {
+        "tolerance": float(tolerance),
+        "under": under,
+        "within": within,
+        "over": over,
+        "percent_under": under / total * 100,
+        "percent_within": within / total * 100,
+        "percent_over": over / total * 100
+    }
@@ -0,0 +1,229 @@
+"""Whole-file comparisons for batch runs and one-to-many ranking
+
+compare_files runs the GUI pipeline over one pair of files, and
+compare_to_reference ranks many candidate files against one reference,
+sharing its surface index. Both load the files into the mesh store of
+comparison under unique handles and release them again, so they can run
+next to the UI or on many threads and worker processes (see batch.py).
+"""
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+import profiling
+from cleanup import DEFAULT_CLEANUP
+from comparison import (MESH_STORE, load_mesh, release_mesh, get_mesh,
+                        register_meshes, get_registration_samples,
+                        get_surface_index, surface_distances, get_vertex_deviation,
+                        find_deviation_regions, hausdorff_check, compare_brep,
+                        get_nearest_distances, matching_statistics)
+from distance import distance_statistics, tolerance_bands
+from jobs import report_stage
+from tessellation import DEFAULT_TOLERANCE, DEFAULT_ANGULAR_TOLERANCE
+
+
+@profiling.profiled
+def compare_files(file_a, file_b, align=True, init='pca', source='vertices',
+                  num_samples=100000, threshold=0.1,
+                  tolerance=DEFAULT_TOLERANCE,
+                  angular_tolerance=DEFAULT_ANGULAR_TOLERANCE, lod=0,
+                  max_regions=10, brep_diff=False, cleanup=DEFAULT_CLEANUP,
+                  hausdorff=None):
+    """Compare two 3D files with the same pipeline the GUI uses
+
+    Both files are loaded (through the mesh cache), B is aligned onto A
+    unless align is False, and surface distances from A to B plus vertex
+    matching statistics at threshold are measured. The largest max_regions
+    regions of A deviating by more than threshold are listed as well
+    (0 skips them). With brep_diff=True two STEP/IGES files are compared
+    face by face instead (see compare_brep): "brep" holds the face diff,
+    "distance" covers only the changed faces of A and no regions are
+    searched; other files fall back to the full comparison. With a
+    hausdorff tolerance only the quick pass/fail check of hausdorff_check
+    runs, under "hausdorff", and no distances, regions or matching are
+    measured. cleanup is the cleanup profile both files are loaded with.
+    lod > 0 measures on coarser levels of detail for a quick preview; the
+    alignment always uses the full meshes. Returns a JSON-ready dict of
+    statistics, or a dict with an "error" key.
+    """
+    # Unique handles keep comparisons sharing a process apart
+    prefix = uuid.uuid4().hex
+    mesh_a, mesh_b = f"{prefix}-A", f"{prefix}-B"
+    try:
+        result = {"file_a": str(file_a), "file_b": str(file_b)}
+        for handle, path, suffix in ((mesh_a, file_a, 'a'), (mesh_b, file_b, 'b')):
+            entry = load_mesh(path, handle, tolerance, angular_tolerance,
+                              cleanup=cleanup)
+            if "error" in entry:
+                return {"error": f"{path}: {entry['error']}"}
+            result[f"vertices_{suffix}"] = int(len(entry.vertices))
+            result[f"triangles_{suffix}"] = int(len(entry.indices))
+
+        if align:
+            _, transformation, registration_info = register_meshes(
+                mesh_a, mesh_b, init)
+            result["registration"] = {
+                "fitness": registration_info["fitness"],
+                "inlier_rmse": registration_info["inlier_rmse"],
+                "transformation": transformation.tolist()
+            }
+
+        if lod:
+            report_stage('building LOD', 0.5)
+            result["lod"] = get_mesh(mesh_a, lod).lod
+            get_mesh(mesh_b, lod)
+
+        if hausdorff is not None:
+            result["hausdorff"] = hausdorff_check(mesh_a, mesh_b, hausdorff, lod=lod)
+            if "error" in result["hausdorff"]:
+                return {"error": result["hausdorff"]["error"]}
+            return result
+
+        by_face = False
+        if brep_diff:
+            result["brep"] = compare_brep(mesh_a, mesh_b, threshold)
+            by_face = "error" not in result["brep"]
+        if by_face:
+            # Unchanged faces are not measured at all
+            result["distance"] = result["brep"]["distance_a"]
+        elif source == 'vertices':
+            # Cached, so the region search below does not measure again
+            distances = get_vertex_deviation(mesh_a, mesh_b, lod)
+            result["distance"] = distance_statistics(distances)
+        else:
+            distances = surface_distances(mesh_a, mesh_b, source, num_samples, lod)
+            result["distance"] = distance_statistics(distances)
+
+        if max_regions and not by_face:
+            regions = find_deviation_regions(mesh_a, mesh_b, threshold,
+                                             limit=max_regions, lod=lod)
+            if "error" in regions:
+                return regions
+            result["region_count"] = regions["region_count"]
+            result["regions"] = regions["regions"]
+
+        report_stage('matching', 0.9)
+        result["matching"] = matching_statistics(
+            get_nearest_distances(mesh_a, mesh_b, lod),
+            get_nearest_distances(mesh_b, mesh_a, lod), threshold)
+        return result
+
+    except Exception as e:
+        return {"error": f"Comparison error: {str(e)}"}
+    finally:
+        release_mesh(mesh_a)
+        release_mesh(mesh_b)
+
+
+# Statistics a one-to-many comparison can be ranked by (smaller is better)
+RANK_KEYS = ('rms', 'max', 'mean', 'std')
+
+
+def _compare_candidate(reference, path, align, init, threshold, tolerance,
+                       angular_tolerance, cleanup):
+    """Load one candidate, align it onto the reference and measure it"""
+    handle = f"{uuid.uuid4().hex}-candidate"
+    result = {"name": Path(path).stem, "file": str(path)}
+    try:
+        entry = load_mesh(path, handle, tolerance, angular_tolerance,
+                          cleanup=cleanup)
+        if "error" in entry:
+            return dict(result, error=entry["error"])
+        result["vertices"] = int(len(entry.vertices))
+        result["triangles"] = int(len(entry.indices))
+
+        if align:
+            _, transformation, registration_info = register_meshes(
+                reference, handle, init)
+            result["registration"] = {
+                "fitness": registration_info["fitness"],
+                "inlier_rmse": registration_info["inlier_rmse"],
+                "transformation": transformation.tolist()
+            }
+
+        # Candidate vertices against the reference surface, whose index is shared
+        distances = surface_distances(handle, reference)
+        result["distance"] = distance_statistics(distances)
+        result["bands"] = tolerance_bands(distances, threshold)
+        return result
+
+    except Exception as e:
+        return dict(result, error=f"Comparison error: {str(e)}")
+    finally:
+        release_mesh(handle)
+
+
+@profiling.profiled
+def compare_to_reference(reference, candidates, align=True, init='pca',
+                         threshold=0.1, tolerance=DEFAULT_TOLERANCE,
+                         angular_tolerance=DEFAULT_ANGULAR_TOLERANCE,
+                         workers=None, rank_by='rms', cleanup=DEFAULT_CLEANUP):
+    """Compare many candidate files against one reference mesh
+
+    reference is a stored mesh handle or a file path. Its surface index and
+    registration samples are built once and shared by all candidates, which
+    are loaded, aligned onto the reference and measured (candidate vertices
+    to reference surface) on a pool of worker threads. Returns the
+    candidates ranked by the rank_by distance statistic, best first, each
+    with its distance statistics and the vertex counts within +-threshold;
+    failed candidates come last with an "error" key. Files are loaded with
+    the cleanup profile cleanup.
+    """
+    if rank_by not in RANK_KEYS:
+        return {"error": f"Unknown ranking: {rank_by}"}
+
+    reference_name = str(reference)
+    handle = None
+    if not (isinstance(reference, str) and reference in MESH_STORE):
+        handle = f"{uuid.uuid4().hex}-reference"
+    try:
+        if handle is not None:
+            entry = load_mesh(reference, handle, tolerance, angular_tolerance,
+                              cleanup=cleanup)
+            if "error" in entry:
+                return {"error": f"{reference}: {entry['error']}"}
+            reference = handle
+
+        # Shared, read-only data of the reference is built before the workers start
+        report_stage('building reference index', 0.05,
+                     triangles=len(get_mesh(reference).indices))
+        get_surface_index(reference)
+        if align:
+            get_registration_samples(reference)
+
+        candidates = list(candidates)
+        workers = max(1, min(len(candidates), workers or os.cpu_count() or 1))
+        results = [None] * len(candidates)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(_compare_candidate, reference, path, align, init,
+                                   float(threshold), tolerance, angular_tolerance,
+                                   cleanup): index
+                       for index, path in enumerate(candidates)}
+            try:
+                for done, future in enumerate(as_completed(futures), start=1):
+                    results[futures[future]] = future.result()
+                    # Progress and cancellation of the job run on this thread
+                    report_stage(f'candidate {done}/{len(candidates)}',
+                                 0.1 + 0.9 * done / len(candidates))
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+
+        ranked = sorted(results, key=lambda result: (
+            "error" in result, result.get("distance", {}).get(rank_by, 0.0)))
+        for rank, result in enumerate(ranked, start=1):
+            result["rank"] = rank
+        return {
+            "reference": reference_name,
+            "rank_by": rank_by,
+            "threshold": float(threshold),
+            "candidates": ranked
+        }
+
+    except Exception as e:
+        return {"error": f"Comparison error: {str(e)}"}
+    finally:
+        if handle is not None:
+            release_mesh(handle)
@@ -0,0 +1,109 @@
+"""Early-exit check of the Hausdorff distance against a tolerance
+
+A QA gate only needs to know whether every point of one mesh lies within
+a tolerance of the other's surface, not every distance. check_directed
+decides that without measuring every point exactly:
+
+* Points are grouped into grid cells. The distance to a surface changes
+  no faster than the point moves, so the distance d of one point of a cell
+  bounds the others: d <= distance <= d + cell radius. Cells whose upper
+  bound is within tolerance are settled without querying the rest of their
+  points; the others are split into cells of half the size.
+* Cell representatives are first bounded cheaply against the triangle
+  with the nearest centroid (SurfaceIndex.distance_bounds); only those
+  this does not settle are measured exactly.
+* Representatives are processed in random batches of growing size, so a
+  part that is out of tolerance anywhere is rejected by the first batch
+  that proves one point farther away than the tolerance.
+"""
+import numpy as np
+
+from cleanup import group_cells
+
+# Representatives in the first batch; every next batch is BATCH_GROWTH times larger
+FIRST_BATCH = 1024
+BATCH_GROWTH = 4
+
+# Radius of the first grid cells as a fraction of the tolerance
+CELL_FRACTION = 0.5
+
+# Cells are not split below this fraction of the tolerance; the points
+# still open then are measured one by one
+MIN_CELL_FRACTION = 1e-3
+
+
+def _cell_radii(points, active, first, labels):
+    """Largest distance of the points of each cell from its representative"""
+    offsets = points[active] - points[active[first]][labels]
+    radii = np.zeros(len(first))
+    np.maximum.at(radii, labels, np.linalg.norm(offsets, axis=1))
+    return radii
+
+
+def check_directed(points, index, tolerance, seed=0):
+    """Decide whether every point lies within tolerance of an indexed surface
+
+    index is a distance.SurfaceIndex. Returns a dict with the verdict
+    "passed" and bounds on the largest distance: some point is at least
+    lower_bound away, and no point more than upper_bound (None when
+    failed). queried_points counts the points bounded and measured_points
+    those measured exactly.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    rng = np.random.default_rng(seed)
+    lower = upper = 0.0
+    queried = measured = 0
+    batch = FIRST_BATCH
+    active = np.arange(len(points))
+    cell = CELL_FRACTION * tolerance / np.sqrt(3)
+
+    def verdict(passed):
+        return {"passed": passed, "lower_bound": lower,
+                "upper_bound": upper if passed else None, "points": len(points),
+                "queried_points": queried, "measured_points": measured}
+
+    while len(active):
+        if cell > MIN_CELL_FRACTION * tolerance / np.sqrt(3):
+            cells = np.floor(points[active] / cell).astype(np.int64)
+            first, labels = group_cells(cells)
+            radii = _cell_radii(points, active, first, labels)
+        else:
+            first = labels = np.arange(len(active))
+            radii = np.zeros(len(active))
+        representatives = active[first]
+
+        # Upper bounds of the representatives' distances
+        distances = np.empty(len(first))
+        order = rng.permutation(len(first))
+        start = 0
+        while start < len(order):
+            chunk = order[start:start + batch]
+            start += len(chunk)
+            batch *= BATCH_GROWTH
+
+            chunk_points = points[representatives[chunk]]
+            low, high = index.distance_bounds(chunk_points)
+            queried += len(chunk)
+            unsettled = (high + radii[chunk] > tolerance) & (low < high)
+            if unsettled.any():
+                exact = np.abs(index.query(chunk_points[unsettled])[0])
+                low[unsettled] = high[unsettled] = exact
+                measured += int(np.count_nonzero(unsettled))
+
+            lower = max(lower, float(low.max()))
+            if lower > tolerance:
+                return verdict(False)
+            distances[chunk] = high
+
+        bounds = distances + radii
+        settled = bounds <= tolerance
+        upper = max(upper, float(bounds[settled].max(initial=0.0)),
+                    float(distances[~settled].max(initial=0.0)))
+
+        # The other points of open cells go on in smaller cells
+        remaining = ~settled[labels]
+        remaining[first] = False
+        active = active[remaining]
+        cell /= 2
+
+    return verdict(True)
@@ -0,0 +1,181 @@
+"""Background jobs for long-running backend calls
+
+Work runs on a thread pool so the Eel event loop stays responsive. Job
+functions report their stages through report(), which records stage timings,
+queues a progress event and is also where a cancelled job stops. Events are
+collected in a thread-safe queue and delivered to the UI by the caller (see
+main.py), because Eel's websocket must only be used from its own loop.
+"""
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import profiling
+
+_current = threading.local()
+
+
+class JobCancelled(BaseException):
+    """Raised inside a job at its next report() once it has been cancelled
+
+    Derives from BaseException so the generic `except Exception` error
+    handling of the backend functions does not swallow it.
+    """
+
+
+def current_job():
+    """Job running on the calling thread, or None outside of a job"""
+    return getattr(_current, 'job', None)
+
+
+def report(stage, progress=None):
+    """Record the start of a stage of the current job; no-op outside jobs"""
+    job = current_job()
+    if job is not None:
+        job.enter_stage(stage, progress)
+
+
+def report_stage(stage, progress=None, **sizes):
+    """Mark the start of a pipeline stage for job progress and profiling"""
+    report(stage, progress)
+    profiling.mark(stage, **sizes)
+
+
+class Job:
+    """State of a single background job"""
+
+    def __init__(self, job_id, kind, events):
+        self.id = job_id
+        self.kind = kind
+        self.state = 'queued'
+        self.stage = None
+        self.progress = 0.0
+        self.timings = []
+        self.result = None
+        self.error = None
+        self.future = None
+        self._events = events
+        self._cancel = threading.Event()
+        self._stage_start = None
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+        # Jobs still waiting in the queue never start
+        if self.future is not None and self.future.cancel():
+            self._finish('cancelled')
+
+    def _close_stage(self):
+        if self.stage is not None and self._stage_start is not None:
+            self.timings.append({
+                "stage": self.stage,
+                "seconds": time.perf_counter() - self._stage_start
+            })
+
+    def enter_stage(self, stage, progress=None):
+        if self.cancelled:
+            raise JobCancelled(self.id)
+
+        self._close_stage()
+        self.stage = stage
+        self._stage_start = time.perf_counter()
+        if progress is not None:
+            self.progress = float(progress)
+        self._emit('progress')
+
+    def _emit(self, event_type, **data):
+        event = {
+            "type": event_type,
+            "job_id": self.id,
+            "kind": self.kind,
+            "state": self.state,
+            "stage": self.stage,
+            "progress": self.progress,
+            "timings": list(self.timings)
+        }
+        event.update(data)
+        self._events.put(event)
+
+    def _finish(self, state, **data):
+        self._close_stage()
+        self.stage = None
+        self.state = state
+        if state == 'done':
+            self.progress = 1.0
+        self._emit(state, **data)
+
+    def run(self, func, args, kwargs):
+        if self.cancelled:
+            # Cancelled after the pool picked the job up, too late for
+            # future.cancel(); the UI still needs its final event
+            self._finish('cancelled')
+            return
+
+        _current.job = self
+        self.state = 'running'
+        try:
+            self.enter_stage('start', 0.0)
+            self.result = func(*args, **kwargs)
+            self._finish('done', result=self.result)
+        except JobCancelled:
+            self._finish('cancelled')
+        except Exception as e:
+            self.error = str(e)
+            self._finish('error', error=self.error)
+        finally:
+            _current.job = None
+
+
+class JobManager:
+    """Runs jobs on a worker pool and queues their events"""
+
+    def __init__(self, max_workers=4):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='job')
+        self._events = queue.Queue()
+        self._jobs = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def submit(self, kind, func, *args, **kwargs):
+        """Queue func(*args, **kwargs) and return the new job id at once"""
+        with self._lock:
+            job_id = f"job-{next(self._ids)}"
+            job = Job(job_id, kind, self._events)
+            self._jobs[job_id] = job
+        job.future = self._executor.submit(job.run, func, args, kwargs)
+        return job_id
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """Request cancellation; running jobs stop at their next stage"""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return False
+        job.cancel()
+        return True
+
+    def forget(self, job_id):
+        """Drop a finished job and its result"""
+        self._jobs.pop(job_id, None)
+
+    def drain_events(self):
+        """Return all events queued since the last call"""
+        events = []
+        while True:
+            try:
+                events.append(self._events.get_nowait())
+            except queue.Empty:
+                return events
+
+    def shutdown(self):
+        for job in list(self._jobs.values()):
+            job.cancel()
+        self._executor.shutdown(wait=False)
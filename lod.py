@@ -0,0 +1,128 @@
+"""Level-of-detail pyramids of indexed triangle meshes
+
+Level 0 is the full mesh; every further level has about LOD_REDUCTION times
+fewer triangles than the one before, down to LOD_MIN_TRIANGLES or less (see
+lod_targets). The viewer is sent the coarsest level first and then the
+finer ones, and the comparison functions can run on a coarse level for
+quick previews.
+
+Levels are built with vectorized vertex clustering by default, which takes
+well under a second for million-triangle meshes. method='quadric' uses
+Open3D's quadric decimation instead, which keeps features better but is
+several times slower.
+"""
+import numpy as np
+
+from mesh_utils import compute_vertex_normals, face_areas
+
+# The coarsest level has at most this many triangles; smaller meshes get no
+# extra levels
+LOD_MIN_TRIANGLES = 50000
+
+# Triangle count ratio between consecutive levels
+LOD_REDUCTION = 4
+
+LOD_METHODS = ['clustering', 'quadric']
+
+
+def cluster_vertices(vertices, triangles, cell_size):
+    """Merge the vertices in each cubic grid cell into their mean
+
+    Triangles that collapse or duplicate another triangle are dropped.
+    Returns (vertices, triangles) as float32/uint32 arrays.
+    """
+    vertices = np.asarray(vertices, dtype=np.float32)
+    cells = np.floor((vertices - vertices.min(axis=0)) / cell_size).astype(np.int64)
+    dims = cells.max(axis=0) + 1
+    keys = (cells[:, 0] * dims[1] + cells[:, 1]) * dims[2] + cells[:, 2]
+    _, cluster = np.unique(keys, return_inverse=True)
+    cluster = cluster.reshape(-1)
+
+    counts = np.bincount(cluster).astype(np.float64)
+    merged = np.column_stack([
+        np.bincount(cluster, weights=vertices[:, axis]) / counts
+        for axis in range(3)]).astype(np.float32)
+
+    triangles = cluster[np.asarray(triangles, dtype=np.int64)]
+    keep = ((triangles[:, 0] != triangles[:, 1]) & (triangles[:, 1] != triangles[:, 2])
+            & (triangles[:, 0] != triangles[:, 2]))
+    triangles = triangles[keep]
+
+    # Opposite windings of the same corners are different triangles
+    rotation = np.argmin(triangles, axis=1)
+    canonical = triangles[np.arange(len(triangles))[:, None],
+                          (rotation[:, None] + np.arange(3)) % 3]
+    if len(merged) < 2 ** 21:
+        # Pack the three indices into one int64 key; much faster than axis=0
+        canonical = (canonical[:, 0] << 42) | (canonical[:, 1] << 21) | canonical[:, 2]
+        _, first = np.unique(canonical, return_index=True)
+    else:
+        _, first = np.unique(canonical, axis=0, return_index=True)
+    triangles = triangles[np.sort(first)]
+
+    # Drop clusters that are no longer used by any triangle
+    used, remap = np.unique(triangles, return_inverse=True)
+    return merged[used], remap.reshape(-1, 3).astype(np.uint32)
+
+
+def _decimate_clustering(vertices, triangles, target_triangles):
+    area = float(face_areas(vertices, triangles).sum(dtype=np.float64))
+    if area == 0:
+        return vertices, triangles
+    # A regular grid of spacing c has about 2 / c^2 triangles per unit area
+    cell_size = np.sqrt(2 * area / target_triangles)
+    for _ in range(3):
+        reduced = cluster_vertices(vertices, triangles, cell_size)
+        if len(reduced[1]) <= 1.5 * target_triangles:
+            break
+        cell_size *= np.sqrt(len(reduced[1]) / target_triangles)
+    return reduced
+
+
+def _decimate_quadric(vertices, triangles, target_triangles):
+    import open3d as o3d
+
+    mesh = o3d.geometry.TriangleMesh(
+        o3d.utility.Vector3dVector(np.asarray(vertices, dtype=np.float64)),
+        o3d.utility.Vector3iVector(np.asarray(triangles, dtype=np.int32)))
+    mesh = mesh.simplify_quadric_decimation(int(target_triangles))
+    mesh.remove_unreferenced_vertices()
+    return (np.asarray(mesh.vertices, dtype=np.float32),
+            np.asarray(mesh.triangles, dtype=np.uint32))
+
+
+def decimate(vertices, triangles, target_triangles, method='clustering'):
+    """Reduce a mesh to about target_triangles triangles
+
+    Returns (vertices, triangles). 'quadric' falls back to clustering when
+    Open3D is not available.
+    """
+    if method not in LOD_METHODS:
+        raise ValueError(f"Unknown LOD method: {method}")
+    if method == 'quadric':
+        try:
+            return _decimate_quadric(vertices, triangles, target_triangles)
+        except ImportError:
+            pass
+    return _decimate_clustering(vertices, triangles, target_triangles)
+
+
+def lod_targets(triangle_count, min_triangles=LOD_MIN_TRIANGLES,
+                reduction=LOD_REDUCTION):
+    """Triangle targets of levels 1, 2, ... for a mesh of triangle_count"""
+    targets = []
+    target = triangle_count
+    while target > min_triangles:
+        target //= reduction
+        targets.append(target)
+    return targets
+
+
+def build_lod_level(vertices, triangles, target_triangles, method='clustering'):
+    """One level of detail as (vertices, normals, triangles)
+
+    Levels are decimated from the full mesh rather than from each other, so
+    the coarsest level can be built first and errors do not accumulate.
+    """
+    vertices, triangles = decimate(vertices, triangles, target_triangles, method)
+    return vertices, compute_vertex_normals(vertices, triangles), triangles
@@ -0,0 +1,146 @@
+"""Compact indexed triangle mesh container
+
+Mesh holds contiguous float32 positions/normals and uint32 indices, the
+layout every stage of the pipeline works on, so arrays pass between the
+loaders, the mesh store, the comparison functions and the binary transport
+without conversion. Derived geometry (bounds, face normals and areas) is
+computed on first use, and data that depends on other meshes or libraries
+(KD-trees, surface indexes, levels of detail) is kept in the derived dict.
+Conversion to Open3D happens only at that boundary, in to_open3d.
+
+For the helpers written against mesh data dicts, mesh["vertices"] and
+friends work too.
+"""
+import numpy as np
+
+from mesh_utils import compute_vertex_normals, face_normals_and_areas
+
+
+def as_float32(values):
+    """(n, 3) contiguous float32 view of values, copying only if needed"""
+    return np.ascontiguousarray(np.asarray(values, dtype=np.float32).reshape(-1, 3))
+
+
+def as_uint32(values):
+    """(m, 3) contiguous uint32 view of values, copying only if needed"""
+    return np.ascontiguousarray(np.asarray(values, dtype=np.uint32).reshape(-1, 3))
+
+
+class Mesh:
+    """Indexed triangle mesh with float32 vertices and uint32 indices"""
+
+    __slots__ = ('vertices', 'indices', 'derived', 'version', 'lod',
+                 '_normals', '_bounds', '_face_normals', '_face_areas')
+
+    # Names readable with mesh[key], as on mesh data dicts
+    KEYS = ('vertices', 'normals', 'indices', 'derived', 'version', 'lod')
+
+    def __init__(self, vertices, indices, normals=None, version=None, lod=0):
+        self.vertices = as_float32(vertices)
+        self.indices = as_uint32(indices)
+        # Lazily filled cache for data derived from the arrays (trees, LODs)
+        self.derived = {}
+        self.version = version
+        self.lod = lod
+        self._normals = None if normals is None else as_float32(normals)
+        if self._normals is not None and len(self._normals) != len(self.vertices):
+            # Legacy callers may send no (or stale) normals
+            self._normals = None
+        self._bounds = None
+        self._face_normals = None
+        self._face_areas = None
+
+    @classmethod
+    def from_data(cls, mesh_data, version=None):
+        """Mesh from a mesh data dict of lists or arrays (or another Mesh)"""
+        if isinstance(mesh_data, Mesh):
+            return cls(mesh_data.vertices, mesh_data.indices, mesh_data._normals,
+                       version, mesh_data.lod)
+        return cls(mesh_data['vertices'], mesh_data['indices'],
+                   mesh_data.get('normals'), version)
+
+    @classmethod
+    def from_open3d(cls, o3d_mesh):
+        normals = (np.asarray(o3d_mesh.vertex_normals)
+                   if o3d_mesh.has_vertex_normals() else None)
+        return cls(np.asarray(o3d_mesh.vertices), np.asarray(o3d_mesh.triangles),
+                   normals)
+
+    def to_open3d(self):
+        """Open3D TriangleMesh of this mesh (Open3D needs float64/int32 copies)"""
+        import open3d as o3d
+
+        o3d_mesh = o3d.geometry.TriangleMesh(
+            o3d.utility.Vector3dVector(self.vertices.astype(np.float64)),
+            o3d.utility.Vector3iVector(self.indices.astype(np.int32)))
+        o3d_mesh.vertex_normals = o3d.utility.Vector3dVector(
+            self.normals.astype(np.float64))
+        return o3d_mesh
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, key):
+        if key not in self.KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key):
+        return key in self.KEYS
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.KEYS else default
+
+    @property
+    def normals(self):
+        """Vertex normals; area weighted from the faces if none were given"""
+        if self._normals is None:
+            self._normals = compute_vertex_normals(self.vertices, self.indices)
+        return self._normals
+
+    @property
+    def bounds(self):
+        """(min corner, max corner) of the vertices"""
+        if self._bounds is None:
+            if len(self.vertices):
+                self._bounds = (self.vertices.min(axis=0), self.vertices.max(axis=0))
+            else:
+                self._bounds = (np.zeros(3, np.float32), np.zeros(3, np.float32))
+        return self._bounds
+
+    def _compute_faces(self):
+        self._face_normals, self._face_areas = face_normals_and_areas(
+            self.vertices, self.indices)
+
+    @property
+    def face_normals(self):
+        """Unit normal of each triangle (zero for degenerate triangles)"""
+        if self._face_normals is None:
+            self._compute_faces()
+        return self._face_normals
+
+    @property
+    def face_areas(self):
+        """Area of each triangle"""
+        if self._face_areas is None:
+            self._compute_faces()
+        return self._face_areas
+
+    @property
+    def area(self):
+        return float(self.face_areas.sum(dtype=np.float64))
+
+    @property
+    def nbytes(self):
+        """Bytes held by the mesh arrays (without derived data)"""
+        arrays = [self.vertices, self.indices, self._normals,
+                  self._face_normals, self._face_areas]
+        return sum(array.nbytes for array in arrays if array is not None)
+
+    def transformed(self, transformation):
+        """Copy moved by a 4x4 rigid transformation, sharing the indices"""
+        transformation = np.asarray(transformation, dtype=np.float64)
+        rotation = transformation[:3, :3].astype(np.float32)
+        translation = transformation[:3, 3].astype(np.float32)
+        return Mesh(self.vertices @ rotation.T + translation, self.indices,
+                    None if self._normals is None else self._normals @ rotation.T)
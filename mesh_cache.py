@@ -0,0 +1,133 @@
+"""Persistent on-disk cache of processed meshes
+
+Entries are keyed by a hash of the source file bytes plus the processing
+parameters, so a repeat load of the same file revision skips CadQuery and
+Open3D entirely. Each entry is an uncompressed .npz holding the float32
+vertices/normals and uint32 indices, plus the B-rep face data of STEP/IGES
+meshes when there is any. The cache is kept under a size limit
+by evicting the least recently used entries.
+"""
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from brep_diff import FACE_ARRAYS
+
+# Arrays stored per cache entry
+CACHE_ARRAYS = ('vertices', 'normals', 'indices')
+
+# Arrays stored only when the mesh has them
+OPTIONAL_ARRAYS = FACE_ARRAYS
+
+# Default size limit (2 GB), overridable with MESH_CACHE_MAX_BYTES
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+
+def content_hash():
+    """New running hash of file contents, the first part of a cache key"""
+    return hashlib.blake2b(digest_size=20)
+
+
+class MeshCache:
+    """Content-addressed .npz cache with LRU eviction"""
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def key_for(self, file_path, params=None, content_digest=None):
+        """Hash the file contents together with the processing parameters
+
+        content_digest is an optional content_hash() already fed with the
+        file bytes (e.g. while it was uploaded), so the file is not re-read.
+        """
+        if content_digest is not None:
+            digest = content_digest.copy()
+        else:
+            digest = content_hash()
+            with open(file_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(chunk)
+
+        # Sorted JSON keeps the key stable regardless of dict order
+        digest.update(json.dumps(params or {}, sort_keys=True).encode('utf-8'))
+        digest.update(Path(file_path).suffix.lower().encode('utf-8'))
+        return digest.hexdigest()
+
+    def _entry_path(self, key):
+        return self.cache_dir / f"{key}.npz"
+
+    def get(self, key):
+        """Return the cached arrays for key, or None on a miss"""
+        if not self.enabled:
+            return None
+
+        path = self._entry_path(key)
+        try:
+            with np.load(path) as data:
+                arrays = {name: data[name] for name in CACHE_ARRAYS}
+                arrays.update((name, data[name]) for name in OPTIONAL_ARRAYS
+                              if name in data.files)
+        except (OSError, KeyError, ValueError):
+            return None
+
+        # Touch the entry so eviction sees it as recently used
+        os.utime(path)
+        return arrays
+
+    def put(self, key, arrays):
+        """Store arrays under key and evict old entries beyond the size limit"""
+        if not self.enabled:
+            return
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self._entry_path(key)
+
+        # Write to a temporary file first so readers never see partial entries.
+        # Its name is unique, since threads and batch worker processes may
+        # store the same key at the same time.
+        with tempfile.NamedTemporaryFile(dir=self.cache_dir, prefix=path.stem,
+                                         suffix='.tmp', delete=False) as f:
+            temp_path = f.name
+            try:
+                np.savez(f, **{name: arrays[name] for name in CACHE_ARRAYS},
+                         **{name: arrays[name] for name in OPTIONAL_ARRAYS
+                            if arrays.get(name) is not None})
+            except BaseException:
+                f.close()
+                os.unlink(temp_path)
+                raise
+        os.replace(temp_path, path)
+
+        self.evict()
+
+    def evict(self):
+        """Delete least recently used entries until under max_bytes"""
+        entries = []
+        for path in self.cache_dir.glob('*.npz'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                # Evicted by a concurrent writer
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def clear(self):
+        """Remove every cache entry"""
+        for path in self.cache_dir.glob('*.npz'):
+            path.unlink(missing_ok=True)
@@ -0,0 +1,125 @@
+"""Vectorized helpers for indexed triangle meshes
+
+Meshes are passed around as (n, 3) float32 vertex arrays and (m, 3) uint32
+triangle index arrays.
+"""
+import numpy as np
+
+
+def compute_vertex_normals(vertices, triangles):
+    """Area-weighted vertex normals from an indexed triangle mesh"""
+    tri_vertices = vertices[triangles]
+    # Cross product length is twice the triangle area, so summing the raw
+    # face normals weights each face by its area
+    face_normals = np.cross(tri_vertices[:, 1] - tri_vertices[:, 0],
+                            tri_vertices[:, 2] - tri_vertices[:, 0])
+
+    normals = np.zeros((len(vertices), 3), dtype=np.float64)
+    flat_indices = triangles.reshape(-1)
+    for axis in range(3):
+        normals[:, axis] = np.bincount(
+            flat_indices, weights=np.repeat(face_normals[:, axis], 3),
+            minlength=len(vertices))
+
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    lengths[lengths == 0] = 1
+    return (normals / lengths).astype(np.float32)
+
+
+def face_normals_and_areas(vertices, triangles):
+    """Unit normal (zero for degenerate triangles) and area of each triangle
+
+    Both come from the same cross product, which is normalized in place.
+    """
+    corners = np.asarray(vertices)[np.asarray(triangles)]
+    normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    del corners
+    if normals.dtype.kind != 'f':
+        normals = normals.astype(np.float64)
+    lengths = np.linalg.norm(normals, axis=1)
+    areas = 0.5 * lengths
+    lengths[lengths == 0] = 1
+    normals /= lengths[:, None]
+    return normals, areas
+
+
+def face_normals(vertices, triangles):
+    """Unit normals of each triangle (zero for degenerate triangles)"""
+    return face_normals_and_areas(vertices, triangles)[0]
+
+
+def face_areas(vertices, triangles):
+    """Area of each triangle"""
+    return face_normals_and_areas(vertices, triangles)[1]
+
+
+def sample_surface(vertices, triangles, count, seed=0, areas=None):
+    """Area-weighted uniform random points on the mesh surface
+
+    areas (e.g. Mesh.face_areas) saves recomputing the triangle areas.
+    """
+    if areas is None:
+        areas = face_areas(vertices, triangles)
+    areas = np.asarray(areas, dtype=np.float64)
+
+    rng = np.random.default_rng(seed)
+    chosen = rng.choice(len(triangles), size=count, p=areas / areas.sum())
+
+    # Fold points from the unit square back into the triangle
+    u, v = rng.random((2, count))
+    outside = u + v > 1
+    u[outside], v[outside] = 1 - u[outside], 1 - v[outside]
+
+    # Only the chosen triangles are gathered, in float64 for the interpolation
+    corners = np.asarray(vertices)[np.asarray(triangles)[chosen]].astype(np.float64)
+    a, b, c = corners[:, 0], corners[:, 1], corners[:, 2]
+    return a + (b - a) * u[:, None] + (c - a) * v[:, None]
+
+
+def unique_rows(points):
+    """Exact unique float32 rows of points and the inverse mapping"""
+    # Adding 0.0 turns -0.0 into 0.0 so both compare equal bit-wise
+    points = np.ascontiguousarray(points, dtype=np.float32) + 0.0
+    if len(points) == 0:
+        return points, np.zeros(0, dtype=np.uint32)
+
+    # Sorting the raw bit patterns is much faster than np.unique(axis=0)
+    bits = points.view(np.uint32)
+    order = np.lexsort((bits[:, 2], bits[:, 1], bits[:, 0]))
+    sorted_bits = bits[order]
+
+    is_new = np.empty(len(order), dtype=bool)
+    is_new[0] = True
+    np.any(sorted_bits[1:] != sorted_bits[:-1], axis=1, out=is_new[1:])
+
+    inverse = np.empty(len(order), dtype=np.uint32)
+    inverse[order] = np.cumsum(is_new) - 1
+    return points[order[is_new]], inverse
+
+
+def weld_vertices(tri_vertices):
+    """Merge identical triangle corners into shared vertices
+
+    tri_vertices is an (n, 3, 3) array of per-triangle corner positions.
+    Returns (vertices, triangles) with uint32 indices.
+    """
+    vertices, inverse = unique_rows(tri_vertices.reshape(-1, 3))
+    return vertices, inverse.reshape(-1, 3)
+
+
+def merge_duplicate_vertices(vertices, triangles, return_kept=False):
+    """Merge coincident vertices of an indexed mesh and drop the triangles
+    that collapse as a result
+
+    With return_kept=True a boolean mask of the kept input triangles is
+    returned as well, for carrying per-triangle data along.
+    """
+    vertices, inverse = unique_rows(vertices)
+    triangles = inverse[np.asarray(triangles, dtype=np.int64)].reshape(-1, 3)
+
+    kept = ~((triangles[:, 0] == triangles[:, 1]) |
+             (triangles[:, 1] == triangles[:, 2]) |
+             (triangles[:, 0] == triangles[:, 2]))
+    if return_kept:
+        return vertices, triangles[kept], kept
+    return vertices, triangles[kept]
@@ -0,0 +1,260 @@
+"""Vectorized, streaming Wavefront OBJ reader
+
+The file is read in chunks of whole lines. Within a chunk, the v, vn and f
+lines are picked out with byte masks and parsed in bulk with
+np.fromstring, after blanking out # comments (also trailing ones, as in
+"f 1 2 3 # lid"); faces are fan-triangulated without a Python loop. Only the
+parsed arrays are kept between chunks, so the temporary memory stays
+bounded by the chunk size even for multi-GB scan exports.
+
+A position that is used with different vn normals is split into one vertex
+per (position, normal) pair, as Three.js needs one normal per vertex.
+Corners without a vn index get the area-weighted normal of their position.
+"""
+import warnings
+
+import numpy as np
+
+from mesh_utils import compute_vertex_normals
+
+# Bytes read per chunk (rounded to whole lines)
+CHUNK_BYTES = 16 * 1024 * 1024
+
+_SPACE, _TAB, _NEWLINE, _RETURN = ord(' '), ord('\t'), ord('\n'), ord('\r')
+_HASH = ord('#')
+
+
+def _parse_numbers(data, dtype):
+    """Parse whitespace separated numbers, raising on anything else"""
+    with warnings.catch_warnings():
+        # NumPy only warns (and stops early) on malformed text
+        warnings.simplefilter('error', DeprecationWarning)
+        return np.fromstring(data, dtype=dtype, sep=' ')
+
+
+def _tokens_per_line(buf):
+    """Whitespace separated tokens on each newline terminated line of buf"""
+    is_space = ((buf == _SPACE) | (buf == _TAB) | (buf == _NEWLINE)
+                | (buf == _RETURN))
+    starts = ~is_space
+    starts[1:] &= is_space[:-1]
+    counts = np.cumsum(starts)[buf == _NEWLINE]
+    return np.diff(counts, prepend=0)
+
+
+def _first_columns(values, counts, columns):
+    """First columns values of each line, given the value count per line"""
+    if np.all(counts == columns):
+        return values.reshape(-1, columns)
+    if np.any(counts < columns):
+        raise ValueError(f"OBJ line with fewer than {columns} values")
+    offsets = np.cumsum(counts) - counts
+    return values[offsets[:, None] + np.arange(columns)]
+
+
+def _resolve(indices, defined_before):
+    """Convert 1-based (or negative, relative) OBJ indices to 0-based"""
+    return np.where(indices < 0, defined_before + indices, indices - 1)
+
+
+class _ChunkLines:
+    """Line layout of a chunk and byte masks selecting lines by keyword"""
+
+    def __init__(self, chunk):
+        self.buf = np.frombuffer(chunk, dtype=np.uint8).copy()
+        ends = np.flatnonzero(self.buf == _NEWLINE)
+        self.starts = np.concatenate([[0], ends[:-1] + 1])
+        self.lengths = ends + 1 - self.starts
+        self._blank_comments()
+
+        # First three bytes of each line (padded for short lines)
+        padded = np.concatenate([self.buf, np.zeros(3, dtype=np.uint8)])
+        head = padded[self.starts[:, None] + np.arange(3)]
+        blank = (head == _SPACE) | (head == _TAB)
+        self.is_v = (head[:, 0] == ord('v')) & blank[:, 1]
+        self.is_vn = (head[:, 0] == ord('v')) & (head[:, 1] == ord('n')) & blank[:, 2]
+        self.is_f = (head[:, 0] == ord('f')) & blank[:, 1]
+
+    def _blank_comments(self):
+        """Replace everything from a # to the end of its line with spaces"""
+        hashes = self.buf == _HASH
+        if not hashes.any():
+            return
+        seen = np.cumsum(hashes)
+        before_line = np.repeat(seen[self.starts] - hashes[self.starts], self.lengths)
+        comment = (seen > before_line) & (self.buf != _NEWLINE)
+        self.buf[comment] = _SPACE
+
+    def select(self, mask, keyword_length):
+        """Bytes of the lines in mask with their keyword blanked out"""
+        starts = self.starts[mask]
+        for offset in range(keyword_length):
+            self.buf[starts + offset] = _SPACE
+        return self.buf[np.repeat(mask, self.lengths)]
+
+
+def _face_corners(selected):
+    """Corner counts and (vertex, normal) indices of the selected f lines
+
+    normal indices are 0 when a corner has none. All faces of a chunk must
+    use the same v, v/vt, v//vn or v/vt/vn layout.
+    """
+    corner_counts = _tokens_per_line(selected)
+    slash_counts = np.diff(np.cumsum(selected == ord('/'))[selected == _NEWLINE],
+                           prepend=0)
+    fields = slash_counts[0] // corner_counts[0] + 1
+    if fields > 3 or np.any(slash_counts != corner_counts * (fields - 1)):
+        raise ValueError("OBJ faces mix index layouts")
+
+    text = selected.tobytes().replace(b'//', b'/0/').replace(b'/', b' ')
+    values = _parse_numbers(text, np.int64)
+    total = int(corner_counts.sum())
+    if len(values) != total * fields:
+        raise ValueError("OBJ faces mix index layouts")
+    values = values.reshape(total, fields)
+    normals = values[:, 2] if fields >= 3 else np.zeros(total, dtype=np.int64)
+    return corner_counts, values[:, 0], normals
+
+
+def _face_corners_by_line(selected):
+    """Line by line fallback of _face_corners for mixed index layouts"""
+    corner_counts, corner_v, corner_n = [], [], []
+    for line in selected.tobytes().splitlines():
+        tokens = line.split()
+        corner_counts.append(len(tokens))
+        for token in tokens:
+            fields = token.split(b'/')
+            corner_v.append(int(fields[0]))
+            corner_n.append(int(fields[2]) if len(fields) >= 3 and fields[2] else 0)
+    return (np.array(corner_counts, dtype=np.int64),
+            np.array(corner_v, dtype=np.int64), np.array(corner_n, dtype=np.int64))
+
+
+def fan_triangulate(corner_counts):
+    """Corner offsets (m, 3) of the fan triangles of faces with the given sizes"""
+    if np.any(corner_counts < 3):
+        raise ValueError("OBJ face with fewer than 3 vertices")
+    first = np.cumsum(corner_counts) - corner_counts
+    fans = corner_counts - 2
+    face = np.repeat(np.arange(len(corner_counts)), fans)
+    step = np.arange(len(face)) - np.repeat(np.cumsum(fans) - fans, fans) + 1
+    base = first[face]
+    return np.column_stack([base, base + step, base + step + 1])
+
+
+class _ObjParser:
+    """Accumulates positions, normals and triangle corners chunk by chunk"""
+
+    def __init__(self):
+        self.positions = []
+        self.normals = []
+        self.triangles_v = []
+        self.triangles_n = []
+        self.num_positions = 0
+        self.num_normals = 0
+
+    def parse_chunk(self, chunk):
+        lines = _ChunkLines(chunk)
+        # Positions / normals defined before each line, for relative indices
+        positions_before = self.num_positions + np.cumsum(lines.is_v) - lines.is_v
+        normals_before = self.num_normals + np.cumsum(lines.is_vn) - lines.is_vn
+
+        if lines.is_v.any():
+            selected = lines.select(lines.is_v, 1)
+            values = _parse_numbers(selected.tobytes(), np.float64)
+            positions = _first_columns(values, _tokens_per_line(selected), 3)
+            self.positions.append(positions.astype(np.float32))
+            self.num_positions += len(positions)
+
+        if lines.is_vn.any():
+            selected = lines.select(lines.is_vn, 2)
+            values = _parse_numbers(selected.tobytes(), np.float64)
+            normals = _first_columns(values, _tokens_per_line(selected), 3)
+            self.normals.append(normals.astype(np.float32))
+            self.num_normals += len(normals)
+
+        if lines.is_f.any():
+            selected = lines.select(lines.is_f, 1)
+            try:
+                corner_counts, corner_v, corner_n = _face_corners(selected)
+            except ValueError:
+                corner_counts, corner_v, corner_n = _face_corners_by_line(selected)
+
+            corner_v = _resolve(
+                corner_v, np.repeat(positions_before[lines.is_f], corner_counts))
+            # Missing normal indices (0) become -1
+            corner_n = np.where(
+                corner_n == 0, -1,
+                _resolve(corner_n,
+                         np.repeat(normals_before[lines.is_f], corner_counts)))
+
+            triangles = fan_triangulate(corner_counts)
+            self.triangles_v.append(corner_v[triangles].astype(np.int32))
+            self.triangles_n.append(corner_n[triangles].astype(np.int32))
+
+    def finish(self):
+        """(vertices, normals, triangles) with one normal per vertex"""
+        positions = _concatenate(self.positions, (0, 3), np.float32)
+        file_normals = _concatenate(self.normals, (0, 3), np.float32)
+        triangles_v = _concatenate(self.triangles_v, (0, 3), np.int32)
+        triangles_n = _concatenate(self.triangles_n, (0, 3), np.int32)
+
+        if len(triangles_v) and (triangles_v.min() < 0
+                                 or triangles_v.max() >= len(positions)):
+            raise ValueError("OBJ face refers to a missing vertex")
+        if len(triangles_n) and triangles_n.max() >= len(file_normals):
+            raise ValueError("OBJ face refers to a missing normal")
+
+        if not np.any(triangles_n >= 0):
+            return (positions, compute_vertex_normals(positions, triangles_v),
+                    triangles_v.astype(np.uint32))
+
+        smooth_normals = None
+        if not np.all(triangles_n >= 0):
+            smooth_normals = compute_vertex_normals(positions, triangles_v)
+
+        # One output vertex per distinct (position, normal) corner pair
+        keys = (triangles_v.ravel().astype(np.int64) * (len(file_normals) + 1)
+                + (triangles_n.ravel() + 1))
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        vertex_ids = unique_keys // (len(file_normals) + 1)
+        normal_ids = unique_keys % (len(file_normals) + 1) - 1
+
+        vertices = positions[vertex_ids]
+        normals = np.empty_like(vertices)
+        has_normal = normal_ids >= 0
+        normals[has_normal] = file_normals[normal_ids[has_normal]]
+        if smooth_normals is not None:
+            normals[~has_normal] = smooth_normals[vertex_ids[~has_normal]]
+        triangles = inverse.reshape(-1, 3).astype(np.uint32)
+        return vertices, normals, triangles
+
+
+def _concatenate(arrays, empty_shape, dtype):
+    return np.concatenate(arrays) if arrays else np.zeros(empty_shape, dtype=dtype)
+
+
+def read_obj_arrays(obj_path, chunk_bytes=CHUNK_BYTES):
+    """Read an OBJ file into float32/uint32 arrays
+
+    Returns (vertices, normals, triangles) with shapes (n, 3), (n, 3), (m, 3).
+    """
+    parser = _ObjParser()
+    remainder = b''
+    with open(obj_path, 'rb') as f:
+        while True:
+            data = f.read(chunk_bytes)
+            if not data:
+                break
+            data = remainder + data
+            cut = data.rfind(b'\n') + 1
+            if cut == 0:
+                # No complete line yet (very long line); keep reading
+                remainder = data
+                continue
+            remainder = data[cut:]
+            parser.parse_chunk(data[:cut])
+
+    if remainder.strip():
+        parser.parse_chunk(remainder + b'\n')
+    return parser.finish()
@@ -0,0 +1,577 @@
+"""Out-of-core comparison of meshes larger than RAM
+
+Each mesh is converted once into memory-mapped .npy files (float32
+vertices, uint32 indices) under the mesh cache directory; binary STL files
+are streamed record by record, without welding, so a 50M-triangle scan
+never has to fit in memory. Space is cut into a grid of tiles and the
+vertices of both meshes and the triangles of the reference are bucketed by
+tile with an on-disk counting sort. Each tile of query points is then
+measured against a small SurfaceIndex / KD-tree over the reference
+triangles or vertices near the tile (the halo), so memory follows the tile
+size, not the mesh size. Tiles are sized by point count alone; the halo
+grows from the tile size up to max_distance only for the points that have
+not found their distance yet.
+
+Distances up to max_distance are exact; points further away than that are
+written as inf and only counted. Per-vertex results are written to
+memory-mapped outputs next to a summary.json of the statistics.
+"""
+import json
+import math
+import os
+import shutil
+import uuid
+from pathlib import Path
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+import comparison
+from comparison import MATCHING_RANGE, quantize_distances
+from distance import SurfaceIndex, quantize_deviation
+from jobs import report_stage
+from readers import STL_TRIANGLE_DTYPE, is_binary_stl, load_mesh_file
+from registration import apply_transform, register
+from tessellation import DEFAULT_TOLERANCE, DEFAULT_ANGULAR_TOLERANCE
+
+# Rows of a memory-mapped array processed at a time
+CHUNK_ROWS = 1 << 20
+
+# Average number of query points per occupied tile
+TILE_POINTS = 1 << 20
+
+# Vertices sampled to choose the tile size
+TILE_SIZE_SAMPLES = 200000
+
+# Vertices sampled per mesh for the registration
+REGISTRATION_SAMPLES = 50000
+
+# Level of deviation_levels.npy for the points beyond max_distance
+BEYOND_LEVEL = (1 << 16) - 1
+
+
+def chunks(count, size=CHUNK_ROWS):
+    """Consecutive slices covering range(count)"""
+    for start in range(0, count, size):
+        yield slice(start, min(start + size, count))
+
+
+class MappedMesh:
+    """Vertices and indices of a mesh as read-only memory-mapped .npy files"""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.vertices = np.load(self.directory / 'vertices.npy', mmap_mode='r')
+        self.indices = np.load(self.directory / 'indices.npy', mmap_mode='r')
+
+    def bounds(self):
+        """(min corner, max corner) of the vertices, read chunk by chunk"""
+        lower = np.full(3, np.inf)
+        upper = np.full(3, -np.inf)
+        for chunk in chunks(len(self.vertices)):
+            block = self.vertices[chunk]
+            lower = np.minimum(lower, block.min(axis=0))
+            upper = np.maximum(upper, block.max(axis=0))
+        return lower, upper
+
+
+def write_arrays(directory, vertices, indices):
+    """Write vertex/index arrays as .npy files, chunk by chunk"""
+    directory = Path(directory)
+    for name, array, dtype in (('vertices', vertices, np.float32),
+                               ('indices', indices, np.uint32)):
+        out = open_memmap(directory / f'{name}.npy', mode='w+', dtype=dtype,
+                          shape=(len(array), 3))
+        for chunk in chunks(len(array)):
+            out[chunk] = array[chunk]
+        out.flush()
+        del out
+
+
+def stream_binary_stl(stl_path, directory):
+    """Copy the corners of a binary STL into .npy files without loading it
+
+    Triangles are not welded, so every triangle has its own three vertices.
+    """
+    with open(stl_path, 'rb') as f:
+        f.seek(80)
+        num_triangles = int.from_bytes(f.read(4), 'little')
+    if os.path.getsize(stl_path) < 84 + 50 * num_triangles:
+        raise ValueError("Binary STL is truncated")
+
+    records = np.memmap(stl_path, dtype=STL_TRIANGLE_DTYPE, mode='r',
+                        offset=84, shape=(num_triangles,))
+    vertices = open_memmap(Path(directory) / 'vertices.npy', mode='w+',
+                           dtype=np.float32, shape=(3 * num_triangles, 3))
+    indices = open_memmap(Path(directory) / 'indices.npy', mode='w+',
+                          dtype=np.uint32, shape=(num_triangles, 3))
+    for chunk in chunks(num_triangles):
+        vertices[3 * chunk.start:3 * chunk.stop] = \
+            records['vertices'][chunk].reshape(-1, 3)
+        indices[chunk] = np.arange(3 * chunk.start, 3 * chunk.stop,
+                                   dtype=np.uint32).reshape(-1, 3)
+    vertices.flush()
+    indices.flush()
+
+
+def convert_mesh(file_path, tolerance=DEFAULT_TOLERANCE,
+                 angular_tolerance=DEFAULT_ANGULAR_TOLERANCE, root=None):
+    """Memory-mapped copy of a 3D file, converted once per file revision
+
+    Binary STL files are streamed; other formats go through the normal
+    loading pipeline once, so they must fit in memory at that point.
+    """
+    file_path = Path(file_path)
+    file_ext = file_path.suffix.lower()
+    root = Path(root) if root is not None else comparison.MESH_CACHE.cache_dir / 'ooc'
+
+    params = comparison.mesh_processing_params(file_ext, tolerance, angular_tolerance)
+    params["out_of_core"] = 1
+    directory = root / comparison.MESH_CACHE.key_for(file_path, params)
+    if (directory / 'indices.npy').exists():
+        return MappedMesh(directory)
+
+    # Convert into a scratch directory so readers never see partial files
+    scratch = root / f'.{uuid.uuid4().hex}'
+    scratch.mkdir(parents=True)
+    try:
+        if file_ext == '.stl' and is_binary_stl(file_path):
+            stream_binary_stl(file_path, scratch)
+        else:
+            mesh_data = load_mesh_file(file_path, tolerance, angular_tolerance)
+            if "error" in mesh_data:
+                raise ValueError(mesh_data["error"])
+            write_arrays(scratch, np.asarray(mesh_data["vertices"]).reshape(-1, 3),
+                         np.asarray(mesh_data["indices"]).reshape(-1, 3))
+        try:
+            os.replace(scratch, directory)
+        except OSError:
+            # Another process converted the same file meanwhile
+            shutil.rmtree(scratch)
+    except BaseException:
+        shutil.rmtree(scratch, ignore_errors=True)
+        raise
+    return MappedMesh(directory)
+
+
+def tile_size_for(sample, total, tile_points):
+    """Cube size giving at most about tile_points of total points per tile
+
+    Surfaces leave most tiles of their bounding box empty, so the size is
+    found by halving it until the occupied cells of a vertex sample are
+    numerous enough.
+    """
+    sample = np.asarray(sample, dtype=np.float64)
+    lower = sample.min(axis=0)
+    size = max(float(np.max(sample.max(axis=0) - lower)), 1e-9)
+    while size / 2 >= 1e-9:
+        cells = np.unique(np.floor((sample - lower) / size), axis=0)
+        if total / len(cells) <= tile_points:
+            break
+        size /= 2
+    return size
+
+
+class TileGrid:
+    """Regular grid of cubic tiles over a bounding box"""
+
+    def __init__(self, lower, upper, size):
+        self.lower = np.asarray(lower, dtype=np.float64)
+        extent = np.maximum(np.asarray(upper, dtype=np.float64) - self.lower, 1e-9)
+        self.size = float(size)
+        self.shape = np.maximum(np.ceil(extent / self.size), 1).astype(np.int64)
+
+    @property
+    def count(self):
+        return int(np.prod(self.shape))
+
+    def cells(self, points):
+        """Integer (i, j, k) cell of each point, clamped to the grid"""
+        offsets = np.asarray(points, dtype=np.float64) - self.lower
+        cells = np.floor(offsets / self.size)
+        return np.clip(cells, 0, self.shape - 1).astype(np.int64)
+
+    def tile_ids(self, points):
+        return np.ravel_multi_index(self.cells(points).T, self.shape)
+
+    def tiles_in_box(self, lower, upper):
+        """Ids of the tiles overlapping the box [lower, upper]"""
+        low = self.cells(np.asarray(lower)[None])[0]
+        high = self.cells(np.asarray(upper)[None])[0]
+        ranges = [np.arange(low[axis], high[axis] + 1) for axis in range(3)]
+        grid = np.meshgrid(*ranges, indexing='ij')
+        return np.ravel_multi_index([axis.ravel() for axis in grid], self.shape)
+
+
+class Buckets:
+    """Rows of an array sorted by tile, written by an on-disk counting sort
+
+    rows(tile_ids) returns the original row numbers of the given tiles.
+    """
+
+    def __init__(self, grid, count, keys, path):
+        """keys(chunk) returns the tile id of every row in the slice chunk"""
+        counts = np.zeros(grid.count, dtype=np.int64)
+        for chunk in chunks(count):
+            counts += np.bincount(keys(chunk), minlength=grid.count)
+        self.offsets = np.concatenate([[0], np.cumsum(counts)])
+
+        self.order = open_memmap(path, mode='w+', dtype=np.int64, shape=(count,))
+        cursor = self.offsets[:-1].copy()
+        for chunk in chunks(count):
+            tiles = keys(chunk)
+            sorted_rows = np.argsort(tiles, kind='stable')
+            sorted_tiles = tiles[sorted_rows]
+            starts = np.flatnonzero(np.r_[True, sorted_tiles[1:] != sorted_tiles[:-1]])
+            ends = np.r_[starts[1:], len(sorted_tiles)]
+            for start, end in zip(starts, ends):
+                tile = sorted_tiles[start]
+                self.order[cursor[tile]:cursor[tile] + end - start] = \
+                    chunk.start + sorted_rows[start:end]
+                cursor[tile] += end - start
+        self.order.flush()
+
+    def occupied(self):
+        return np.flatnonzero(np.diff(self.offsets))
+
+    def rows(self, tile_ids):
+        parts = [self.order[self.offsets[tile]:self.offsets[tile + 1]]
+                 for tile in np.atleast_1d(tile_ids)]
+        if not parts:
+            return np.zeros(0, dtype=np.int64)
+        return np.sort(np.concatenate(parts))
+
+
+class RunningStatistics:
+    """distance_statistics accumulated chunk by chunk"""
+
+    def __init__(self):
+        self.count = 0
+        self.beyond = 0
+        self.sums = np.zeros(3)  # |d|, d^2, d
+        self.min = math.inf
+        self.max = 0.0
+        self.signed_min = math.inf
+        self.signed_max = -math.inf
+
+    def add(self, distances):
+        finite = distances[np.isfinite(distances)].astype(np.float64)
+        self.beyond += len(distances) - len(finite)
+        if not len(finite):
+            return
+        absolute = np.abs(finite)
+        self.count += len(finite)
+        self.sums += [absolute.sum(), (finite ** 2).sum(), finite.sum()]
+        self.min = min(self.min, float(absolute.min()))
+        self.max = max(self.max, float(absolute.max()))
+        self.signed_min = min(self.signed_min, float(finite.min()))
+        self.signed_max = max(self.signed_max, float(finite.max()))
+
+    def result(self):
+        count = max(self.count, 1)
+        mean = self.sums[0] / count
+        return {
+            "min": self.min if self.count else 0.0,
+            "max": self.max,
+            "mean": float(mean),
+            "std": float(math.sqrt(max(self.sums[1] / count - mean ** 2, 0.0))),
+            "rms": float(math.sqrt(self.sums[1] / count)),
+            "signed_min": self.signed_min if self.count else 0.0,
+            "signed_max": self.signed_max if self.count else 0.0,
+            "signed_mean": float(self.sums[2] / count),
+            "count": self.count,
+            "beyond": self.beyond
+        }
+
+
+class OutOfCoreComparison:
+    """Tiled distance and matching passes between two memory-mapped meshes"""
+
+    def __init__(self, mesh_a, mesh_b, out_dir, max_distance=MATCHING_RANGE,
+                 tile_points=TILE_POINTS):
+        self.mesh_a = mesh_a
+        self.mesh_b = mesh_b
+        self.out_dir = Path(out_dir)
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self.max_distance = float(max_distance)
+
+        lower_a, upper_a = mesh_a.bounds()
+        lower_b, upper_b = mesh_b.bounds()
+        larger = mesh_a if len(mesh_a.vertices) >= len(mesh_b.vertices) else mesh_b
+        # Tiles may be much smaller than max_distance; see _halo_radii
+        size = tile_size_for(sample_vertices(larger, TILE_SIZE_SAMPLES),
+                             len(larger.vertices), tile_points)
+        self.grid = TileGrid(np.minimum(lower_a, lower_b),
+                             np.maximum(upper_a, upper_b), size)
+
+        report_stage('sorting vertices into tiles', 0.05, tiles=self.grid.count)
+        self.vertex_buckets = {
+            name: Buckets(self.grid, len(mesh.vertices),
+                          lambda chunk, mesh=mesh:
+                              self.grid.tile_ids(mesh.vertices[chunk]),
+                          self.out_dir / f'order_vertices_{name}.npy')
+            for name, mesh in (('a', mesh_a), ('b', mesh_b))}
+        self._triangle_buckets = None
+        self._triangle_radius = 0.0
+
+    def triangle_buckets(self):
+        """B's triangles bucketed by the tile of their centroid"""
+        if self._triangle_buckets is None:
+            report_stage('sorting triangles into tiles', 0.1,
+                         triangles=len(self.mesh_b.indices))
+            mesh = self.mesh_b
+
+            def keys(chunk):
+                corners = mesh.vertices[mesh.indices[chunk]].astype(np.float64)
+                centroids = corners.mean(axis=1)
+                radius = np.linalg.norm(corners - centroids[:, None],
+                                        axis=2).max(initial=0.0)
+                self._triangle_radius = max(self._triangle_radius, float(radius))
+                return self.grid.tile_ids(centroids)
+
+            self._triangle_buckets = Buckets(self.grid, len(mesh.indices), keys,
+                                             self.out_dir / 'order_triangles_b.npy')
+        return self._triangle_buckets
+
+    def _tiles(self, name):
+        """(tile id, sorted row numbers, points) of each occupied tile of a mesh"""
+        buckets = self.vertex_buckets[name]
+        vertices = self.mesh_a.vertices if name == 'a' else self.mesh_b.vertices
+        for tile in buckets.occupied():
+            rows = buckets.rows(tile)
+            yield tile, rows, np.asarray(vertices[rows])
+
+    def _box(self, points, margin):
+        return points.min(axis=0) - margin, points.max(axis=0) + margin
+
+    def _halo_radii(self):
+        """Growing search radii from the tile size up to max_distance
+
+        A distance found within radius r is exact, since anything closer
+        lies within r too, so only the points not settled yet search
+        further. Tiles much smaller than max_distance (small parts, fine
+        scans) then pull in only their neighbours for most points instead of
+        the whole max_distance halo.
+        """
+        radius = min(self.grid.size, self.max_distance)
+        while radius < self.max_distance:
+            yield radius
+            radius *= 2
+        yield self.max_distance
+
+    def _settle(self, points, within):
+        """Distances of points from within(points, radius) over growing radii"""
+        distances = np.full(len(points), np.inf, dtype=np.float32)
+        pending = np.arange(len(points))
+        for radius in self._halo_radii():
+            found = within(points[pending], radius)
+            settled = np.isfinite(found)
+            distances[pending[settled]] = found[settled]
+            pending = pending[~settled]
+            if not len(pending):
+                break
+        return distances
+
+    def _signed_within(self, points, radius):
+        """Signed distances to B's surface up to radius, inf beyond"""
+        mesh_b = self.mesh_b
+        lower, upper = self._box(points, radius)
+        reach = self._triangle_radius
+        candidates = self.triangle_buckets().rows(
+            self.grid.tiles_in_box(lower - reach, upper + reach))
+
+        triangles = np.asarray(mesh_b.indices[candidates])
+        corners = np.asarray(mesh_b.vertices[triangles])
+        # Only triangles whose bounding box reaches the halo can be closest
+        near = np.all((corners.min(axis=1) <= upper) &
+                      (corners.max(axis=1) >= lower), axis=1)
+        triangles = triangles[near]
+        if not len(triangles):
+            return np.full(len(points), np.inf, dtype=np.float32)
+
+        used, local = np.unique(triangles, return_inverse=True)
+        index = SurfaceIndex(np.asarray(mesh_b.vertices[used]), local.reshape(-1, 3))
+        signed, _, _ = index.query(points)
+        return np.where(np.abs(signed) <= radius, signed, np.inf).astype(np.float32)
+
+    def signed_distances(self, out_path):
+        """Signed distance from each vertex of A to B's surface, into out_path"""
+        self.triangle_buckets()
+        out = open_memmap(out_path, mode='w+', dtype=np.float32,
+                          shape=(len(self.mesh_a.vertices),))
+        statistics = RunningStatistics()
+        occupied = self.vertex_buckets['a'].occupied()
+
+        for done, (_, rows, points) in enumerate(self._tiles('a')):
+            report_stage('distances', 0.2 + 0.5 * done / len(occupied),
+                         points=len(rows))
+            distances = self._settle(points, self._signed_within)
+            out[rows] = distances
+            statistics.add(distances)
+        out.flush()
+        return out, statistics.result()
+
+    def nearest_distances(self, source, out_path):
+        """Distance from each vertex of source ('a' or 'b') to the other's vertices"""
+        from scipy.spatial import cKDTree
+
+        target = 'b' if source == 'a' else 'a'
+        meshes = {'a': self.mesh_a, 'b': self.mesh_b}
+        target_vertices = meshes[target].vertices
+        out = open_memmap(out_path, mode='w+', dtype=np.float32,
+                          shape=(len(meshes[source].vertices),))
+        occupied = self.vertex_buckets[source].occupied()
+
+        def within(points, radius):
+            candidates = self.vertex_buckets[target].rows(
+                self.grid.tiles_in_box(*self._box(points, radius)))
+            if not len(candidates):
+                return np.full(len(points), np.inf, dtype=np.float32)
+            tree = cKDTree(np.asarray(target_vertices[candidates]))
+            distances, _ = tree.query(points, distance_upper_bound=radius, workers=-1)
+            return distances.astype(np.float32)
+
+        for done, (_, rows, points) in enumerate(self._tiles(source)):
+            report_stage(f'matching {source.upper()}',
+                         0.7 + 0.1 * done / len(occupied), points=len(rows))
+            out[rows] = self._settle(points, within)
+        out.flush()
+        return out
+
+
+def quantize_to_file(values, out_path, quantize):
+    """Apply quantize(chunk) -> (levels, *scale) chunk by chunk into a .npy file
+
+    Returns the scale values (e.g. offset and step) of the quantization.
+    """
+    levels, *scale = quantize(np.zeros(0, dtype=np.float32))
+    out = open_memmap(out_path, mode='w+', dtype=levels.dtype, shape=(len(values),))
+    for chunk in chunks(len(values)):
+        out[chunk] = quantize(np.asarray(values[chunk]))[0]
+    out.flush()
+    return scale
+
+
+def count_within(values, threshold):
+    return sum(int(np.count_nonzero(np.asarray(values[chunk]) <= threshold))
+               for chunk in chunks(len(values)))
+
+
+def transform_mesh(mesh, transformation, directory):
+    """Memory-mapped copy of mesh moved by a 4x4 rigid transformation"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    vertices = open_memmap(directory / 'vertices.npy', mode='w+', dtype=np.float32,
+                           shape=mesh.vertices.shape)
+    for chunk in chunks(len(vertices)):
+        block = np.asarray(mesh.vertices[chunk], dtype=np.float64)
+        vertices[chunk] = apply_transform(block, transformation)
+    vertices.flush()
+    del vertices
+    # The indices are unchanged, so a link (or copy) of the original will do
+    target = directory / 'indices.npy'
+    target.unlink(missing_ok=True)
+    try:
+        os.link(mesh.directory / 'indices.npy', target)
+    except OSError:
+        shutil.copyfile(mesh.directory / 'indices.npy', target)
+    return MappedMesh(directory)
+
+
+def sample_vertices(mesh, count, seed=0):
+    """Random vertices of a memory-mapped mesh, read in index order"""
+    rng = np.random.default_rng(seed)
+    total = len(mesh.vertices)
+    rows = np.sort(rng.choice(total, size=min(count, total), replace=False))
+    return np.asarray(mesh.vertices[rows], dtype=np.float64)
+
+
+def compare_files_out_of_core(file_a, file_b, out_dir, align=True, init='pca',
+                              threshold=0.1, max_distance=MATCHING_RANGE,
+                              tolerance=DEFAULT_TOLERANCE,
+                              angular_tolerance=DEFAULT_ANGULAR_TOLERANCE,
+                              tile_points=TILE_POINTS):
+    """Compare two files like file_comparison.compare_files, with bounded memory
+
+    Writes to out_dir: deviation.npy (float32 signed distance of each
+    vertex of A to B's surface, inf beyond max_distance),
+    deviation_levels.npy (uint16, see distance.quantize_deviation over
+    +-max_distance, with the level "beyond_level" for the points beyond
+    it), nearest_levels_a.npy / nearest_levels_b.npy (uint16,
+    see comparison.quantize_distances) and summary.json. Returns the
+    summary, or a dict with an "error" key. Alignment registers random
+    vertex samples and writes B's moved vertices to out_dir.
+    """
+    out_dir = Path(out_dir)
+    try:
+        if max_distance < threshold:
+            raise ValueError("max_distance must be at least the matching threshold")
+        out_dir.mkdir(parents=True, exist_ok=True)
+        result = {"file_a": str(file_a), "file_b": str(file_b), "out_of_core": True}
+
+        report_stage('converting', 0.01)
+        mesh_a = convert_mesh(file_a, tolerance, angular_tolerance)
+        mesh_b = convert_mesh(file_b, tolerance, angular_tolerance)
+        for mesh, suffix in ((mesh_a, 'a'), (mesh_b, 'b')):
+            result[f"vertices_{suffix}"] = int(len(mesh.vertices))
+            result[f"triangles_{suffix}"] = int(len(mesh.indices))
+
+        if align:
+            report_stage('registration', 0.02)
+            transformation, stages = register(
+                sample_vertices(mesh_b, REGISTRATION_SAMPLES),
+                sample_vertices(mesh_a, REGISTRATION_SAMPLES), init=init)
+            mesh_b = transform_mesh(mesh_b, transformation, out_dir / 'aligned_b')
+            result["registration"] = {
+                "fitness": stages[-1]["fitness"] if stages else 0.0,
+                "inlier_rmse": stages[-1]["inlier_rmse"] if stages else 0.0,
+                "transformation": np.asarray(transformation).tolist()
+            }
+            if stages and "error" in stages[-1]:
+                result["registration"]["error"] = stages[-1]["error"]
+
+        passes = OutOfCoreComparison(mesh_a, mesh_b, out_dir, max_distance,
+                                     tile_points)
+        deviation, result["distance"] = passes.signed_distances(
+            out_dir / 'deviation.npy')
+        # The sign of points beyond max_distance is unknown, so they get a
+        # level of their own instead of being clamped to +max_distance
+        offset, step = quantize_to_file(
+            deviation, out_dir / 'deviation_levels.npy',
+            lambda chunk: quantize_deviation(chunk, max_distance, 16, beyond=True))
+        result["deviation_levels"] = {"offset": offset, "step": step,
+                                      "beyond_level": BEYOND_LEVEL}
+
+        nearest_a = passes.nearest_distances('a', out_dir / 'nearest_a.npy')
+        nearest_b = passes.nearest_distances('b', out_dir / 'nearest_b.npy')
+        step, = quantize_to_file(nearest_a, out_dir / 'nearest_levels_a.npy',
+                                 lambda chunk: quantize_distances(chunk, max_distance))
+        quantize_to_file(nearest_b, out_dir / 'nearest_levels_b.npy',
+                         lambda chunk: quantize_distances(chunk, max_distance))
+
+        within_a = count_within(nearest_a, threshold)
+        within_b = count_within(nearest_b, threshold)
+        result["matching"] = {
+            "num_matching_a": within_a,
+            "num_matching_b": within_b,
+            "percent_matching_a": within_a / max(len(nearest_a), 1) * 100,
+            "percent_matching_b": within_b / max(len(nearest_b), 1) * 100,
+            "total_vertices_a": len(nearest_a),
+            "total_vertices_b": len(nearest_b),
+            "distance_step": step
+        }
+        result["tiles"] = len(passes.vertex_buckets['a'].occupied())
+        result["out_dir"] = str(out_dir)
+
+        del deviation, nearest_a, nearest_b, passes
+        for scratch in out_dir.glob('order_*.npy'):
+            scratch.unlink()
+        for scratch in ('nearest_a.npy', 'nearest_b.npy'):
+            (out_dir / scratch).unlink(missing_ok=True)
+
+        with open(out_dir / 'summary.json', 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+        return result
+
+    except Exception as e:
+        return {"error": f"Out-of-core comparison error: {str(e)}"}
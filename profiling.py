@@ -0,0 +1,174 @@
+"""Opt-in per-stage profiling of the loading and comparison functions
+
+Functions wrapped with @profiled record a profile of the stages marked
+inside them (usually through jobs.report_stage): wall time, CPU time,
+resident memory delta and any sizes passed with the stage. The profile is
+returned with the result under "profile" and, if a log path is set, appended
+to a JSON-lines log file.
+
+Profiling is off by default. Enable it with COMPARISON_PROFILE=1 (and
+COMPARISON_PROFILE_LOG=<path> for the log) or at runtime with set_enabled().
+CPU time is process-wide, so it includes native worker threads (KD-tree
+queries, Open3D) and anything else running concurrently.
+"""
+import functools
+import json
+import os
+import threading
+import time
+
+_enabled = os.environ.get('COMPARISON_PROFILE', '') not in ('', '0')
+_log_path = os.environ.get('COMPARISON_PROFILE_LOG') or None
+_log_lock = threading.Lock()
+_current = threading.local()
+
+# Strings at least this long are counted as (base64) payloads in the output
+PAYLOAD_MIN_LENGTH = 1024
+
+
+def enabled():
+    return _enabled
+
+
+def set_enabled(flag, log_path=None):
+    """Turn profiling on or off; log_path (if given) replaces the log file"""
+    global _enabled, _log_path
+    _enabled = bool(flag)
+    if log_path is not None:
+        _log_path = log_path or None
+
+
+def current_rss():
+    """Resident set size of this process in bytes, or None if unknown"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        return None
+
+
+def _snapshot():
+    return time.perf_counter(), time.process_time(), current_rss()
+
+
+def _deltas(start, end):
+    return {
+        "wall_seconds": end[0] - start[0],
+        "cpu_seconds": end[1] - start[1],
+        "rss_delta_bytes": (end[2] - start[2]
+                            if start[2] is not None and end[2] is not None else None)
+    }
+
+
+class Profile:
+    """Stages recorded for one call of a profiled function"""
+
+    def __init__(self, name):
+        self.name = name
+        self.stages = []
+        self._start = _snapshot()
+        self._stage = None
+        self._stage_start = None
+
+    def _close_stage(self, now):
+        if self._stage is not None:
+            self._stage.update(_deltas(self._stage_start, now))
+            self.stages.append(self._stage)
+            self._stage = None
+
+    def mark(self, stage, **sizes):
+        now = _snapshot()
+        self._close_stage(now)
+        self._stage = {"stage": stage}
+        self._stage.update(sizes)
+        self._stage_start = now
+
+    def annotate(self, **sizes):
+        if self._stage is not None:
+            self._stage.update(sizes)
+
+    def finish(self):
+        now = _snapshot()
+        self._close_stage(now)
+        profile = {"function": self.name}
+        profile.update(_deltas(self._start, now))
+        profile["stages"] = self.stages
+        return profile
+
+
+def current_profile():
+    """Profile being recorded on the calling thread, or None"""
+    return getattr(_current, 'profile', None)
+
+
+def mark(stage, **sizes):
+    """Start a new stage of the current profile; no-op when not profiling"""
+    profile = current_profile()
+    if profile is not None:
+        profile.mark(stage, **sizes)
+
+
+def annotate(**sizes):
+    """Add sizes (element counts, bytes) to the current stage"""
+    profile = current_profile()
+    if profile is not None:
+        profile.annotate(**sizes)
+
+
+def _input_sizes(args):
+    """File sizes of path arguments"""
+    sizes = {}
+    for index, value in enumerate(args):
+        if isinstance(value, (str, os.PathLike)) and os.path.isfile(value):
+            sizes[f"arg{index}_bytes"] = os.path.getsize(value)
+    return sizes
+
+
+def _output_sizes(result):
+    """Lengths of the list and payload string values of a result dict"""
+    return {key: len(value) for key, value in result.items()
+            if isinstance(value, list) or (isinstance(value, (str, bytes))
+                                           and len(value) >= PAYLOAD_MIN_LENGTH)}
+
+
+def write_log(profile):
+    """Append a profile to the log file as one JSON line"""
+    if _log_path is None:
+        return
+    line = json.dumps(dict(profile, timestamp=time.time(), pid=os.getpid()))
+    with _log_lock:
+        with open(_log_path, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+
+
+def profiled(func):
+    """Profile calls of func when profiling is enabled
+
+    Calls nested inside another profiled call add their stages to the
+    outer profile instead of returning their own.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _enabled or current_profile() is not None:
+            return func(*args, **kwargs)
+
+        profile = Profile(func.__name__)
+        _current.profile = profile
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            _current.profile = None
+
+        data = profile.finish()
+        data["input"] = _input_sizes(args)
+        if isinstance(result, dict):
+            data["output"] = _output_sizes(result)
+            result["profile"] = data
+        write_log(data)
+        return result
+    return wrapper
@@ -0,0 +1,334 @@
+"""Readers of STL, OBJ, STEP and IGES files into mesh arrays
+
+load_mesh_file reads any supported file and runs a cleanup profile over the
+result; the STL readers parse binary files through a memory map and ASCII
+files with one regular expression, with Open3D as the fast path where it is
+installed. STEP/IGES files are tessellated with CadQuery (see
+tessellation). read_stl_to_json and read_obj_to_json return the JSON
+transport format app.js reads directly.
+"""
+import os
+from pathlib import Path
+
+import numpy as np
+
+import profiling
+from brep_diff import face_signatures
+from cleanup import DEFAULT_CLEANUP, cleanup_mesh
+from jobs import report_stage
+from mesh import Mesh
+from mesh_utils import compute_vertex_normals, weld_vertices
+from obj_reader import read_obj_arrays
+from tessellation import (DEFAULT_TOLERANCE, DEFAULT_ANGULAR_TOLERANCE,
+                          workplane_to_shape, tessellate_parallel)
+
+SUPPORTED_FORMATS = ['.stl', '.obj', '.step', '.stp', '.iges', '.igs']
+BREP_FORMATS = ['.step', '.stp', '.iges', '.igs']
+
+
+def load_mesh_file(file_path, tolerance=DEFAULT_TOLERANCE,
+                   angular_tolerance=DEFAULT_ANGULAR_TOLERANCE,
+                   cleanup=DEFAULT_CLEANUP):
+    """Read a 3D file and clean it up with a cleanup profile
+
+    See read_mesh_file for the tolerances and clean_mesh_data for the
+    cleanup.
+    """
+    mesh_data = read_mesh_file(file_path, tolerance, angular_tolerance)
+    if "error" in mesh_data or cleanup == 'none':
+        return mesh_data
+
+    report_stage('cleanup', 0.85, triangles=len(mesh_data["indices"]))
+    return clean_mesh_data(mesh_data, cleanup)
+
+
+def clean_mesh_data(mesh_data, cleanup=DEFAULT_CLEANUP):
+    """Mesh data after the stages of a cleanup profile (see cleanup.cleanup_mesh)
+
+    Per-triangle B-rep face ids are carried along. The normals read from
+    the file are kept for the surviving vertices unless welding or
+    orientation changed the topology, in which case they are recomputed.
+    The report of the stages is returned under "cleanup".
+    """
+    vertices, triangles, (vertex_source, triangle_source), stages = cleanup_mesh(
+        mesh_data["vertices"], mesh_data["indices"], cleanup)
+
+    changed = any(stage.get("removed_vertices") or stage.get("flipped_triangles")
+                  for stage in stages if stage["stage"] in ('weld', 'orient'))
+    normals = mesh_data.get("normals")
+    if normals is None or len(normals) == 0 or changed:
+        normals = compute_vertex_normals(vertices, triangles)
+    else:
+        normals = np.asarray(normals, dtype=np.float32).reshape(-1, 3)[vertex_source]
+
+    cleaned = {
+        "vertices": vertices,
+        "normals": normals,
+        "indices": triangles,
+        "cleanup": stages
+    }
+    if mesh_data.get("face_ids") is not None:
+        cleaned["face_ids"] = np.asarray(mesh_data["face_ids"])[triangle_source]
+        cleaned["face_signatures"] = mesh_data["face_signatures"]
+    return cleaned
+
+
+def read_mesh_file(file_path, tolerance=DEFAULT_TOLERANCE,
+                   angular_tolerance=DEFAULT_ANGULAR_TOLERANCE):
+    """Run the format specific loading pipeline for a 3D file
+
+    tolerance / angular_tolerance control the B-rep tessellation of
+    STEP/IGES files; lower values give finer meshes.
+    """
+    file_path = Path(file_path)
+    file_ext = file_path.suffix.lower()
+
+    # Direct STL processing
+    if file_ext == '.stl':
+        report_stage('reading STL', 0.1)
+        try:
+            vertices, normals, triangles = read_stl_open3d(str(file_path))
+        except Exception:
+            # Fallback to manual STL reading if Open3D fails
+            try:
+                vertices, normals, triangles = read_stl_arrays(str(file_path))
+            except Exception as e:
+                return {"error": f"STL reading error: {str(e)}"}
+        return {
+            "vertices": vertices,
+            "normals": normals,
+            "indices": triangles
+        }
+
+    # OBJ file processing
+    elif file_ext == '.obj':
+        report_stage('reading OBJ', 0.1)
+        try:
+            vertices, normals, triangles = read_obj_arrays(file_path)
+        except Exception as e:
+            # Open3D may still read files the vectorized reader cannot parse
+            try:
+                vertices, normals, triangles = read_obj_open3d(str(file_path))
+            except Exception as e2:
+                return {"error": f"OBJ reading error: {str(e)} / {str(e2)}"}
+        return {
+            "vertices": vertices,
+            "normals": normals,
+            "indices": triangles
+        }
+
+    # STEP/IGES processing with CadQuery
+    elif file_ext in BREP_FORMATS:
+        import cadquery as cq
+
+        report_stage('importing CAD', 0.1)
+
+        # Read file based on format
+        if file_ext in ['.step', '.stp']:
+            result = cq.importers.importStep(str(file_path))
+        else:  # IGES
+            # Try to import IGES - note: CadQuery might have limited IGES support
+            try:
+                # Some IGES files can be read as STEP
+                result = cq.importers.importStep(str(file_path))
+            except:
+                # If CadQuery fails, we'll need to handle it differently
+                return {"error": "IGES format is not fully supported. "
+                                 "Please convert to STEP or STL format."}
+
+        report_stage('tessellating', 0.5)
+
+        # Tessellate in memory instead of exporting and re-reading an STL,
+        # spreading the solids/faces of large shapes over worker processes
+        shape = workplane_to_shape(result)
+        vertices, normals, triangles, face_ids = tessellate_parallel(
+            shape, tolerance, angular_tolerance, faces=True)
+        profiling.annotate(vertices=len(vertices), triangles=len(triangles))
+
+        mesh_data = {
+            "vertices": vertices,
+            "normals": normals,
+            "indices": triangles
+        }
+        if face_ids is not None:
+            # Face signatures for the B-rep diff (see compare_brep)
+            report_stage('face signatures', 0.8)
+            mesh_data["face_ids"] = face_ids
+            mesh_data["face_signatures"] = face_signatures(shape)
+        return mesh_data
+
+    return {"error": f"Unsupported file format: {file_ext}"}
+
+
+def read_stl_open3d(stl_path):
+    """Read an STL file with Open3D, welding its exactly shared corners
+
+    The remaining cleanup is left to the cleanup profile (see
+    clean_mesh_data). Returns float32/uint32 (vertices, normals, triangles)
+    arrays.
+    """
+    import open3d as o3d
+
+    # Read STL file
+    profiling.mark('open3d read', input_bytes=os.path.getsize(stl_path))
+    mesh = o3d.io.read_triangle_mesh(stl_path)
+
+    # STL stores every triangle's corners separately
+    profiling.mark('remove_duplicated_vertices', vertices=len(mesh.vertices))
+    mesh.remove_duplicated_vertices()
+
+    # Open3D keeps float64/int64 arrays; convert once to the compact layout
+    profiling.mark('convert', vertices=len(mesh.vertices),
+                   triangles=len(mesh.triangles))
+    converted = Mesh.from_open3d(mesh)
+    return converted.vertices, converted.normals, converted.indices
+
+
+@profiling.profiled
+def read_stl_to_json(stl_path, cleanup=DEFAULT_CLEANUP):
+    """Read STL file and convert to Three.js compatible JSON format"""
+    try:
+        vertices, normals, triangles = read_stl_open3d(stl_path)
+        if cleanup != 'none':
+            cleaned = clean_mesh_data({"vertices": vertices, "normals": normals,
+                                       "indices": triangles}, cleanup)
+            vertices, normals, triangles = (cleaned["vertices"], cleaned["normals"],
+                                            cleaned["indices"])
+
+        profiling.mark('tolist', vertices=len(vertices), triangles=len(triangles))
+        return {
+            "vertices": vertices.flatten().tolist(),
+            "normals": normals.flatten().tolist(),
+            "indices": triangles.flatten().tolist()
+        }
+
+    except Exception as e:
+        # Fallback to manual STL reading if Open3D fails
+        return read_stl_manual(stl_path)
+
+
+# Binary STL triangle record: normal, 3 vertices, attribute byte count
+STL_TRIANGLE_DTYPE = np.dtype([
+    ('normal', '<f4', (3,)),
+    ('vertices', '<f4', (3, 3)),
+    ('attr', '<u2')
+])
+
+
+def _read_ascii_stl_corners(stl_path):
+    """Parse the vertex lines of an ASCII STL into (n, 3, 3) corners"""
+    import re
+
+    with open(stl_path, 'rb') as f:
+        content = f.read()
+
+    coords = re.findall(rb'vertex\s+(\S+)\s+(\S+)\s+(\S+)', content)
+    if len(coords) % 3 != 0:
+        raise ValueError("ASCII STL has an incomplete facet")
+    return np.array(coords).astype(np.float32).reshape(-1, 3, 3)
+
+
+def is_binary_stl(stl_path):
+    """Binary STL files have an exact size of 84 + 50 * triangle count"""
+    file_size = os.path.getsize(stl_path)
+    with open(stl_path, 'rb') as f:
+        header = f.read(84)
+
+    if len(header) == 84:
+        num_triangles = int.from_bytes(header[80:84], 'little')
+        if file_size == 84 + 50 * num_triangles:
+            return True
+    # Binary files may also start with "solid", so only trust it as a fallback
+    return not header.lstrip().lower().startswith(b'solid')
+
+
+def read_stl_arrays(stl_path):
+    """Read binary or ASCII STL into welded float32/uint32 arrays
+
+    Returns (vertices, normals, triangles) with shapes (n, 3), (n, 3), (m, 3).
+    """
+    profiling.mark('read STL triangles', input_bytes=os.path.getsize(stl_path))
+    if is_binary_stl(stl_path):
+        with open(stl_path, 'rb') as f:
+            f.seek(80)
+            num_triangles = int.from_bytes(f.read(4), 'little')
+
+        if os.path.getsize(stl_path) < 84 + 50 * num_triangles:
+            raise ValueError("Binary STL is truncated")
+
+        if num_triangles == 0:
+            tri_vertices = np.zeros((0, 3, 3), dtype=np.float32)
+        else:
+            records = np.memmap(stl_path, dtype=STL_TRIANGLE_DTYPE, mode='r',
+                                offset=84, shape=(num_triangles,))
+            tri_vertices = np.array(records['vertices'], dtype=np.float32)
+            del records
+    else:
+        tri_vertices = _read_ascii_stl_corners(stl_path)
+
+    profiling.mark('weld vertices', triangles=len(tri_vertices))
+    vertices, triangles = weld_vertices(tri_vertices)
+
+    profiling.mark('vertex normals', vertices=len(vertices))
+    normals = compute_vertex_normals(vertices, triangles)
+    return vertices, normals, triangles
+
+
+@profiling.profiled
+def read_stl_manual(stl_path):
+    """Manual STL reader as fallback"""
+    try:
+        vertices, normals, triangles = read_stl_arrays(stl_path)
+
+        profiling.mark('tolist', vertices=len(vertices), triangles=len(triangles))
+        return {
+            "vertices": vertices.flatten().tolist(),
+            "normals": normals.flatten().tolist(),
+            "indices": triangles.flatten().tolist()
+        }
+
+    except Exception as e:
+        return {"error": f"STL reading error: {str(e)}"}
+
+
+@profiling.profiled
+def read_obj_open3d(obj_path):
+    """Read an OBJ file with Open3D into float32/uint32 arrays
+
+    The fallback for files read_obj_arrays cannot parse. Returns
+    (vertices, normals, triangles).
+    """
+    import open3d as o3d
+
+    profiling.mark('open3d read', input_bytes=os.path.getsize(obj_path))
+    mesh = o3d.io.read_triangle_mesh(obj_path)
+    if not mesh.has_vertex_normals():
+        mesh.compute_vertex_normals()
+    converted = Mesh.from_open3d(mesh)
+    return converted.vertices, converted.normals, converted.indices
+
+
+def read_obj_to_json(obj_path):
+    """Read OBJ file and convert to Three.js compatible JSON format"""
+    try:
+        profiling.mark('parse OBJ', input_bytes=os.path.getsize(obj_path))
+        vertices, normals, triangles = read_obj_arrays(obj_path)
+
+        profiling.mark('tolist', vertices=len(vertices), triangles=len(triangles))
+        return {
+            "vertices": vertices.flatten().tolist(),
+            "normals": normals.flatten().tolist(),
+            "indices": triangles.flatten().tolist()
+        }
+
+    except Exception as e:
+        # Fallback to Open3D if manual parsing fails
+        try:
+            vertices, normals, triangles = read_obj_open3d(obj_path)
+            return {
+                "vertices": vertices.flatten().tolist(),
+                "normals": normals.flatten().tolist(),
+                "indices": triangles.flatten().tolist()
+            }
+        except Exception as e2:
+            return {"error": f"OBJ reading error: {str(e)} / {str(e2)}"}
@@ -0,0 +1,141 @@
+"""Connected regions of out-of-tolerance deviation
+
+A triangle is out of tolerance when one of its vertices deviates by more
+than the tolerance; it counts as "over" or "under" by the sign of its
+largest deviation. Out-of-tolerance triangles of the same sign that share a
+vertex form a region. Regions are found as connected components of a
+sparse vertex graph built from the index buffer, and their statistics are
+reduced per label with bincount / reduceat, so no Python loop runs over
+vertices or triangles.
+"""
+import numpy as np
+
+# Regions returned by default; the rest are only counted
+MAX_REGIONS = 100
+
+
+def _component_labels(triangles, vertex_count):
+    """Connected component of each vertex, joined by the edges of triangles"""
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+
+    # Two edges per triangle are enough to connect its three corners
+    rows = np.concatenate([triangles[:, 0], triangles[:, 1]])
+    cols = np.concatenate([triangles[:, 1], triangles[:, 2]])
+    graph = coo_matrix((np.ones(len(rows), dtype=np.int8), (rows, cols)),
+                       shape=(vertex_count, vertex_count)).tocsr()
+    _, labels = connected_components(graph, directed=False)
+    return labels
+
+
+def _reduce_by_label(labels, values, ufunc):
+    """ufunc.reduceat of values grouped by label; returns (unique labels, results)"""
+    order = np.argsort(labels, kind='stable')
+    sorted_labels = labels[order]
+    starts = np.flatnonzero(np.r_[True, sorted_labels[1:] != sorted_labels[:-1]])
+    return sorted_labels[starts], ufunc.reduceat(values[order], starts, axis=0)
+
+
+def _sign_regions(vertices, triangles, deviations, areas, sign):
+    """Statistics of the regions of one sign, as lists of per-region values"""
+    labels = _component_labels(triangles, len(vertices))
+    triangle_labels = labels[triangles[:, 0]]
+    # Compact labels 0..k-1 over the regions that actually hold triangles
+    region_ids, triangle_labels = np.unique(triangle_labels, return_inverse=True)
+    count = len(region_ids)
+
+    corners = vertices[triangles].astype(np.float64)
+    centroids = corners.mean(axis=1)
+    region_area = np.bincount(triangle_labels, weights=areas, minlength=count)
+    weights = np.where(region_area > 0, region_area, 1.0)
+    centroid = np.stack([
+        np.bincount(triangle_labels, weights=centroids[:, axis] * areas,
+                    minlength=count) / weights
+        for axis in range(3)], axis=1)
+    # Zero-area regions fall back to the plain mean of their triangle centroids
+    degenerate = region_area <= 0
+    if degenerate.any():
+        counts = np.bincount(triangle_labels, minlength=count)
+        for axis in range(3):
+            means = np.bincount(triangle_labels, weights=centroids[:, axis],
+                                minlength=count) / counts
+            centroid[degenerate, axis] = means[degenerate]
+
+    _, lower = _reduce_by_label(triangle_labels, corners.min(axis=1), np.minimum)
+    _, upper = _reduce_by_label(triangle_labels, corners.max(axis=1), np.maximum)
+
+    # Deviation statistics over the distinct vertices of each region
+    region_vertices = np.unique(triangles)
+    vertex_labels = np.searchsorted(region_ids, labels[region_vertices])
+    vertex_deviation = deviations[region_vertices].astype(np.float64)
+    vertex_count = np.bincount(vertex_labels, minlength=count)
+    mean = np.bincount(vertex_labels, weights=vertex_deviation,
+                       minlength=count) / vertex_count
+    _, peak = _reduce_by_label(vertex_labels, sign * vertex_deviation, np.maximum)
+
+    return {
+        "area": region_area,
+        "triangle_count": np.bincount(triangle_labels, minlength=count),
+        "vertex_count": vertex_count,
+        "max_deviation": sign * peak,
+        "mean_deviation": mean,
+        "centroid": centroid,
+        "bbox_min": lower,
+        "bbox_max": upper
+    }
+
+
+def deviation_regions(vertices, triangles, deviations, tolerance, areas=None,
+                      min_area=0.0, limit=MAX_REGIONS):
+    """Connected out-of-tolerance regions, largest area first
+
+    deviations holds the signed deviation of every vertex. Returns
+    (regions, total), where regions is a list of at most limit dicts with
+    the sign ("over"/"under"), area, triangle and vertex counts, max and
+    mean deviation, area-weighted centroid and bounding box, and total is
+    the number of regions of at least min_area.
+    """
+    vertices = np.asarray(vertices)
+    triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+    deviations = np.asarray(deviations)
+    if areas is None:
+        from mesh_utils import face_areas
+        areas = face_areas(vertices, triangles)
+    areas = np.asarray(areas, dtype=np.float64)
+
+    corner_deviation = deviations[triangles]
+    largest = np.take_along_axis(
+        corner_deviation, np.abs(corner_deviation).argmax(axis=1)[:, None], axis=1)[:, 0]
+    outside = np.abs(largest) > tolerance
+
+    columns = []
+    for sign, name in ((1, "over"), (-1, "under")):
+        selected = outside & (np.sign(largest) == sign)
+        if not selected.any():
+            continue
+        stats = _sign_regions(vertices, triangles[selected], deviations,
+                              areas[selected], sign)
+        stats["sign"] = np.full(len(stats["area"]), name)
+        columns.append(stats)
+
+    if not columns:
+        return [], 0
+    merged = {key: np.concatenate([stats[key] for stats in columns])
+              for key in columns[0]}
+
+    keep = np.flatnonzero(merged["area"] >= min_area)
+    order = keep[np.argsort(-merged["area"][keep], kind='stable')]
+    regions = []
+    for i in order[:limit]:
+        regions.append({
+            "sign": str(merged["sign"][i]),
+            "area": float(merged["area"][i]),
+            "triangle_count": int(merged["triangle_count"][i]),
+            "vertex_count": int(merged["vertex_count"][i]),
+            "max_deviation": float(merged["max_deviation"][i]),
+            "mean_deviation": float(merged["mean_deviation"][i]),
+            "centroid": merged["centroid"][i].tolist(),
+            "bbox_min": merged["bbox_min"][i].tolist(),
+            "bbox_max": merged["bbox_max"][i].tolist()
+        })
+    return regions, len(keep)
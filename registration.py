@@ -0,0 +1,216 @@
+"""Coarse-to-fine rigid registration of two meshes
+
+A global initialization (PCA axes or FPFH + RANSAC) brings the source into
+the neighbourhood of the target. Point-to-plane ICP is then run over a
+voxel-downsampled pyramid, with voxel sizes and correspondence distances
+scaled to the target's bounding-box diagonal. Coarse levels use few points
+and a wide search radius, fine levels the reverse.
+"""
+import itertools
+import time
+
+import numpy as np
+
+# Voxel size of each pyramid level as a fraction of the bounding-box diagonal
+PYRAMID_LEVELS = (0.04, 0.015, 0.005)
+
+# ICP iterations per pyramid level
+LEVEL_ITERATIONS = (60, 40, 20)
+
+# Correspondence distance as a multiple of the level's voxel size
+CORRESPONDENCE_FACTOR = 2.5
+
+# Points sampled per mesh for the global initialization score
+PCA_SCORE_POINTS = 5000
+
+
+def bounding_box_diagonal(points):
+    points = np.asarray(points)
+    return float(np.linalg.norm(points.max(axis=0) - points.min(axis=0)))
+
+
+def apply_transform(points, transformation):
+    """Apply a 4x4 rigid transformation to (n, 3) points"""
+    transformation = np.asarray(transformation)
+    return points @ transformation[:3, :3].T + transformation[:3, 3]
+
+
+def _principal_axes(points):
+    centered = points - points.mean(axis=0)
+    _, _, axes = np.linalg.svd(centered, full_matrices=False)
+    # Rows are the principal axes; make the frame right-handed
+    if np.linalg.det(axes) < 0:
+        axes[2] *= -1
+    return axes
+
+
+def alignment_score(source_points, target_tree, max_distance):
+    """Fitness (inlier fraction) and inlier RMSE of source against target"""
+    distances, _ = target_tree.query(source_points, workers=-1)
+    inliers = distances <= max_distance
+    fitness = float(np.mean(inliers))
+    rmse = float(np.sqrt(np.mean(distances[inliers] ** 2))) if inliers.any() else 0.0
+    return fitness, rmse, float(np.mean(distances))
+
+
+def pca_alignment(source_points, target_points, max_distance=None, seed=0):
+    """Global initialization by matching centroids and principal axes
+
+    The principal axes only define a frame up to sign, so the four proper
+    rotations (and the identity) are scored and the best is returned as
+    (transformation, fitness, rmse).
+    """
+    from scipy.spatial import cKDTree
+
+    rng = np.random.default_rng(seed)
+    source = np.asarray(source_points, dtype=np.float64)
+    target = np.asarray(target_points, dtype=np.float64)
+    if len(source) > PCA_SCORE_POINTS:
+        source = source[rng.choice(len(source), PCA_SCORE_POINTS, replace=False)]
+    if len(target) > PCA_SCORE_POINTS:
+        target = target[rng.choice(len(target), PCA_SCORE_POINTS, replace=False)]
+
+    if max_distance is None:
+        max_distance = 0.02 * bounding_box_diagonal(target)
+    tree = cKDTree(target)
+
+    source_center = source.mean(axis=0)
+    target_center = target.mean(axis=0)
+    source_axes = _principal_axes(source)
+    target_axes = _principal_axes(target)
+
+    candidates = [np.eye(4)]
+    for flip_x, flip_y in itertools.product((1, -1), repeat=2):
+        # Flipping two axes (or none) keeps the rotation proper
+        flips = np.diag([flip_x, flip_y, flip_x * flip_y])
+        rotation = target_axes.T @ flips @ source_axes
+        transformation = np.eye(4)
+        transformation[:3, :3] = rotation
+        transformation[:3, 3] = target_center - rotation @ source_center
+        candidates.append(transformation)
+
+    best = None
+    for transformation in candidates:
+        fitness, rmse, mean_distance = alignment_score(
+            apply_transform(source, transformation), tree, max_distance)
+        if best is None or mean_distance < best[3]:
+            best = (transformation, fitness, rmse, mean_distance)
+    return best[0], best[1], best[2]
+
+
+def _to_point_cloud(points):
+    import open3d as o3d
+
+    pcd = o3d.geometry.PointCloud()
+    pcd.points = o3d.utility.Vector3dVector(np.asarray(points, dtype=np.float64))
+    return pcd
+
+
+def _estimate_normals(pcd, voxel_size):
+    import open3d as o3d
+
+    pcd.estimate_normals(
+        o3d.geometry.KDTreeSearchParamHybrid(radius=2 * voxel_size, max_nn=30))
+
+
+def fpfh_alignment(source_pcd, target_pcd, voxel_size):
+    """Global initialization by FPFH feature matching with RANSAC"""
+    import open3d as o3d
+
+    registration = o3d.pipelines.registration
+    source_down = source_pcd.voxel_down_sample(voxel_size)
+    target_down = target_pcd.voxel_down_sample(voxel_size)
+
+    features = []
+    for pcd in (source_down, target_down):
+        _estimate_normals(pcd, voxel_size)
+        search = o3d.geometry.KDTreeSearchParamHybrid(radius=5 * voxel_size,
+                                                      max_nn=100)
+        features.append(registration.compute_fpfh_feature(pcd, search))
+
+    distance = 1.5 * voxel_size
+    result = registration.registration_ransac_based_on_feature_matching(
+        source_down, target_down, features[0], features[1], True, distance,
+        registration.TransformationEstimationPointToPoint(False), 3,
+        [registration.CorrespondenceCheckerBasedOnEdgeLength(0.9),
+         registration.CorrespondenceCheckerBasedOnDistance(distance)],
+        registration.RANSACConvergenceCriteria(100000, 0.999))
+    return (np.asarray(result.transformation), float(result.fitness),
+            float(result.inlier_rmse))
+
+
+def register(source_points, target_points, init='pca',
+             levels=PYRAMID_LEVELS, iterations=LEVEL_ITERATIONS, report=None):
+    """Rigidly register source onto target
+
+    init is 'pca', 'fpfh' or 'none'. report(stage, progress) is called before
+    each stage. Returns (transformation, stages) where stages lists the
+    fitness, inlier RMSE and time of every stage. Empty or single-point
+    input has no scale for the pyramid; it gets the identity and a single
+    stage with an "error".
+    """
+    diagonal = 0.0
+    if len(source_points) and len(target_points):
+        diagonal = bounding_box_diagonal(target_points)
+    if not diagonal > 0:
+        return np.eye(4), [{
+            "stage": 'degenerate',
+            "error": "The target points have no extent to register against",
+            "fitness": 0.0,
+            "inlier_rmse": 0.0,
+            "seconds": 0.0
+        }]
+
+    import open3d as o3d
+
+    registration = o3d.pipelines.registration
+    source_pcd = _to_point_cloud(source_points)
+    target_pcd = _to_point_cloud(target_points)
+
+    stages = []
+    transformation = np.eye(4)
+
+    if init != 'none':
+        if report:
+            report(f'global alignment ({init})', 0.1)
+        start = time.perf_counter()
+        if init == 'fpfh':
+            transformation, fitness, rmse = fpfh_alignment(
+                source_pcd, target_pcd, levels[0] * diagonal)
+        else:
+            transformation, fitness, rmse = pca_alignment(
+                source_points, target_points, max_distance=levels[0] * diagonal)
+        stages.append({
+            "stage": init,
+            "fitness": fitness,
+            "inlier_rmse": rmse,
+            "seconds": time.perf_counter() - start
+        })
+
+    for level, (fraction, max_iteration) in enumerate(zip(levels, iterations)):
+        if report:
+            report(f'ICP level {level + 1}/{len(levels)}',
+                   0.2 + 0.7 * level / len(levels))
+        start = time.perf_counter()
+        voxel_size = fraction * diagonal
+
+        source_down = source_pcd.voxel_down_sample(voxel_size)
+        target_down = target_pcd.voxel_down_sample(voxel_size)
+        _estimate_normals(target_down, voxel_size)
+
+        result = registration.registration_icp(
+            source_down, target_down, CORRESPONDENCE_FACTOR * voxel_size,
+            transformation, registration.TransformationEstimationPointToPlane(),
+            registration.ICPConvergenceCriteria(max_iteration=max_iteration))
+        transformation = np.asarray(result.transformation)
+
+        stages.append({
+            "stage": f"icp_level_{level + 1}",
+            "voxel_size": voxel_size,
+            "points": len(source_down.points),
+            "fitness": float(result.fitness),
+            "inlier_rmse": float(result.inlier_rmse),
+            "seconds": time.perf_counter() - start
+        })
+
+    return transformation, stages
@@ -0,0 +1,124 @@
+"""Background warm-up of the heavy modules after the window has opened
+
+The backend imports SciPy, CadQuery and Open3D only inside the functions
+that use them, so the window opens without waiting for them. Once app.js
+has painted its first frame it calls start_warm_up, which imports them on a
+background thread in the order the first user actions need them and runs a
+tiny piece of work through each (a KD-tree query, the meshing of a box) so
+that native libraries and OpenCascade are initialized too. A request that
+needs a module while it is still being warmed waits on Python's import lock
+instead of importing it a second time.
+
+status() reports the state and time of every step, so the UI can show what
+is still loading. With profiling enabled the warm-up is also written to the
+profiling log like a profiled call.
+"""
+import threading
+import time
+
+import profiling
+
+# Reference point for the startup timings: the import of the backend
+LAUNCHED_AT = time.perf_counter()
+
+
+def _warm_scipy():
+    import numpy as np
+    import scipy.sparse.csgraph  # noqa: F401
+    from scipy.spatial import cKDTree
+    cKDTree(np.zeros((4, 3))).query(np.ones((1, 3)))
+
+
+def _warm_cadquery():
+    import cadquery as cq
+    cq.Workplane('XY').box(1, 1, 1).val().tessellate(0.1)
+
+
+def _warm_open3d():
+    import open3d as o3d
+    if hasattr(o3d, 't'):
+        o3d.t.geometry.RaycastingScene()
+
+
+# (name, function) in the order the steps run
+WARM_UP_STEPS = (
+    ('scipy', _warm_scipy),
+    ('cadquery', _warm_cadquery),
+    ('open3d', _warm_open3d)
+)
+
+# Steps in these states are finished
+FINISHED_STATES = ('ready', 'unavailable', 'failed')
+
+
+class WarmUp:
+    """Runs the warm-up steps once on a background thread"""
+
+    def __init__(self, steps=WARM_UP_STEPS):
+        self.steps = tuple(steps)
+        self.first_paint = None
+        self._lock = threading.Lock()
+        self._states = {name: {"name": name, "state": 'pending', "seconds": None,
+                               "error": None}
+                        for name, _ in self.steps}
+        self._thread = None
+
+    def start(self):
+        """Start the warm-up unless it already runs; returns status()"""
+        with self._lock:
+            if self._thread is None:
+                self.first_paint = time.perf_counter() - LAUNCHED_AT
+                self._thread = threading.Thread(target=self.run, name='warm-up',
+                                                daemon=True)
+                self._thread.start()
+        return self.status()
+
+    def run(self):
+        """Run every step on the calling thread, recording what happened"""
+        profile = profiling.Profile('warm_up') if profiling.enabled() else None
+        for name, step in self.steps:
+            self._update(name, state='loading')
+            if profile is not None:
+                profile.mark(name)
+            start = time.perf_counter()
+            try:
+                step()
+                state, error = 'ready', None
+            except ImportError as e:
+                # Optional dependencies may be missing or broken
+                state, error = 'unavailable', str(e)
+            except Exception as e:
+                state, error = 'failed', str(e)
+            self._update(name, state=state, error=error,
+                         seconds=time.perf_counter() - start)
+        if profile is not None:
+            profiling.write_log(profile.finish())
+
+    def wait(self, timeout=None):
+        """Wait for a started warm-up; returns whether it has finished"""
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        return self.status()["ready"]
+
+    def _update(self, name, **values):
+        with self._lock:
+            self._states[name].update(values)
+
+    def status(self):
+        """Readiness of the backend for app.js
+
+        ready is set once every step has finished, whether or not its module
+        could be loaded; modules lists the state ('pending', 'loading',
+        'ready', 'unavailable' or 'failed'), seconds and error of each step.
+        """
+        with self._lock:
+            modules = [dict(self._states[name]) for name, _ in self.steps]
+        return {
+            "started": self._thread is not None,
+            "ready": all(module["state"] in FINISHED_STATES for module in modules),
+            "uptime": time.perf_counter() - LAUNCHED_AT,
+            "first_paint": self.first_paint,
+            "warm_up_seconds": sum(module["seconds"] or 0.0 for module in modules),
+            "modules": modules
+        }
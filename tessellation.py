@@ -0,0 +1,251 @@
+"""B-rep tessellation of CadQuery shapes into NumPy mesh arrays
+
+Large assemblies are split into solids and loose shells and faces (or
+batches of faces for a single big solid) and tessellated on a process pool.
+Pieces travel to the workers as BREP bytes and come back as welded
+float32/uint32 arrays, which are concatenated with index offsets. On
+request the face of every triangle is returned too, as an index into
+shape.Faces(), for the B-rep diff (see brep_diff).
+"""
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from mesh_utils import compute_vertex_normals, merge_duplicate_vertices
+
+# Default B-rep tessellation tolerances (linear in model units, angular in rad)
+DEFAULT_TOLERANCE = 0.1
+DEFAULT_ANGULAR_TOLERANCE = 0.1
+
+# Worker processes for tessellation; 1 tessellates serially in-process
+TESSELLATION_WORKERS = int(
+    os.environ.get('TESSELLATION_WORKERS', os.cpu_count() or 1))
+
+# Shapes with fewer faces than this are not worth the process round trip
+MIN_PARALLEL_FACES = 64
+
+# Each worker gets a few batches so uneven pieces still balance out
+BATCHES_PER_WORKER = 4
+
+_pool = None
+_pool_workers = 0
+
+
+def workplane_to_shape(result):
+    """Combine the shapes of an imported Workplane into a single shape"""
+    import cadquery as cq
+
+    shapes = [obj for obj in result.vals() if isinstance(obj, cq.Shape)]
+    if len(shapes) == 1:
+        return shapes[0]
+    return cq.Compound.makeCompound(shapes)
+
+
+def face_triangle_counts(shape):
+    """Number of triangles of each face of a meshed shape, in shape.Faces() order"""
+    from OCP.BRep import BRep_Tool
+    from OCP.TopLoc import TopLoc_Location
+
+    counts = []
+    for face in shape.Faces():
+        triangulation = BRep_Tool.Triangulation_s(face.wrapped, TopLoc_Location())
+        counts.append(0 if triangulation is None else triangulation.NbTriangles())
+    return np.array(counts, dtype=np.int64)
+
+
+def _tessellate_arrays(shape, tolerance, angular_tolerance, faces=False):
+    """Tessellate a shape into welded vertex and triangle arrays
+
+    With faces=True the int32 face index of every triangle is returned as a
+    third array, or None if the triangles cannot be attributed to faces.
+    """
+    points, indices = shape.tessellate(tolerance, angular_tolerance)
+
+    vertices = np.array([point.toTuple() for point in points],
+                        dtype=np.float32).reshape(-1, 3)
+    triangles = np.array(indices, dtype=np.int64).reshape(-1, 3)
+
+    # Faces are meshed separately, so vertices on shared edges are duplicated
+    if not faces:
+        return merge_duplicate_vertices(vertices, triangles)
+
+    # shape.tessellate appends the triangles face by face in shape.Faces() order
+    counts = face_triangle_counts(shape)
+    face_ids = None
+    if counts.sum() == len(triangles):
+        face_ids = np.repeat(np.arange(len(counts), dtype=np.int32), counts)
+    vertices, triangles, kept = merge_duplicate_vertices(
+        vertices, triangles, return_kept=True)
+    return vertices, triangles, None if face_ids is None else face_ids[kept]
+
+
+def tessellate_shape(shape, tolerance=DEFAULT_TOLERANCE,
+                     angular_tolerance=DEFAULT_ANGULAR_TOLERANCE, faces=False):
+    """Tessellate a CadQuery shape straight into NumPy arrays
+
+    Returns welded (vertices, normals, triangles) as float32/uint32 arrays,
+    plus the face ids of the triangles with faces=True (see
+    _tessellate_arrays).
+    """
+    arrays = _tessellate_arrays(shape, tolerance, angular_tolerance, faces)
+    vertices, triangles = arrays[:2]
+    normals = compute_vertex_normals(vertices, triangles)
+    if faces:
+        return vertices, normals, triangles, arrays[2]
+    return vertices, normals, triangles
+
+
+def _tessellate_brep(brep_bytes, tolerance, angular_tolerance, faces=False):
+    """Worker entry point: rebuild a shape from BREP bytes and tessellate it"""
+    import cadquery as cq
+
+    shape = cq.Shape.importBrep(io.BytesIO(brep_bytes))
+    return _tessellate_arrays(shape, tolerance, angular_tolerance, faces)
+
+
+def _to_brep_bytes(shape):
+    buffer = io.BytesIO()
+    shape.exportBrep(buffer)
+    return buffer.getvalue()
+
+
+def _free_shapes(shape, kind, outside):
+    """Sub-shapes of one kind that are not part of a sub-shape of another"""
+    import cadquery as cq
+    from OCP.TopExp import TopExp_Explorer
+
+    explorer = TopExp_Explorer(shape.wrapped, kind, outside)
+    shapes = []
+    while explorer.More():
+        shapes.append(cq.Shape.cast(explorer.Current()))
+        explorer.Next()
+    return shapes
+
+
+def top_level_shapes(shape):
+    """Solids of a shape plus the shells and faces outside of any solid"""
+    from OCP.TopAbs import TopAbs_SOLID, TopAbs_SHELL, TopAbs_FACE
+
+    return (shape.Solids() + _free_shapes(shape, TopAbs_SHELL, TopAbs_SOLID) +
+            _free_shapes(shape, TopAbs_FACE, TopAbs_SHELL))
+
+
+def split_shape(shape, num_batches):
+    """Split a shape into at most num_batches compounds of sub-shapes
+
+    An assembly is split over its solids and loose shells and faces, a
+    single body over its faces. Shapes whose pieces would not cover every
+    face exactly once (faces shared between solids) are not split.
+    """
+    face_count = len(shape.Faces())
+    if face_count < MIN_PARALLEL_FACES:
+        return [shape]
+    items = top_level_shapes(shape)
+    if len(items) < 2:
+        items = shape.Faces()
+    if len(items) < 2 or sum(len(item.Faces()) for item in items) != face_count:
+        return [shape]
+
+    import cadquery as cq
+
+    # Contiguous batches keep neighbouring faces together
+    batches = np.array_split(np.arange(len(items)), min(num_batches, len(items)))
+    return [cq.Compound.makeCompound([items[i] for i in batch])
+            for batch in batches if len(batch)]
+
+
+def concatenate_pieces(pieces):
+    """Concatenate (vertices, triangles) pieces, offsetting the indices"""
+    offsets = np.cumsum([0] + [len(piece[0]) for piece in pieces[:-1]])
+    vertices = np.concatenate([piece[0] for piece in pieces])
+    triangles = np.concatenate([
+        piece[1].astype(np.int64) + offset
+        for piece, offset in zip(pieces, offsets)
+    ])
+    return vertices.astype(np.float32, copy=False), triangles
+
+
+def piece_face_indices(shape, pieces):
+    """Index in shape.Faces() of every face of each piece, in piece.Faces() order
+
+    The pieces of split_shape list solids before loose shells and faces,
+    which need not be the order of shape.Faces().
+    """
+    from OCP.TopTools import TopTools_IndexedMapOfShape
+
+    faces = TopTools_IndexedMapOfShape()
+    for face in shape.Faces():
+        faces.Add(face.wrapped)
+    return [np.array([faces.FindIndex(face.wrapped) - 1 for face in piece.Faces()],
+                     dtype=np.int32)
+            for piece in pieces]
+
+
+def concatenate_face_ids(face_ids, face_indices):
+    """Concatenate per-piece face ids, mapped to the whole shape's faces
+
+    face_indices holds the index in shape.Faces() of every face of each
+    piece (see piece_face_indices). Returns None if any piece has no face
+    ids.
+    """
+    if any(ids is None for ids in face_ids):
+        return None
+    return np.concatenate([indices[ids]
+                           for ids, indices in zip(face_ids, face_indices)])
+
+
+def _get_pool(workers):
+    """Lazily create (or resize) the shared tessellation process pool"""
+    global _pool, _pool_workers
+
+    if _pool is None or _pool_workers != workers:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+        # Spawn avoids forking the Eel/gevent event loop into the workers
+        _pool = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        _pool_workers = workers
+    return _pool
+
+
+def tessellate_parallel(shape, tolerance=DEFAULT_TOLERANCE,
+                        angular_tolerance=DEFAULT_ANGULAR_TOLERANCE,
+                        workers=None, faces=False):
+    """Tessellate a shape on a process pool, one batch of solids/faces per task
+
+    Falls back to tessellate_shape for small shapes or workers <= 1. With
+    faces=True the face ids of the triangles are returned as a fourth
+    array, as in tessellate_shape.
+    """
+    workers = TESSELLATION_WORKERS if workers is None else workers
+    pieces = [shape]
+    if workers > 1:
+        pieces = split_shape(shape, workers * BATCHES_PER_WORKER)
+    if len(pieces) < 2:
+        if faces:
+            return tessellate_shape(shape, tolerance, angular_tolerance, faces=True)
+        return tessellate_shape(shape, tolerance, angular_tolerance)
+
+    pool = _get_pool(workers)
+    futures = [pool.submit(_tessellate_brep, _to_brep_bytes(piece),
+                           tolerance, angular_tolerance, faces)
+               for piece in pieces]
+    results = [future.result() for future in futures]
+    vertices, triangles = concatenate_pieces(results)
+
+    # Weld the seams between batches like a single tessellation would
+    vertices, triangles, kept = merge_duplicate_vertices(
+        vertices, triangles, return_kept=True)
+    normals = compute_vertex_normals(vertices, triangles)
+    if not faces:
+        return vertices, normals, triangles
+
+    # split_shape only splits when the pieces cover every face once
+    face_ids = concatenate_face_ids([result[2] for result in results],
+                                    piece_face_indices(shape, pieces))
+    if face_ids is None:
+        return vertices, normals, triangles, None
+    return vertices, normals, triangles, face_ids[kept]
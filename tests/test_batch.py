@@ -0,0 +1,223 @@
+import unittest
+import tempfile
+import json
+import csv
+import io
+import os
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import batch
+import comparison
+import file_comparison
+from mesh_cache import MeshCache
+from tests.test_cad_processing import write_binary_stl
+
+REPO_DIR = Path(__file__).parent.parent
+
+
+def square_corners(z=0.0):
+    """Two triangles covering the unit square at height z"""
+    return np.array([
+        [[0, 0, z], [1, 0, z], [1, 1, z]],
+        [[0, 0, z], [1, 1, z], [0, 1, z]]
+    ], dtype=np.float32)
+
+
+class TestBatchComparison(unittest.TestCase):
+    """Test suite for the headless comparison API and batch CLI"""
+
+    def setUp(self):
+        """Two squares 0.05 apart, with the mesh cache disabled"""
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.file_a = self.test_dir / "a.stl"
+        self.file_b = self.test_dir / "b.stl"
+        write_binary_stl(self.file_a, square_corners(0.0))
+        write_binary_stl(self.file_b, square_corners(0.05))
+
+        # Worker processes read the environment, this process the patch
+        self.patches = [
+            patch.dict(os.environ, {"MESH_CACHE_MAX_BYTES": "0"}),
+            patch.object(comparison, 'MESH_CACHE',
+                         MeshCache(self.test_dir / "cache", max_bytes=0))
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        """Clean up test fixtures"""
+        for p in self.patches:
+            p.stop()
+        shutil.rmtree(self.test_dir)
+
+    def test_compare_files(self):
+        """Distances and matching statistics of an unaligned pair"""
+        result = file_comparison.compare_files(self.file_a, self.file_b, align=False)
+
+        self.assertNotIn("error", result)
+        self.assertAlmostEqual(result["distance"]["max"], 0.05, places=5)
+        self.assertAlmostEqual(result["distance"]["signed_max"], -0.05, places=5)
+        self.assertEqual(result["matching"]["percent_matching_a"], 100.0)
+        self.assertEqual(result["vertices_a"], 4)
+        self.assertEqual(result["region_count"], 0)
+        self.assertEqual(comparison.MESH_STORE, {})
+
+        result = file_comparison.compare_files(self.file_a, self.file_b, align=False,
+                                               threshold=0.01)
+        self.assertEqual(result["region_count"], 1)
+        self.assertEqual(result["regions"][0]["sign"], "under")
+        self.assertAlmostEqual(result["regions"][0]["area"], 1.0, places=5)
+
+    def test_brep_diff_falls_back_for_meshes(self):
+        """Without B-rep faces the full comparison runs"""
+        result = file_comparison.compare_files(self.file_a, self.file_b, align=False,
+                                               brep_diff=True)
+
+        self.assertIn("error", result["brep"])
+        self.assertAlmostEqual(result["distance"]["max"], 0.05, places=5)
+        self.assertIn("regions", result)
+
+    def test_main_hausdorff_gate(self):
+        """--hausdorff only checks the tolerance; failing pairs fail the run"""
+        json_path = self.test_dir / "gate.json"
+
+        exit_code = batch.main([str(self.file_a), str(self.file_b), '--no-align',
+                                '--workers', '1', '--hausdorff', '0.1',
+                                '-o', str(json_path)])
+        self.assertEqual(exit_code, 0)
+        with open(json_path) as f:
+            record = json.load(f)[0]
+        self.assertTrue(record["hausdorff"]["passed"])
+        self.assertNotIn("distance", record)
+
+        exit_code = batch.main([str(self.file_a), str(self.file_b), '--no-align',
+                                '--workers', '1', '--hausdorff', '0.01',
+                                '-o', str(json_path)])
+        self.assertEqual(exit_code, 1)
+        with open(json_path) as f:
+            record = json.load(f)[0]
+        self.assertEqual(record["status"], 'fail')
+        self.assertAlmostEqual(record["hausdorff"]["lower_bound"], 0.05, places=5)
+
+    def test_unsupported_combinations_are_rejected(self):
+        """Flags --reference or --out-of-core would ignore are errors"""
+        for argv in (['--reference', 'a.stl', 'b.stl', '--hausdorff', '0.1'],
+                     ['--reference', 'a.stl', 'b.stl', '--lod', '1'],
+                     ['--reference', 'a.stl', 'b.stl', '--manifest', 'pairs.csv'],
+                     ['a.stl', 'b.stl', '--out-of-core', 'out', '--brep-diff'],
+                     ['a.stl', 'b.stl', '--out-of-core', 'out', '--cleanup', 'none']):
+            with self.assertRaises(SystemExit), \
+                    patch('sys.stderr', new_callable=io.StringIO) as stderr:
+                batch.parse_args(argv)
+            self.assertIn("cannot be combined", stderr.getvalue())
+
+        args = batch.parse_args(['--reference', 'a.stl', 'b.stl', '--cleanup', 'none'])
+        self.assertEqual(args.cleanup, 'none')
+
+        with self.assertRaises(SystemExit), \
+                patch('sys.stderr', new_callable=io.StringIO) as stderr:
+            batch.parse_args(['a.stl', 'b.stl', '--rank-by', 'max'])
+        self.assertIn("--rank-by", stderr.getvalue())
+
+    def test_compare_files_error(self):
+        """Loading errors are reported, not raised"""
+        result = file_comparison.compare_files(self.file_a,
+                                               self.test_dir / "missing.stl",
+                                               align=False)
+
+        self.assertIn("error", result)
+        self.assertEqual(comparison.MESH_STORE, {})
+
+    def test_compare_to_reference(self):
+        """Candidates are ranked against one shared reference index"""
+        file_c = self.test_dir / "c.stl"
+        write_binary_stl(file_c, square_corners(0.2))
+        candidates = [file_c, self.test_dir / "missing.stl", self.file_b]
+
+        with patch.object(comparison, 'SurfaceIndex',
+                          wraps=comparison.SurfaceIndex) as surface_index:
+            result = file_comparison.compare_to_reference(
+                self.file_a, candidates, align=False, threshold=0.1, workers=3)
+
+        self.assertNotIn("error", result)
+        self.assertEqual(surface_index.call_count, 1)
+        ranked = result["candidates"]
+        self.assertEqual([c["name"] for c in ranked], ["b", "c", "missing"])
+        self.assertEqual([c["rank"] for c in ranked], [1, 2, 3])
+        self.assertAlmostEqual(ranked[0]["distance"]["max"], 0.05, places=5)
+        self.assertEqual(ranked[1]["bands"]["over"], 4)
+        self.assertIn("error", ranked[2])
+        self.assertEqual(comparison.MESH_STORE, {})
+
+    def test_main_reference_ranking(self):
+        """--reference writes one ranked record per candidate"""
+        json_path = self.test_dir / "ranking.json"
+
+        exit_code = batch.main(['--reference', str(self.file_a), str(self.file_b),
+                                str(self.file_a), '--no-align', '-o', str(json_path)])
+
+        self.assertEqual(exit_code, 0)
+        with open(json_path) as f:
+            records = json.load(f)
+        self.assertEqual([r["name"] for r in records], ["a", "b"])
+        self.assertEqual(records[0]["distance"]["max"], 0.0)
+        self.assertEqual(records[1]["file_a"], str(self.file_a))
+
+    def test_read_manifest(self):
+        """CSV manifests resolve paths relative to the manifest"""
+        manifest = self.test_dir / "pairs.csv"
+        manifest.write_text("file_a,file_b,name\na.stl,b.stl,rev2\na.stl,a.stl,\n")
+
+        pairs = batch.read_manifest(manifest)
+
+        self.assertEqual(pairs[0], {"name": "rev2", "file_a": str(self.file_a),
+                                    "file_b": str(self.file_b)})
+        self.assertEqual(pairs[1]["name"], "a-a")
+
+    def test_run_batch_parallel_keeps_order(self):
+        """Records come back in input order from the process pool"""
+        pairs = batch.pairs_from_paths([self.file_a, self.file_b,
+                                        self.file_a, self.test_dir / "missing.stl"])
+
+        records = batch.run_batch(pairs, workers=2, options={"align": False})
+
+        self.assertEqual([r["status"] for r in records], ['ok', 'error'])
+        self.assertAlmostEqual(records[0]["distance"]["max"], 0.05, places=5)
+
+    def test_main_writes_json_and_csv(self):
+        """The CLI writes both report formats and signals failures"""
+        json_path = self.test_dir / "report.json"
+        csv_path = self.test_dir / "report.csv"
+
+        exit_code = batch.main([str(self.file_a), str(self.file_b), '--no-align',
+                                '--workers', '1', '-o', str(json_path),
+                                '--csv', str(csv_path)])
+
+        self.assertEqual(exit_code, 0)
+        with open(json_path) as f:
+            self.assertEqual(json.load(f)[0]["status"], 'ok')
+        with open(csv_path, newline='') as f:
+            row = next(csv.DictReader(f))
+        self.assertAlmostEqual(float(row["distance_max"]), 0.05, places=5)
+
+    def test_import_is_headless(self):
+        """Importing the library neither loads Eel nor creates temp/"""
+        code = "import sys, comparison, batch; print('eel' in sys.modules)"
+        output = subprocess.run(
+            [sys.executable, '-c', code], cwd=self.test_dir, capture_output=True,
+            text=True, env=dict(os.environ, PYTHONPATH=str(REPO_DIR)), check=True)
+
+        self.assertEqual(output.stdout.strip(), 'False')
+        self.assertFalse((self.test_dir / "temp").exists())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+import tempfile
+import json
+import shutil
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import benchmark
+
+
+class TestBenchmark(unittest.TestCase):
+    """Test suite for the benchmark harness"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.test_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        """Clean up test fixtures"""
+        shutil.rmtree(self.test_dir)
+
+    def test_grid_mesh_size(self):
+        """Synthetic grids have close to the requested triangle count"""
+        for size in (1000, 100000):
+            vertices, triangles = benchmark.grid_mesh(size)
+            self.assertLess(abs(len(triangles) - size) / size, 0.1)
+            self.assertEqual(int(triangles.max()), len(vertices) - 1)
+
+    def test_measure_records_time_memory_and_errors(self):
+        """Stages report their time and peak memory, or their error"""
+        record = benchmark.measure(lambda: bytearray(4 * 1024 * 1024))
+        self.assertIsNone(record["error"])
+        self.assertGreaterEqual(record["peak_bytes"], 4 * 1024 * 1024)
+
+        record = benchmark.measure(lambda: {"error": "broken\ntraceback"})
+        self.assertEqual(record["error"], "broken")
+        self.assertIsNone(record["seconds"])
+
+    def test_main_saves_and_compares_results(self):
+        """Results are saved with the environment and compared to a baseline"""
+        first = self.test_dir / "first.json"
+        second = self.test_dir / "second.json"
+        args = ['--sizes', '200', '--no-exsample', '--no-memory',
+                '--stages', 'read_stl_manual', 'find_matching_vertices']
+
+        self.assertEqual(benchmark.main(args + ['-o', str(first)]), 0)
+        benchmark.main(args + ['-o', str(second), '--compare', str(first),
+                               '--regression-ratio', '1000'])
+
+        with open(second) as f:
+            report = json.load(f)
+        self.assertIn("commit", report["environment"])
+        self.assertEqual([r["stage"] for r in report["results"]],
+                         ['read_stl_manual', 'find_matching_vertices'])
+        self.assertTrue(all(r["seconds"] is not None for r in report["results"]))
+
+    def test_max_rss_without_resource(self):
+        """Platforms without the resource module record no peak RSS"""
+        with patch.dict(sys.modules, {'resource': None}):
+            self.assertIsNone(benchmark.max_rss_kb())
+
+    def test_compare_results_flags_regressions(self):
+        """Stages slower than the ratio are flagged"""
+        baseline = {"results": [{"case": "c", "stage": "s", "seconds": 1.0}]}
+        current = {"results": [{"case": "c", "stage": "s", "seconds": 2.0}]}
+
+        rows = benchmark.compare_results(current, baseline, ratio=1.5)
+
+        self.assertEqual(rows, [("c", "s", 1.0, 2.0, 2.0, True)])
+
+
+if __name__ == '__main__':
+    unittest.main()
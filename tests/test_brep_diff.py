@@ -0,0 +1,202 @@
+import unittest
+import unittest.mock
+import sys
+import tempfile
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import main
+import tessellation
+from brep_diff import (SIGNATURE_SIZE, signature_hashes, match_faces,
+                       face_vertices, face_maxima)
+from mesh_cache import MeshCache
+from mesh_utils import merge_duplicate_vertices
+from tests.test_cad_processing import module_available
+from tests.test_regions import grid
+
+
+def signature(code, area, offset=0.0):
+    """Signature row of a face whose geometry is shifted by offset"""
+    row = np.zeros(SIGNATURE_SIZE)
+    row[0] = code
+    row[1] = area
+    row[2:11] = np.arange(9) + offset
+    row[11:] = [area * 0.1, area * 0.2, area * 0.3]
+    return row
+
+
+class TestFaceSignatures(unittest.TestCase):
+    """Test suite for face signature hashing and matching"""
+
+    def test_hashes_ignore_noise_below_precision(self):
+        """Equal faces hash equal; moved or resized faces do not"""
+        base = signature(0, 12.5)
+        noisy = base.copy()
+        noisy[2:11] += 1e-7
+        noisy[1] *= 1 + 1e-9
+        moved = signature(0, 12.5, offset=0.01)
+        resized = signature(0, 12.6)
+        retyped = signature(1, 12.5)
+
+        hashes = signature_hashes([base, noisy, moved, resized, retyped])
+
+        self.assertEqual(hashes.dtype, np.uint64)
+        self.assertEqual(hashes[0], hashes[1])
+        self.assertEqual(len(set(hashes.tolist())), 4)
+
+    def test_negative_zero(self):
+        """-0.0 and 0.0 give the same hash"""
+        positive = signature(0, 1.0, offset=-4.0)
+        negative = positive.copy()
+        negative[6] = -0.0
+
+        self.assertEqual(positive[6], 0.0)
+        hashes = signature_hashes([positive, negative])
+        self.assertEqual(hashes[0], hashes[1])
+
+    def test_repeated_hashes_match_one_to_one(self):
+        """A face added to a pattern of equal faces stays unmatched"""
+        hashes_a = np.array([7, 7, 3, 9], dtype=np.uint64)
+        hashes_b = np.array([3, 7, 7, 7], dtype=np.uint64)
+
+        matched_a, matched_b = match_faces(hashes_a, hashes_b)
+
+        np.testing.assert_array_equal(matched_a, [True, True, True, False])
+        np.testing.assert_array_equal(matched_b, [True, True, True, False])
+        np.testing.assert_array_equal(match_faces(hashes_a, [])[0], [False] * 4)
+
+    def test_face_vertices_and_maxima(self):
+        """Vertices and largest values are gathered per selected face"""
+        triangles = np.array([[0, 1, 2], [1, 3, 2], [3, 4, 2]])
+        face_ids = np.array([0, 1, 1])
+
+        np.testing.assert_array_equal(
+            face_vertices(triangles, face_ids, [False, True]), [1, 2, 3, 4])
+        np.testing.assert_array_equal(
+            face_maxima(face_ids, triangles, [0, 1, 2, 5, 0], 3), [2, 5, -np.inf])
+
+    def test_kept_triangles_carry_face_ids(self):
+        """Triangles that collapse when welding drop out of the kept mask"""
+        vertices = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [1, 0, 0]],
+                            dtype=np.float32)
+        triangles = np.array([[0, 1, 2], [0, 1, 3]])
+
+        _, welded, kept = merge_duplicate_vertices(vertices, triangles,
+                                                   return_kept=True)
+
+        self.assertEqual(len(welded), 1)
+        np.testing.assert_array_equal(kept, [True, False])
+        np.testing.assert_array_equal(
+            tessellation.concatenate_face_ids([np.array([0, 1]), np.array([0])],
+                                              [np.array([1, 2]), np.array([0])]),
+            [1, 2, 0])
+        self.assertIsNone(tessellation.concatenate_face_ids(
+            [np.array([0]), None], [np.array([0]), np.array([1])]))
+
+    @unittest.skipUnless(module_available('cadquery'), "cadquery is not available")
+    def test_tessellated_faces(self):
+        """Every triangle of a STEP mesh belongs to one of its faces"""
+        import cadquery as cq
+        step_path = Path(__file__).parent.parent / "exsample" / "example1.step"
+        shape = tessellation.workplane_to_shape(cq.importers.importStep(str(step_path)))
+
+        vertices, _, triangles, face_ids = tessellation.tessellate_shape(
+            shape, faces=True)
+
+        self.assertEqual(len(face_ids), len(triangles))
+        self.assertEqual(face_ids.max(), len(shape.Faces()) - 1)
+
+
+class TestCompareBrep(unittest.TestCase):
+    """Test suite for the face-by-face comparison of stored meshes"""
+
+    def setUp(self):
+        """A 4x4 grid of two faces; in B the right face is raised"""
+        self.patcher = unittest.mock.patch('distance._open3d_available',
+                                           return_value=False)
+        self.patcher.start()
+        vertices, triangles = grid(4)
+        centres = vertices[triangles].mean(axis=1)
+        face_ids = (centres[:, 0] > 2).astype(np.int32)
+
+        raised = vertices.copy()
+        raised[raised[:, 0] >= 3, 2] = 0.5
+        for handle, points, moved in (("brep_A", vertices, 0.0),
+                                      ("brep_B", raised, 0.5)):
+            main.store_mesh(handle, {
+                "vertices": points,
+                "indices": triangles,
+                "face_ids": face_ids,
+                "face_signatures": np.stack([signature(0, 8.0),
+                                             signature(0, 8.0, offset=moved)])
+            })
+
+    def tearDown(self):
+        self.patcher.stop()
+        main.release_mesh("brep_A")
+        main.release_mesh("brep_B")
+
+    def test_only_changed_faces_are_measured(self):
+        """The matched face is skipped, the changed face is measured"""
+        result = main.compare_brep("brep_A", "brep_B", 0.1)
+
+        self.assertNotIn("error", result)
+        self.assertEqual(result["matched_faces"], 1)
+        self.assertEqual(result["changed_faces_a"], 1)
+        self.assertEqual(result["total_vertices_a"], 25)
+        # The right face spans the columns x = 2, 3, 4
+        self.assertEqual(result["measured_vertices_a"], 15)
+        self.assertAlmostEqual(result["distance_a"]["max"], 0.5, places=5)
+        self.assertEqual(result["changed_a"][0]["face"], 1)
+        self.assertEqual(result["changed_a"][0]["type"], "PLANE")
+        self.assertAlmostEqual(result["changed_a"][0]["max_deviation"], 0.5, places=5)
+
+    def test_identical_models(self):
+        """Without changed faces nothing is measured"""
+        result = main.compare_brep("brep_A", "brep_A")
+
+        self.assertEqual(result["matched_faces"], 2)
+        self.assertEqual(result["measured_vertices_a"], 0)
+        self.assertIsNone(result["distance_a"])
+        self.assertEqual(result["changed_b"], [])
+
+    def test_alignment_keeps_face_data(self):
+        """The aligned mesh keeps the signatures of the file"""
+        with unittest.mock.patch('comparison.register', return_value=(np.eye(4), [])):
+            main.comparison.register_meshes("brep_A", "brep_B")
+
+        self.assertIn('brep_faces', main.get_mesh("brep_B").derived)
+
+    def test_meshes_without_brep_data(self):
+        main.store_mesh("brep_B", {"vertices": [0, 0, 0, 1, 0, 0, 0, 1, 0],
+                                   "indices": [0, 1, 2]})
+
+        self.assertIn("error", main.compare_brep("brep_A", "brep_B"))
+
+    def test_face_data_is_cached(self):
+        """B-rep face arrays round-trip through the mesh cache"""
+        cache_dir = Path(tempfile.mkdtemp())
+        try:
+            cache = MeshCache(cache_dir)
+            entry = main.get_mesh("brep_A")
+            arrays = {"vertices": entry.vertices, "normals": entry.normals,
+                      "indices": entry.indices}
+            arrays.update(entry.derived['brep_faces'])
+            cache.put("step", arrays)
+            cache.put("stl", {"vertices": entry.vertices, "normals": entry.normals,
+                              "indices": entry.indices})
+
+            np.testing.assert_array_equal(cache.get("step")["face_ids"],
+                                          arrays["face_ids"])
+            self.assertNotIn("face_ids", cache.get("stl"))
+        finally:
+            shutil.rmtree(cache_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -10,6 +10,28 @@ from unittest.mock import patch, MagicMock
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 import main
+import comparison
+import tessellation
+
+
+def module_available(name):
+    """Check whether an optional heavy dependency can be imported"""
+    try:
+        __import__(name)
+        return True
+    except Exception:
+        return False
+
+
+def write_binary_stl(path, tri_vertices):
+    """Write (n, 3, 3) triangle corners as a binary STL file"""
+    import numpy as np
+    records = np.zeros(len(tri_vertices), dtype=main.STL_TRIANGLE_DTYPE)
+    records['vertices'] = tri_vertices
+    with open(path, 'wb') as f:
+        f.write(b'Synthetic STL'.ljust(80, b'\x00'))
+        f.write(len(tri_vertices).to_bytes(4, 'little'))
+        f.write(records.tobytes())
 
 
 class TestCADProcessing(unittest.TestCase):
@@ -201,5 +223,392 @@ class TestCADProcessing(unittest.TestCase):
         self.assertIn("distances", result)
 
 
+class TestMeshStore(unittest.TestCase):
+    """Test suite for the server-side mesh store"""
+    
+    def setUp(self):
+        """Store two small meshes under handles"""
+        self.mesh_data_a = {
+            "vertices": [0, 0, 0, 1, 0, 0, 0, 1, 0],
+            "normals": [0, 0, 1, 0, 0, 1, 0, 0, 1],
+            "indices": [0, 1, 2]
+        }
+        self.mesh_data_b = {
+            "vertices": [0.05, 0, 0, 1.5, 0, 0, 0.05, 1, 0],
+            "normals": [0, 0, 1, 0, 0, 1, 0, 0, 1],
+            "indices": [0, 1, 2]
+        }
+        main.store_mesh("test_A", self.mesh_data_a)
+        main.store_mesh("test_B", self.mesh_data_b)
+    
+    def tearDown(self):
+        """Release stored meshes"""
+        main.release_mesh("test_A")
+        main.release_mesh("test_B")
+    
+    def test_store_mesh_compact_arrays(self):
+        """Stored meshes use float32 positions and uint32 indices"""
+        import numpy as np
+        entry = main.get_mesh("test_A")
+        
+        self.assertEqual(entry["vertices"].dtype, np.float32)
+        self.assertEqual(entry["normals"].dtype, np.float32)
+        self.assertEqual(entry["indices"].dtype, np.uint32)
+        self.assertEqual(entry["vertices"].shape, (3, 3))
+        self.assertEqual(entry["indices"].shape, (1, 3))
+    
+    def test_get_mesh_unknown_handle(self):
+        """Unknown handles raise KeyError"""
+        with self.assertRaises(KeyError):
+            main.get_mesh("missing")
+    
+    def test_find_matching_vertices_with_handles(self):
+        """Comparison functions accept handles instead of mesh data"""
+        result = main.find_matching_vertices("test_A", "test_B", 0.1)
+        
+        self.assertNotIn("error", result)
+        self.assertEqual(result["matching_vertices_a"], [True, False, True])
+        self.assertEqual(result["stats"]["num_matching_b"], 2)
+    
+    def test_find_matching_vertices_missing_handle(self):
+        """Missing handles are reported as an error"""
+        main.release_mesh("test_B")
+        result = main.find_matching_vertices("test_A", "test_B")
+        
+        self.assertIn("error", result)
+    
+    def test_encode_mesh_binary(self):
+        """Binary transport round-trips through little-endian buffers"""
+        import base64
+        import numpy as np
+        result = main.encode_mesh_binary(main.get_mesh("test_A"))
+        
+        self.assertEqual(result["encoding"], "base64")
+        self.assertEqual(result["vertex_count"], 3)
+        self.assertEqual(result["triangle_count"], 1)
+        
+        vertices = np.frombuffer(base64.b64decode(result["vertices"]), dtype='<f4')
+        indices = np.frombuffer(base64.b64decode(result["indices"]), dtype='<u4')
+        np.testing.assert_array_equal(vertices, self.mesh_data_a["vertices"])
+        np.testing.assert_array_equal(indices, self.mesh_data_a["indices"])
+
+
+class TestSTLReader(unittest.TestCase):
+    """Test suite for the vectorized STL reader"""
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.test_dir = tempfile.mkdtemp()
+    
+    def tearDown(self):
+        """Clean up test fixtures"""
+        import shutil
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+    
+    def test_binary_stl_welds_shared_vertices(self):
+        """Two triangles sharing an edge produce four vertices"""
+        import numpy as np
+        quad = np.array([
+            [[0, 0, 0], [1, 0, 0], [0, 1, 0]],
+            [[1, 0, 0], [1, 1, 0], [0, 1, 0]]
+        ], dtype=np.float32)
+        stl_path = Path(self.test_dir) / "quad.stl"
+        write_binary_stl(stl_path, quad)
+        
+        vertices, normals, triangles = main.read_stl_arrays(str(stl_path))
+        
+        self.assertEqual(vertices.shape, (4, 3))
+        self.assertEqual(triangles.dtype, np.uint32)
+        np.testing.assert_array_equal(vertices[triangles], quad)
+        np.testing.assert_allclose(normals, [[0, 0, 1]] * 4)
+    
+    def test_binary_stl_with_solid_header(self):
+        """Binary files whose header starts with 'solid' are not parsed as ASCII"""
+        import numpy as np
+        triangle = np.array([[[0, 0, 0], [1, 0, 0], [0, 1, 0]]], dtype=np.float32)
+        stl_path = Path(self.test_dir) / "solid.stl"
+        write_binary_stl(stl_path, triangle)
+        with open(stl_path, 'r+b') as f:
+            f.write(b'solid exported')
+        
+        result = main.read_stl_manual(str(stl_path))
+        
+        self.assertNotIn("error", result)
+        self.assertEqual(len(result["indices"]), 3)
+    
+    def test_ascii_stl(self):
+        """ASCII STL files are detected and parsed"""
+        stl_path = Path(self.test_dir) / "ascii.stl"
+        stl_path.write_text(
+            "solid test\n"
+            " facet normal 0 0 1\n  outer loop\n"
+            "   vertex 0 0 0\n   vertex 1 0 0\n   vertex 0 1 0\n"
+            "  endloop\n endfacet\n"
+            " facet normal 0 0 1\n  outer loop\n"
+            "   vertex 1.0e0 0 0\n   vertex 1 1 0\n   vertex 0 1 0\n"
+            "  endloop\n endfacet\n"
+            "endsolid test\n"
+        )
+        
+        result = main.read_stl_manual(str(stl_path))
+        
+        self.assertNotIn("error", result)
+        self.assertEqual(len(result["vertices"]), 12)
+        self.assertEqual(len(result["normals"]), 12)
+        self.assertEqual(len(result["indices"]), 6)
+    
+    def test_truncated_binary_stl(self):
+        """Truncated binary files are reported as errors"""
+        stl_path = Path(self.test_dir) / "truncated.stl"
+        with open(stl_path, 'wb') as f:
+            f.write(b'\x00' * 80)
+            f.write((10).to_bytes(4, 'little'))
+            f.write(b'\x00' * 50)
+        
+        result = main.read_stl_manual(str(stl_path))
+        
+        self.assertIn("error", result)
+    
+    @unittest.skipUnless(module_available('open3d'), "open3d is not available")
+    def test_read_stl_manual_speed_against_open3d(self):
+        """The vectorized reader matches read_stl_to_json and is not slower"""
+        import time
+        import numpy as np
+        
+        # Closed grid surface so both readers keep every triangle
+        size = 200
+        grid = np.stack(np.meshgrid(np.arange(size + 1), np.arange(size + 1),
+                                    indexing='ij'), axis=-1).astype(np.float32)
+        corner = grid[:-1, :-1].reshape(-1, 2)
+        offsets = np.array([[0, 0], [1, 0], [0, 1], [1, 0], [1, 1], [0, 1]],
+                           dtype=np.float32)
+        xy = (corner[:, None, :] + offsets[None, :, :]).reshape(-1, 3, 2)
+        tri_vertices = np.concatenate([xy, np.zeros(xy.shape[:2] + (1,),
+                                                    dtype=np.float32)], axis=-1)
+        stl_path = Path(self.test_dir) / "grid.stl"
+        write_binary_stl(stl_path, tri_vertices)
+        
+        start = time.perf_counter()
+        manual = main.read_stl_manual(str(stl_path))
+        manual_time = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        reference = main.read_stl_to_json(str(stl_path))
+        reference_time = time.perf_counter() - start
+        
+        self.assertEqual(len(manual["vertices"]), len(reference["vertices"]))
+        self.assertEqual(len(manual["normals"]), len(reference["normals"]))
+        self.assertEqual(len(manual["indices"]), len(reference["indices"]))
+        self.assertLess(manual_time, reference_time * 2)
+
+
+class TestTessellation(unittest.TestCase):
+    """Test suite for direct B-rep tessellation"""
+    
+    def test_tessellate_shape_welds_face_seams(self):
+        """Vertices duplicated across faces are merged"""
+        import numpy as np
+        
+        class Point:
+            def __init__(self, *coords):
+                self.coords = coords
+            
+            def toTuple(self):
+                return self.coords
+        
+        # Two faces meshed separately share the edge (1,0,0)-(0,1,0)
+        points = [Point(0, 0, 0), Point(1, 0, 0), Point(0, 1, 0),
+                  Point(1, 0, 0), Point(1, 1, 0), Point(0, 1, 0)]
+        shape = MagicMock()
+        shape.tessellate.return_value = (points, [(0, 1, 2), (3, 4, 5)])
+        
+        vertices, normals, triangles = tessellation.tessellate_shape(shape, 0.05, 0.2)
+        
+        shape.tessellate.assert_called_once_with(0.05, 0.2)
+        self.assertEqual(vertices.shape, (4, 3))
+        self.assertEqual(vertices.dtype, np.float32)
+        self.assertEqual(triangles.dtype, np.uint32)
+        self.assertEqual(triangles.shape, (2, 3))
+        np.testing.assert_allclose(normals, [[0, 0, 1]] * 4)
+    
+    def test_processing_params_include_tolerance_for_brep(self):
+        """Tessellation tolerances only affect B-rep cache keys"""
+        step_params = main.mesh_processing_params('.step', 0.05, 0.2)
+        stl_params = main.mesh_processing_params('.stl', 0.05, 0.2)
+        
+        self.assertEqual(step_params["tolerance"], 0.05)
+        self.assertEqual(step_params["angular_tolerance"], 0.2)
+        self.assertNotIn("tolerance", stl_params)
+    
+    def test_concatenate_pieces_offsets_indices(self):
+        """Indices of later pieces are offset by the preceding vertex counts"""
+        import numpy as np
+        piece = (np.zeros((3, 3), dtype=np.float32),
+                 np.array([[0, 1, 2]], dtype=np.uint32))
+        
+        vertices, triangles = tessellation.concatenate_pieces([piece, piece, piece])
+        
+        self.assertEqual(vertices.shape, (9, 3))
+        np.testing.assert_array_equal(triangles, [[0, 1, 2], [3, 4, 5], [6, 7, 8]])
+    
+    def test_tessellate_parallel_single_worker_is_serial(self):
+        """One worker tessellates in-process without splitting the shape"""
+        shape = MagicMock()
+        with patch.object(tessellation, 'tessellate_shape') as mock_serial, \
+                patch.object(tessellation, 'split_shape') as mock_split:
+            tessellation.tessellate_parallel(shape, 0.1, 0.1, workers=1)
+        
+        mock_serial.assert_called_once_with(shape, 0.1, 0.1)
+        mock_split.assert_not_called()
+    
+    def test_split_shape_needs_every_face_once(self):
+        """Pieces that would lose or repeat faces are tessellated serially"""
+        def body(face_count):
+            item = MagicMock()
+            item.Faces.return_value = [None] * face_count
+            return item
+        
+        shape = body(100)
+        # Two solids plus a loose shell, but one face belongs to both solids
+        with patch.object(tessellation, 'top_level_shapes',
+                          return_value=[body(40), body(40), body(21)]):
+            self.assertEqual(tessellation.split_shape(shape, 8), [shape])
+    
+    @unittest.skipUnless(module_available('cadquery'), "cadquery is not available")
+    def test_split_shape_keeps_loose_faces(self):
+        """Shells and faces next to several solids are tessellated too"""
+        import cadquery as cq
+        solids = [cq.Solid.makeSphere(1 + i, cq.Vector(10 * i, 0, 0)) for i in range(2)]
+        faces = cq.Workplane().sphere(1).translate((0, 20, 0)).faces().vals()
+        boxes = cq.Workplane().rarray(3, 3, 8, 8).box(1, 1, 1).solids().vals()
+        shape = cq.Compound.makeCompound(solids + boxes + faces)
+        
+        pieces = tessellation.split_shape(shape, 4)
+        
+        self.assertGreater(len(pieces), 1)
+        self.assertEqual(sum(len(piece.Faces()) for piece in pieces),
+                         len(shape.Faces()))
+    
+    @unittest.skipUnless(module_available('cadquery'), "cadquery is not available")
+    def test_parallel_face_ids_follow_shape_faces(self):
+        """Face ids of a compound with a loose face before its solids match serial"""
+        import cadquery as cq
+        import numpy as np
+        face = cq.Face.makePlane(2, 2, cq.Vector(0, 0, 20))
+        solids = [cq.Solid.makeBox(1, 1, 1, cq.Vector(3 * i, 0, 0)) for i in range(3)]
+        shape = cq.Compound.makeCompound([face] + solids)
+        
+        serial = tessellation.tessellate_shape(shape, faces=True)
+        with patch.object(tessellation, 'MIN_PARALLEL_FACES', 1):
+            parallel = tessellation.tessellate_parallel(shape, workers=2, faces=True)
+        
+        face_count = len(shape.Faces())
+        np.testing.assert_array_equal(np.bincount(parallel[3], minlength=face_count),
+                                      np.bincount(serial[3], minlength=face_count))
+        # The loose face is shape.Faces()[0], at z = 20
+        np.testing.assert_allclose(parallel[0][parallel[2][parallel[3] == 0]][..., 2],
+                                   20)
+    
+    @unittest.skipUnless(module_available('cadquery'), "cadquery is not available")
+    def test_tessellate_parallel_matches_serial(self):
+        """Parallel tessellation of a multi-solid STEP matches the serial result"""
+        import cadquery as cq
+        import numpy as np
+        step_path = Path(__file__).parent.parent / "exsample" / "PA.step"
+        shape = tessellation.workplane_to_shape(cq.importers.importStep(str(step_path)))
+        
+        serial = tessellation.tessellate_shape(shape)
+        parallel = tessellation.tessellate_parallel(shape, workers=2)
+        
+        # Faces are meshed independently, so only seam details may differ
+        self.assertAlmostEqual(len(parallel[2]) / len(serial[2]), 1.0, places=2)
+        np.testing.assert_allclose(parallel[0].min(axis=0), serial[0].min(axis=0))
+        np.testing.assert_allclose(parallel[0].max(axis=0), serial[0].max(axis=0))
+
+
+class TestMatchingCache(unittest.TestCase):
+    """Test suite for cached nearest-neighbour matching"""
+    
+    def setUp(self):
+        """Store two small meshes under handles"""
+        main.store_mesh("match_A", {
+            "vertices": [0, 0, 0, 1, 0, 0, 0, 1, 0],
+            "normals": [0, 0, 1] * 3,
+            "indices": [0, 1, 2]
+        })
+        main.store_mesh("match_B", {
+            "vertices": [0.05, 0, 0, 1.5, 0, 0, 0, 1.2, 0],
+            "normals": [0, 0, 1] * 3,
+            "indices": [0, 1, 2]
+        })
+    
+    def tearDown(self):
+        """Release stored meshes"""
+        main.release_mesh("match_A")
+        main.release_mesh("match_B")
+    
+    def test_threshold_changes_reuse_distances(self):
+        """Only the first call queries the KD-trees"""
+        first = main.find_matching_vertices("match_A", "match_B", 0.1)
+        
+        with patch.object(comparison, 'get_vertex_tree') as mock_tree:
+            second = main.find_matching_vertices("match_A", "match_B", 0.3)
+        
+        mock_tree.assert_not_called()
+        self.assertEqual(first["matching_vertices_a"], [True, False, False])
+        self.assertEqual(second["matching_vertices_a"], [True, False, True])
+    
+    def test_cache_invalidated_when_mesh_changes(self):
+        """Re-storing B (e.g. after alignment) recomputes the distances"""
+        main.find_matching_vertices("match_A", "match_B", 0.1)
+        main.store_mesh("match_B", {
+            "vertices": [0, 0, 0, 1, 0, 0, 0, 1, 0],
+            "normals": [0, 0, 1] * 3,
+            "indices": [0, 1, 2]
+        })
+        
+        result = main.find_matching_vertices("match_A", "match_B", 0.1)
+        
+        self.assertEqual(result["matching_vertices_a"], [True, True, True])
+    
+    def test_binary_quantized_distances(self):
+        """Binary transport returns uint16 distances for local thresholding"""
+        import base64
+        import numpy as np
+        result = main.find_matching_vertices("match_A", "match_B", 0.1, 'binary')
+        
+        levels = np.frombuffer(base64.b64decode(result["nearest_distances_a"]),
+                               dtype='<u2')
+        max_level = np.floor(0.3 / result["distance_step"] + 1e-6)
+        
+        self.assertNotIn("matching_vertices_a", result)
+        self.assertEqual((levels <= max_level).tolist(), [True, False, True])
+        self.assertEqual(result["stats"]["num_matching_a"], 1)
+    
+    def test_quantize_saturates_beyond_range(self):
+        """Distances beyond the range map to the top level"""
+        import numpy as np
+        levels, step = main.quantize_distances(np.array([0.0, 1.0, 100.0]))
+        
+        self.assertEqual(levels[0], 0)
+        self.assertLessEqual(levels[1] * step, 1.0)
+        self.assertEqual(levels[2], main.MATCHING_LEVELS)
+    
+    def test_quantize_keeps_distances_within_threshold(self):
+        """A distance one ulp below a threshold is not quantized beyond it"""
+        import numpy as np
+        step = main.MATCHING_RANGE / (main.MATCHING_LEVELS - 1)
+        for threshold in (1234 * step, 1234.5 * step):
+            distance = np.nextafter(threshold, 0.0)
+            
+            levels, _ = main.quantize_distances(np.array([distance]))
+            # The comparison app.js makes in applyMatchingThreshold
+            max_level = np.floor(threshold / step + 1e-6)
+            
+            self.assertLessEqual(levels[0], max_level)
+        levels, _ = main.quantize_distances(np.array([main.MATCHING_RANGE]))
+        self.assertEqual(levels[0], main.MATCHING_LEVELS - 1)
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
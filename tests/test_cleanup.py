@@ -0,0 +1,164 @@
+import unittest
+import sys
+import tempfile
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import comparison
+import readers
+import cleanup
+from tests.test_cad_processing import write_binary_stl
+
+
+def cube():
+    """Closed unit cube of 12 outward-facing triangles"""
+    vertices = np.array([[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0],
+                         [0, 0, 1], [1, 0, 1], [1, 1, 1], [0, 1, 1]], dtype=np.float32)
+    triangles = np.array([[0, 2, 1], [0, 3, 2], [4, 5, 6], [4, 6, 7],
+                          [0, 1, 5], [0, 5, 4], [1, 2, 6], [1, 6, 5],
+                          [2, 3, 7], [2, 7, 6], [3, 0, 4], [3, 4, 7]])
+    return vertices, triangles
+
+
+def signed_volume(vertices, triangles):
+    corners = np.asarray(vertices, dtype=np.float64)[np.asarray(triangles, dtype=np.int64)]
+    return np.einsum('ij,ij->i', corners[:, 0],
+                     np.cross(corners[:, 1], corners[:, 2])).sum() / 6
+
+
+class TestCleanup(unittest.TestCase):
+    """Test suite for the mesh cleanup stages and profiles"""
+
+    def test_weld_merges_near_coincident_vertices(self):
+        """Points within epsilon merge, also across a grid cell boundary"""
+        vertices = np.array([[0, 0, 0], [1e-9, 0, 0],
+                             [1 - 1e-9, 0, 0], [1 + 1e-9, 0, 0],
+                             [2, 0, 0]])
+        triangles = np.array([[0, 2, 4], [1, 3, 4]])
+
+        welded, welded_triangles, source = cleanup.weld(vertices, triangles, 1e-6)
+
+        self.assertEqual(len(welded), 3)
+        np.testing.assert_array_equal(source, [0, 2, 4])
+        np.testing.assert_array_equal(welded_triangles[0], welded_triangles[1])
+
+    def test_degenerate_and_duplicate_triangles(self):
+        vertices = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [2, 0, 0]])
+        triangles = np.array([[0, 1, 2], [0, 0, 2], [0, 1, 3], [2, 1, 0]])
+
+        np.testing.assert_array_equal(
+            cleanup.degenerate_triangles(vertices, triangles), [False, True, True, False])
+        np.testing.assert_array_equal(
+            cleanup.duplicate_triangles(triangles), [False, False, False, True])
+
+    def test_orient_closed_and_open_patches(self):
+        """Closed patches turn outward, open ones follow most of their area"""
+        vertices, triangles = cube()
+        scrambled = triangles.copy()
+        scrambled[[1, 4, 7]] = scrambled[[1, 4, 7]][:, [0, 2, 1]]
+
+        oriented, flipped = cleanup.orient(vertices, scrambled)
+        self.assertEqual(np.count_nonzero(flipped), 3)
+        self.assertAlmostEqual(signed_volume(vertices, oriented), 1.0)
+
+        oriented, flipped = cleanup.orient(vertices, triangles[:, [0, 2, 1]])
+        self.assertTrue(flipped.all())
+
+        # Without its top the cube is open: the one odd triangle is flipped
+        oriented, flipped = cleanup.orient(vertices, scrambled[[0, 1, 4, 5, 6, 7, 8, 9, 10, 11]])
+        np.testing.assert_array_equal(np.flatnonzero(flipped), [1, 2, 5])
+
+    def test_profiles_report_every_stage(self):
+        """Each stage reports its time and what it removed"""
+        vertices, triangles = cube()
+        soup = vertices[triangles].reshape(-1, 3) + 1e-9
+        soup_triangles = np.arange(len(soup)).reshape(-1, 3)
+        soup_triangles = np.concatenate([soup_triangles, soup_triangles[:1]])
+
+        cleaned, cleaned_triangles, (vertex_source, triangle_source), stages = \
+            cleanup.cleanup_mesh(soup, soup_triangles, 'full')
+
+        self.assertEqual(cleaned.dtype, np.float32)
+        self.assertEqual(cleaned_triangles.dtype, np.uint32)
+        self.assertEqual(len(cleaned), 8)
+        self.assertEqual(len(cleaned_triangles), 12)
+        self.assertEqual(len(triangle_source), 12)
+        self.assertEqual([stage["stage"] for stage in stages],
+                         list(cleanup.CLEANUP_PROFILES['full']))
+        self.assertEqual(stages[0]["removed_vertices"], 28)
+        self.assertEqual(stages[2]["removed_triangles"], 1)
+        self.assertEqual(stages[4]["flipped_triangles"], 0)
+        self.assertTrue(all(stage["seconds"] >= 0 for stage in stages))
+
+        _, untouched, _, stages = cleanup.cleanup_mesh(soup, soup_triangles, 'none')
+        self.assertEqual(len(untouched), 13)
+        self.assertEqual(stages, [])
+        with self.assertRaises(ValueError):
+            cleanup.cleanup_mesh(soup, soup_triangles, 'thorough')
+
+    def test_face_ids_follow_the_triangles(self):
+        """Per-triangle B-rep face ids survive the removal of triangles"""
+        vertices, triangles = cube()
+        mesh_data = {"vertices": vertices,
+                     "indices": np.concatenate([triangles, triangles[:2]]),
+                     "face_ids": np.arange(14), "face_signatures": np.zeros((14, 14))}
+
+        cleaned = readers.clean_mesh_data(mesh_data, 'fast')
+
+        np.testing.assert_array_equal(cleaned["face_ids"], np.arange(12))
+        self.assertEqual(len(cleaned["normals"]), 8)
+
+
+class TestCleanupLoading(unittest.TestCase):
+    """Test suite for cleanup profiles in the loading pipeline"""
+
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+        comparison.release_mesh("cleanup_A")
+
+    def test_profiles_change_the_loaded_mesh(self):
+        """Seams that are only nearly closed are welded by 'fast'"""
+        vertices, triangles = cube()
+        corners = vertices[triangles].copy()
+        corners[6:] += np.float32(1e-7)
+        stl_path = self.test_dir / "seams.stl"
+        write_binary_stl(stl_path, corners)
+
+        raw = readers.load_mesh_file(stl_path, cleanup='none')
+        cleaned = readers.load_mesh_file(stl_path, cleanup='fast')
+
+        self.assertGreater(len(raw["vertices"]), 8)
+        self.assertNotIn("cleanup", raw)
+        self.assertEqual(len(cleaned["vertices"]), 8)
+        self.assertEqual(cleaned["cleanup"][0]["stage"], 'weld')
+
+    def test_default_profile_orients(self):
+        """Signed deviations need consistent winding, so the default orients"""
+        vertices, triangles = cube()
+        triangles[[1, 4, 7]] = triangles[[1, 4, 7]][:, [0, 2, 1]]
+        stl_path = self.test_dir / "scrambled.stl"
+        write_binary_stl(stl_path, vertices[triangles])
+
+        loaded = readers.load_mesh_file(stl_path)
+
+        self.assertEqual(cleanup.DEFAULT_CLEANUP, 'full')
+        self.assertAlmostEqual(signed_volume(loaded["vertices"], loaded["indices"]), 1.0,
+                               places=5)
+
+    def test_profiles_have_their_own_cache_entries(self):
+        self.assertNotEqual(comparison.mesh_processing_params('.stl', cleanup='none'),
+                            comparison.mesh_processing_params('.stl', cleanup='full'))
+        self.assertIn("error", comparison.load_mesh(self.test_dir / "a.stl", "cleanup_A",
+                                                    cleanup='thorough'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,201 @@
+import unittest
+import unittest.mock
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import main
+from distance import (SurfaceIndex, closest_points_on_triangles, distance_statistics,
+                      quantize_deviation, distance_histogram, tolerance_bands)
+
+
+def brute_force_distances(points, vertices, triangles):
+    """Unsigned point-to-mesh distances by checking every triangle"""
+    best = np.full(len(points), np.inf)
+    for triangle in triangles:
+        a, b, c = (np.tile(vertices[i], (len(points), 1)) for i in triangle)
+        closest = closest_points_on_triangles(points, a, b, c)
+        best = np.minimum(best, np.linalg.norm(points - closest, axis=1))
+    return best
+
+
+class TestClosestPoints(unittest.TestCase):
+    """Test suite for the vectorized point-triangle closest point"""
+
+    def test_regions(self):
+        """Face, edge and vertex regions of a right triangle"""
+        points = np.array([
+            [0.2, 0.2, 1.0],   # above the face
+            [2.0, 2.0, 0.0],   # beyond the hypotenuse
+            [-1.0, -1.0, 0.0], # beyond vertex a
+            [0.5, -1.0, 0.0],  # below edge ab
+            [3.0, -1.0, 0.0],  # beyond vertex b
+        ])
+        a = np.tile([0.0, 0.0, 0.0], (len(points), 1))
+        b = np.tile([1.0, 0.0, 0.0], (len(points), 1))
+        c = np.tile([0.0, 1.0, 0.0], (len(points), 1))
+
+        closest = closest_points_on_triangles(points, a, b, c)
+
+        np.testing.assert_allclose(closest, [
+            [0.2, 0.2, 0.0],
+            [0.5, 0.5, 0.0],
+            [0.0, 0.0, 0.0],
+            [0.5, 0.0, 0.0],
+            [1.0, 0.0, 0.0],
+        ])
+
+
+class TestSurfaceIndex(unittest.TestCase):
+    """Test suite for point-to-surface distances"""
+
+    def test_matches_brute_force(self):
+        """The KD-tree backend finds the true closest triangle"""
+        rng = np.random.default_rng(1)
+        vertices = rng.random((200, 3)) * 10
+        triangles = rng.integers(0, 200, (300, 3))
+        points = rng.random((500, 3)) * 12 - 1
+
+        index = SurfaceIndex(vertices, triangles, backend='kdtree')
+        signed, _, _ = index.query(points)
+
+        np.testing.assert_allclose(
+            np.abs(signed), brute_force_distances(points, vertices, triangles),
+            atol=1e-9)
+
+    def test_signed_by_face_normal(self):
+        """Points on the normal side are positive, the other side negative"""
+        vertices = np.array([[0, 0, 0], [10, 0, 0], [0, 10, 0]], dtype=np.float64)
+        index = SurfaceIndex(vertices, [[0, 1, 2]], backend='kdtree')
+
+        signed, closest, triangle_ids = index.query([[1, 1, 0.5], [1, 1, -0.25]])
+
+        np.testing.assert_allclose(signed, [0.5, -0.25])
+        np.testing.assert_allclose(closest, [[1, 1, 0], [1, 1, 0]])
+        np.testing.assert_array_equal(triangle_ids, [0, 0])
+
+    def test_distance_statistics(self):
+        """Statistics use absolute values, with the signed range kept"""
+        stats = distance_statistics([-0.5, 0.1, 0.2])
+
+        self.assertAlmostEqual(stats["max"], 0.5)
+        self.assertAlmostEqual(stats["min"], 0.1)
+        self.assertAlmostEqual(stats["signed_min"], -0.5)
+        self.assertEqual(stats["count"], 3)
+
+    def test_quantize_deviation(self):
+        """Levels span [-max, +max] and clamp values beyond it"""
+        levels, offset, step = quantize_deviation([-2.0, -1.0, 0.0, 1.0, 3.0], 1.0)
+
+        self.assertEqual(levels.dtype, np.uint8)
+        np.testing.assert_array_equal(levels[[0, 1, 4]], [0, 0, 255])
+        np.testing.assert_allclose(offset + levels * step, [-1, -1, 0, 1, 1],
+                                   atol=step / 2)
+
+        levels, _, step = quantize_deviation([0.25], 1.0, bits=16)
+        self.assertEqual(levels.dtype, np.uint16)
+        self.assertAlmostEqual(step, 2.0 / 65535)
+        with self.assertRaises(ValueError):
+            quantize_deviation([0.0], 1.0, bits=12)
+
+        levels, offset, step = quantize_deviation([-np.inf, -3.0, 1.0, np.inf], 1.0,
+                                                  beyond=True)
+        np.testing.assert_array_equal(levels, [255, 0, 254, 255])
+        self.assertAlmostEqual(offset + 254 * step, 1.0)
+
+    def test_histogram_and_bands(self):
+        """Out-of-range distances are counted apart from the end bins"""
+        distances = [-0.5, -0.05, 0.0, 0.05, 0.3, 2.0]
+        histogram = distance_histogram(distances, 1.0, bins=4)
+        bands = tolerance_bands(distances, 0.1)
+
+        self.assertEqual(histogram["counts"], [0, 2, 3, 0])
+        self.assertEqual(histogram["above"], 1)
+        self.assertEqual(len(histogram["edges"]), 5)
+        self.assertEqual((bands["under"], bands["within"], bands["over"]), (1, 3, 2))
+        self.assertAlmostEqual(bands["percent_within"], 50.0)
+
+
+class TestCalculateMeshDistance(unittest.TestCase):
+    """Test suite for calculate_mesh_distance with the surface engine"""
+
+    def setUp(self):
+        """A coarse square and a vertex lying above its interior"""
+        main.store_mesh("dist_B", {
+            "vertices": [0, 0, 0, 10, 0, 0, 10, 10, 0, 0, 10, 0],
+            "normals": [0, 0, 1] * 4,
+            "indices": [0, 1, 2, 0, 2, 3]
+        })
+        main.store_mesh("dist_A", {
+            "vertices": [5, 5, 0.5, 2, 3, -0.25, 9, 1, 0.0],
+            "normals": [0, 0, 1] * 3,
+            "indices": [0, 1, 2]
+        })
+
+    def tearDown(self):
+        """Release stored meshes"""
+        main.release_mesh("dist_A")
+        main.release_mesh("dist_B")
+
+    def test_surface_distance_is_independent_of_vertex_density(self):
+        """Distances are measured to B's triangles, not its corners"""
+        with unittest.mock.patch('distance._open3d_available', return_value=False):
+            result = main.calculate_mesh_distance("dist_A", "dist_B")
+
+        self.assertNotIn("error", result)
+        self.assertAlmostEqual(result["max"], 0.5, places=5)
+        self.assertAlmostEqual(result["signed_min"], -0.25, places=5)
+        self.assertEqual(result["count"], 3)
+
+    def test_surface_index_is_reused(self):
+        """The index is built once per stored mesh"""
+        with unittest.mock.patch('distance._open3d_available', return_value=False):
+            main.calculate_mesh_distance("dist_A", "dist_B")
+            index = main.get_surface_index("dist_B")
+            main.calculate_mesh_distance("dist_A", "dist_B", source='samples',
+                                         num_samples=100)
+
+        self.assertIs(main.get_surface_index("dist_B"), index)
+
+    def test_binary_per_point_distances(self):
+        """Full per-point distances are returned as a float32 buffer"""
+        import base64
+        with unittest.mock.patch('distance._open3d_available', return_value=False):
+            result = main.calculate_mesh_distance("dist_A", "dist_B",
+                                                  transport='binary')
+
+        distances = np.frombuffer(
+            base64.b64decode(result["per_point_distances"]), dtype='<f4')
+        np.testing.assert_allclose(distances, [0.5, -0.25, 0.0], atol=1e-6)
+        self.assertEqual(sum(result["histogram"]["counts"]), 3)
+
+    def test_deviation_field(self):
+        """Every vertex of A gets a quantized deviation level"""
+        import base64
+        with unittest.mock.patch('distance._open3d_available', return_value=False):
+            result = main.deviation_field("dist_A", "dist_B", max_deviation=1.0,
+                                          tolerance=0.1, bits=16)
+            cached = main.get_mesh("dist_A").derived['vertex_deviation']
+            coarse = main.deviation_field("dist_A", "dist_B", tolerance=0.3)
+
+        self.assertNotIn("error", result)
+        levels = np.frombuffer(base64.b64decode(result["levels"]), dtype='<u2')
+        np.testing.assert_allclose(result["offset"] + levels * result["step"],
+                                   [0.5, -0.25, 0.0], atol=result["step"])
+        self.assertEqual(result["bands"]["over"], 1)
+        self.assertEqual(result["bands"]["under"], 1)
+        self.assertEqual(sum(result["histogram"]["counts"]), 3)
+
+        # A new range or tolerance reuses the cached distances
+        self.assertIs(main.get_mesh("dist_A").derived['vertex_deviation'], cached)
+        self.assertAlmostEqual(coarse["range"], 0.5)
+        self.assertEqual(len(base64.b64decode(coarse["levels"])), 3)
+        self.assertEqual(coarse["bands"]["within"], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
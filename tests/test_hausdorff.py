@@ -0,0 +1,122 @@
+import unittest
+import unittest.mock
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import main
+import hausdorff
+from distance import SurfaceIndex
+from tests.test_distance import brute_force_distances
+from tests.test_regions import grid
+
+
+class TestCheckDirected(unittest.TestCase):
+    """Test suite for the early-exit Hausdorff bounds"""
+
+    def setUp(self):
+        self.vertices, self.triangles = grid(8)
+        self.index = SurfaceIndex(self.vertices, self.triangles, backend='kdtree')
+
+    def test_distance_bounds_enclose_the_distance(self):
+        rng = np.random.default_rng(1)
+        points = rng.uniform([-1, -1, -1], [9, 9, 1], size=(200, 3))
+        exact = brute_force_distances(points, self.vertices, self.triangles)
+
+        lower, upper = self.index.distance_bounds(points)
+
+        self.assertTrue(np.all(lower <= exact + 1e-9))
+        self.assertTrue(np.all(upper >= exact - 1e-9))
+
+    def test_dense_points_are_settled_by_cells(self):
+        """Points near the surface pass without querying each of them"""
+        rng = np.random.default_rng(2)
+        points = rng.uniform([0, 0, -0.01], [2, 2, 0.01], size=(20000, 3))
+
+        result = hausdorff.check_directed(points, self.index, 0.1)
+
+        self.assertTrue(result["passed"])
+        self.assertLessEqual(result["lower_bound"], 0.01)
+        self.assertGreaterEqual(result["upper_bound"], np.abs(points[:, 2]).max())
+        self.assertLessEqual(result["upper_bound"], 0.1)
+        self.assertLess(result["queried_points"], len(points) / 2)
+
+    def test_outlier_fails_early(self):
+        """A part that is off everywhere is rejected by the first batch"""
+        rng = np.random.default_rng(3)
+        points = rng.uniform([0, 0, 0.5], [8, 8, 0.6], size=(20000, 3))
+
+        result = hausdorff.check_directed(points, self.index, 0.1)
+
+        self.assertFalse(result["passed"])
+        self.assertIsNone(result["upper_bound"])
+        self.assertGreater(result["lower_bound"], 0.1)
+        self.assertLessEqual(result["queried_points"], hausdorff.FIRST_BATCH)
+
+    def test_single_outlier_is_found(self):
+        points = np.concatenate([self.vertices, [[4.5, 4.5, 0.3]]])
+
+        for tolerance in (0.1, 0.0):
+            result = hausdorff.check_directed(points, self.index, tolerance)
+            self.assertFalse(result["passed"])
+            self.assertAlmostEqual(result["lower_bound"], 0.3, places=5)
+
+        result = hausdorff.check_directed(points, self.index, 0.3001)
+        self.assertTrue(result["passed"])
+        self.assertGreaterEqual(result["upper_bound"], 0.3 - 1e-6)
+
+
+class TestHausdorffCheck(unittest.TestCase):
+    """Test suite for the pass/fail check of stored meshes"""
+
+    def setUp(self):
+        """B is A plus a small triangle floating 0.5 above it"""
+        self.patcher = unittest.mock.patch('distance._open3d_available',
+                                           return_value=False)
+        self.patcher.start()
+        vertices, triangles = grid(10)
+        floating = np.array([[4, 4, 0.5], [5, 4, 0.5], [4, 5, 0.5]], dtype=np.float32)
+        main.store_mesh("hausdorff_A", {"vertices": vertices, "indices": triangles})
+        main.store_mesh("hausdorff_B", {
+            "vertices": np.concatenate([vertices, floating]),
+            "indices": np.concatenate([triangles, [[121, 122, 123]]])})
+
+    def tearDown(self):
+        self.patcher.stop()
+        main.release_mesh("hausdorff_A")
+        main.release_mesh("hausdorff_B")
+
+    def test_symmetric_check_finds_the_spike_in_b(self):
+        """A lies on B's surface; only B's floating triangle is off A"""
+        result = main.hausdorff_check("hausdorff_A", "hausdorff_B", 0.1)
+
+        self.assertNotIn("error", result)
+        self.assertFalse(result["passed"])
+        self.assertTrue(result["a_to_b"]["passed"])
+        self.assertFalse(result["b_to_a"]["passed"])
+        self.assertAlmostEqual(result["lower_bound"], 0.5, places=5)
+        self.assertIsNone(result["upper_bound"])
+
+        one_sided = main.hausdorff_check("hausdorff_A", "hausdorff_B", 0.1,
+                                         symmetric=False)
+        self.assertTrue(one_sided["passed"])
+        self.assertIsNone(one_sided["b_to_a"])
+        self.assertLessEqual(one_sided["upper_bound"], 0.1)
+
+    def test_identical_meshes_pass(self):
+        result = main.hausdorff_check("hausdorff_A", "hausdorff_A", 0.01)
+
+        self.assertTrue(result["passed"])
+        self.assertEqual(result["lower_bound"], 0.0)
+
+    def test_invalid_tolerance(self):
+        self.assertIn("error", main.hausdorff_check("hausdorff_A", "hausdorff_B", -1))
+        self.assertIn("error", main.hausdorff_check("hausdorff_A", "missing", 0.1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+import unittest
+import queue
+import sys
+import threading
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import jobs
+
+
+def wait_for_job(manager, job_id):
+    """Block until the job's future has finished"""
+    job = manager.get(job_id)
+    try:
+        job.future.result(timeout=5)
+    except Exception:
+        pass
+    return job
+
+
+class TestJobManager(unittest.TestCase):
+    """Test suite for background jobs"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.manager = jobs.JobManager(max_workers=2)
+
+    def tearDown(self):
+        """Clean up test fixtures"""
+        self.manager.shutdown()
+
+    def test_job_result_and_stage_timings(self):
+        """Jobs report stages, timings and their result"""
+        def work(value):
+            jobs.report('first', 0.2)
+            jobs.report('second', 0.6)
+            return {"value": value}
+
+        job_id = self.manager.submit('work', work, 42)
+        job = wait_for_job(self.manager, job_id)
+        events = self.manager.drain_events()
+
+        self.assertEqual(job.state, 'done')
+        self.assertEqual(job.result, {"value": 42})
+        self.assertEqual([t["stage"] for t in job.timings], ['start', 'first', 'second'])
+
+        self.assertEqual(events[-1]["type"], 'done')
+        self.assertEqual(events[-1]["result"], {"value": 42})
+        progress = [e["progress"] for e in events if e["type"] == 'progress']
+        self.assertEqual(progress, [0.0, 0.2, 0.6])
+
+    def test_job_error(self):
+        """Exceptions are reported as error events"""
+        def work():
+            raise ValueError("broken mesh")
+
+        job = wait_for_job(self.manager, self.manager.submit('work', work))
+
+        self.assertEqual(job.state, 'error')
+        self.assertEqual(self.manager.drain_events()[-1]["error"], "broken mesh")
+
+    def test_cancel_running_job(self):
+        """A running job stops at its next stage after cancellation"""
+        started = threading.Event()
+        release = threading.Event()
+
+        def work():
+            started.set()
+            release.wait(5)
+            jobs.report('after cancel')
+            return "finished"
+
+        job_id = self.manager.submit('work', work)
+        started.wait(5)
+        self.assertTrue(self.manager.cancel(job_id))
+        release.set()
+        job = wait_for_job(self.manager, job_id)
+
+        self.assertEqual(job.state, 'cancelled')
+        self.assertIsNone(job.result)
+        self.assertEqual(self.manager.drain_events()[-1]["type"], 'cancelled')
+
+    def test_cancel_is_not_swallowed_by_error_handling(self):
+        """Cancellation passes through `except Exception` blocks"""
+        started = threading.Event()
+        release = threading.Event()
+
+        def work():
+            started.set()
+            release.wait(5)
+            try:
+                jobs.report('guarded')
+            except Exception:
+                return "swallowed"
+            return "finished"
+
+        job_id = self.manager.submit('work', work)
+        started.wait(5)
+        self.manager.cancel(job_id)
+        release.set()
+
+        self.assertEqual(wait_for_job(self.manager, job_id).state, 'cancelled')
+
+    def test_cancel_between_pickup_and_start(self):
+        """A job cancelled after the pool picked it up still ends with an event"""
+        events = queue.Queue()
+        job = jobs.Job('job-race', 'work', events)
+        job.cancel()
+
+        job.run(lambda: "finished", (), {})
+
+        self.assertEqual(job.state, 'cancelled')
+        self.assertEqual(events.get_nowait()["type"], 'cancelled')
+
+    def test_report_outside_job_is_noop(self):
+        """report() does nothing when not called from a job"""
+        jobs.report('stage', 0.5)
+        self.assertIsNone(jobs.current_job())
+
+    def test_cancel_unknown_job(self):
+        """Unknown job ids cannot be cancelled"""
+        self.assertFalse(self.manager.cancel('job-missing'))
+
+
+if __name__ == '__main__':
+    unittest.main()
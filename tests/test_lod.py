@@ -0,0 +1,102 @@
+import unittest
+import sys
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import comparison
+import lod
+from benchmark import grid_mesh
+
+
+class TestLod(unittest.TestCase):
+    """Test suite for the level-of-detail pyramid"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.vertices, self.triangles = grid_mesh(20000)
+
+    def tearDown(self):
+        """Clean up test fixtures"""
+        comparison.release_mesh('lod-A')
+        comparison.release_mesh('lod-B')
+
+    def test_lod_targets(self):
+        """Levels shrink by LOD_REDUCTION down to at most min_triangles"""
+        self.assertEqual(lod.lod_targets(1000, min_triangles=1000), [])
+        self.assertEqual(lod.lod_targets(100000, min_triangles=5000, reduction=4),
+                         [25000, 6250, 1562])
+
+    def test_cluster_vertices(self):
+        """Clustering merges nearby vertices and drops collapsed triangles"""
+        vertices, triangles = lod.cluster_vertices(self.vertices, self.triangles, 5.0)
+
+        self.assertLess(len(triangles), len(self.triangles) / 4)
+        self.assertEqual(vertices.dtype, np.float32)
+        self.assertEqual(triangles.dtype, np.uint32)
+        self.assertEqual(int(triangles.max()), len(vertices) - 1)
+        self.assertTrue(np.all(triangles[:, 0] != triangles[:, 1]))
+        # Merged vertices stay on the original surface's bounds
+        np.testing.assert_array_less(vertices.min(axis=0), self.vertices.max(axis=0))
+
+    def test_decimate_hits_target(self):
+        """Decimation gets close to the requested triangle count"""
+        for target in (1000, 5000):
+            _, triangles = lod.decimate(self.vertices, self.triangles, target)
+            self.assertLess(len(triangles), 1.5 * target)
+            self.assertGreater(len(triangles), 0.5 * target)
+
+    def test_decimate_rejects_unknown_method(self):
+        with self.assertRaises(ValueError):
+            lod.decimate(self.vertices, self.triangles, 1000, method='random')
+
+    @mock.patch('comparison.lod_targets', lambda count: lod.lod_targets(count, 2000))
+    def test_get_lod_caches_and_clamps(self):
+        """Levels are built once, and levels past the coarsest clamp to it"""
+        entry = comparison.store_mesh('lod-A', {
+            "vertices": self.vertices, "normals": np.zeros_like(self.vertices),
+            "indices": self.triangles})
+
+        self.assertIs(comparison.get_lod('lod-A', 0), entry)
+        coarse = comparison.get_lod('lod-A', 99)
+        self.assertEqual(coarse['lod'], 2)
+        self.assertIs(comparison.get_mesh('lod-A', 2), coarse)
+        self.assertLess(len(coarse['indices']), len(comparison.get_lod('lod-A', 1)['indices']))
+        self.assertNotEqual(coarse['version'], entry['version'])
+
+    @mock.patch('comparison.lod_targets', lambda count: lod.lod_targets(count, 2000))
+    def test_progressive_delivery_and_preview_comparison(self):
+        """The coarsest level is sent first and comparisons run on chosen levels"""
+        mesh_data = {"vertices": self.vertices, "normals": np.zeros_like(self.vertices),
+                     "indices": self.triangles}
+        comparison.store_mesh('lod-A', mesh_data)
+        comparison.store_mesh('lod-B', mesh_data)
+
+        with mock.patch('comparison.load_mesh',
+                        lambda path, file_id, *args: comparison.get_mesh(file_id)):
+            coarse = comparison.process_3d_file('part.stl', 'lod-A', progressive=True)
+        self.assertEqual(coarse["lod"], 2)
+        self.assertEqual(coarse["lod_levels"][0], len(self.triangles))
+        self.assertEqual(len(coarse["indices"]),
+                         3 * len(comparison.get_lod('lod-A', 2)['indices']))
+
+        finest = comparison.get_mesh_lod('lod-A', 0, transport='binary')
+        self.assertEqual(finest["lod"], 0)
+        self.assertEqual(finest["triangle_count"], len(self.triangles))
+
+        preview = comparison.calculate_mesh_distance('lod-A', 'lod-B', lod=1)
+        self.assertEqual(preview["lod"], 1)
+        self.assertLess(preview["max"], 1.0)
+
+        matching = comparison.find_matching_vertices('lod-A', 'lod-B', lod=2)
+        self.assertEqual(len(matching["matching_vertices_a"]),
+                         len(comparison.get_lod('lod-A', 2)['vertices']))
+        self.assertEqual(matching["stats"]["percent_matching_a"], 100.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import comparison
+from mesh import Mesh
+
+
+def right_triangles():
+    """Two unit right triangles: one in z=0 facing +z, one in x=0 facing +x"""
+    vertices = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [0, 0, 1]], dtype=np.float32)
+    indices = np.array([[0, 1, 2], [0, 2, 3]], dtype=np.uint32)
+    return vertices, indices
+
+
+class TestMesh(unittest.TestCase):
+    """Test suite for the compact mesh container"""
+
+    def tearDown(self):
+        comparison.release_mesh("mesh_A")
+
+    def test_compact_arrays_are_not_copied(self):
+        """float32/uint32 inputs are stored as they are"""
+        vertices, indices = right_triangles()
+
+        mesh = Mesh(vertices, indices)
+        stored = comparison.store_mesh("mesh_A", {"vertices": vertices,
+                                                  "indices": indices})
+
+        self.assertTrue(np.shares_memory(mesh.vertices, vertices))
+        self.assertTrue(np.shares_memory(stored.indices, indices))
+        self.assertFalse(hasattr(mesh, '__dict__'))
+
+    def test_lists_are_converted(self):
+        """Flat lists from the browser become (n, 3) float32/uint32 arrays"""
+        mesh = Mesh.from_data({"vertices": [0, 0, 0, 1, 0, 0, 0, 1, 0],
+                               "normals": [], "indices": [0, 1, 2]})
+
+        self.assertEqual(mesh.vertices.dtype, np.float32)
+        self.assertEqual(mesh.indices.dtype, np.uint32)
+        self.assertEqual(mesh.vertices.shape, (3, 3))
+        # Missing normals are computed on first use
+        np.testing.assert_allclose(mesh.normals, [[0, 0, 1]] * 3)
+
+    def test_derived_geometry(self):
+        """Bounds, face normals and areas are computed lazily"""
+        mesh = Mesh(*right_triangles())
+
+        np.testing.assert_array_equal(mesh.bounds[0], [0, 0, 0])
+        np.testing.assert_array_equal(mesh.bounds[1], [1, 1, 1])
+        np.testing.assert_allclose(mesh.face_normals, [[0, 0, 1], [1, 0, 0]])
+        np.testing.assert_allclose(mesh.face_areas, [0.5, 0.5])
+        self.assertAlmostEqual(mesh.area, 1.0)
+        self.assertEqual(mesh.face_areas.dtype, np.float32)
+
+    def test_mapping_access(self):
+        """Helpers written for mesh data dicts accept a Mesh"""
+        mesh = Mesh(*right_triangles(), version=7)
+
+        self.assertIs(mesh["vertices"], mesh.vertices)
+        self.assertEqual(mesh.get("version"), 7)
+        self.assertNotIn("error", mesh)
+        with self.assertRaises(KeyError):
+            mesh["error"]
+
+        encoded = comparison.encode_mesh_binary(mesh)
+        self.assertEqual(encoded["triangle_count"], 2)
+
+    def test_transformed_shares_indices(self):
+        """Rigid transforms move vertices and rotate normals"""
+        mesh = Mesh(*right_triangles())
+        transformation = np.eye(4)
+        transformation[:3, :3] = [[0, -1, 0], [1, 0, 0], [0, 0, 1]]
+        transformation[:3, 3] = [10, 0, 0]
+
+        moved = mesh.transformed(transformation)
+
+        self.assertTrue(np.shares_memory(moved.indices, mesh.indices))
+        self.assertEqual(moved.vertices.dtype, np.float32)
+        np.testing.assert_allclose(moved.vertices[1], [10, 1, 0])
+        np.testing.assert_allclose(moved.face_normals[1], [0, 1, 0], atol=1e-6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import unittest
+import tempfile
+import os
+import sys
+import shutil
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import main
+import comparison
+from mesh_cache import MeshCache
+
+
+def make_arrays(num_vertices=3):
+    """Small float32/uint32 mesh arrays"""
+    return {
+        "vertices": np.arange(num_vertices * 3, dtype=np.float32).reshape(-1, 3),
+        "normals": np.zeros((num_vertices, 3), dtype=np.float32),
+        "indices": np.array([[0, 1, 2]], dtype=np.uint32)
+    }
+
+
+class TestMeshCache(unittest.TestCase):
+    """Test suite for the persistent mesh cache"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.test_dir = tempfile.mkdtemp()
+        self.cache = MeshCache(Path(self.test_dir) / "cache")
+        self.source = Path(self.test_dir) / "part.stl"
+        self.source.write_bytes(b"revision 1")
+
+    def tearDown(self):
+        """Clean up test fixtures"""
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_round_trip(self):
+        """Stored arrays come back with their dtypes"""
+        key = self.cache.key_for(self.source)
+        self.assertIsNone(self.cache.get(key))
+
+        self.cache.put(key, make_arrays())
+        cached = self.cache.get(key)
+
+        self.assertEqual(cached["vertices"].dtype, np.float32)
+        self.assertEqual(cached["indices"].dtype, np.uint32)
+        np.testing.assert_array_equal(cached["vertices"], make_arrays()["vertices"])
+
+    def test_concurrent_writers_of_one_key(self):
+        """Writers of the same key use their own temporary files"""
+        from concurrent.futures import ThreadPoolExecutor
+        key = self.cache.key_for(self.source)
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(lambda n: self.cache.put(key, make_arrays(n)), range(3, 19)))
+
+        self.assertIn(len(self.cache.get(key)["normals"]), range(3, 19))
+        self.assertEqual(list(self.cache.cache_dir.glob('*.tmp')), [])
+
+    def test_key_depends_on_content_and_params(self):
+        """Keys change with file contents and processing parameters"""
+        key = self.cache.key_for(self.source, {"tolerance": 0.1})
+
+        self.assertEqual(key, self.cache.key_for(self.source, {"tolerance": 0.1}))
+        self.assertNotEqual(key, self.cache.key_for(self.source, {"tolerance": 0.2}))
+
+        self.source.write_bytes(b"revision 2")
+        self.assertNotEqual(key, self.cache.key_for(self.source, {"tolerance": 0.1}))
+
+    def test_lru_eviction(self):
+        """The least recently used entry is evicted first"""
+        self.cache.put("old", make_arrays())
+        self.cache.put("recent", make_arrays())
+        entry_size = (self.cache.cache_dir / "old.npz").stat().st_size
+
+        # Make "old" the least recently used entry
+        os.utime(self.cache.cache_dir / "old.npz", (0, 0))
+        self.cache.max_bytes = entry_size * 2
+        self.cache.put("new", make_arrays())
+
+        self.assertIsNone(self.cache.get("old"))
+        self.assertIsNotNone(self.cache.get("recent"))
+        self.assertIsNotNone(self.cache.get("new"))
+
+    def test_disabled_cache(self):
+        """A zero size limit disables the cache"""
+        cache = MeshCache(Path(self.test_dir) / "disabled", max_bytes=0)
+        cache.put("key", make_arrays())
+
+        self.assertIsNone(cache.get("key"))
+        self.assertFalse((Path(self.test_dir) / "disabled").exists())
+
+    def test_process_3d_file_uses_cache(self):
+        """A repeat load is served from the cache without re-reading the file"""
+        mesh_data = {
+            "vertices": [0, 0, 0, 1, 0, 0, 0, 1, 0],
+            "normals": [0, 0, 1, 0, 0, 1, 0, 0, 1],
+            "indices": [0, 1, 2]
+        }
+
+        with patch.object(comparison, 'MESH_CACHE', self.cache), \
+                patch.object(comparison, 'load_mesh_file',
+                             return_value=mesh_data) as mock_read:
+            first = main.process_3d_file(str(self.source), "cache_A")
+            second = main.process_3d_file(str(self.source), "cache_A")
+
+        main.release_mesh("cache_A")
+        self.assertEqual(mock_read.call_count, 1)
+        self.assertNotIn("error", second)
+        self.assertEqual(first["vertices"], second["vertices"])
+        self.assertEqual(second["indices"], [0, 1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+import unittest
+import tempfile
+import shutil
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import readers
+import obj_reader
+
+
+class TestObjReader(unittest.TestCase):
+    """Test suite for the vectorized OBJ reader"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.test_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        """Clean up test fixtures"""
+        shutil.rmtree(self.test_dir)
+
+    def write_obj(self, text, name="mesh.obj"):
+        path = self.test_dir / name
+        path.write_bytes(text.encode())
+        return path
+
+    def test_quads_and_polygons_are_fan_triangulated(self):
+        """Faces with more than 3 corners become triangle fans"""
+        path = self.write_obj(
+            "# square and pentagon\n"
+            "v 0 0 0\nv 1 0 0\nv 1 1 0\nv 0 1 0\nv 2 0 0\n"
+            "f 1 2 3 4\n"
+            "f 1 2 5 3 4\n")
+
+        vertices, normals, triangles = obj_reader.read_obj_arrays(path)
+
+        self.assertEqual(vertices.dtype, np.float32)
+        self.assertEqual(triangles.dtype, np.uint32)
+        np.testing.assert_array_equal(
+            triangles, [[0, 1, 2], [0, 2, 3], [0, 1, 4], [0, 4, 2], [0, 2, 3]])
+        # Normals are computed when the file has none
+        np.testing.assert_allclose(np.abs(normals[:, 2]), 1.0, atol=1e-6)
+
+    def test_positions_are_split_per_normal(self):
+        """A position used with two vn normals becomes two vertices"""
+        path = self.write_obj(
+            "v 0 0 0\nv 1 0 0\nv 0 1 0\nv 0 0 1\n"
+            "vn 0 0 1\nvn 0 1 0\n"
+            "f 1//1 2//1 3//1\n"
+            "f 1//2 4//2 2//2\n")
+
+        vertices, normals, triangles = obj_reader.read_obj_arrays(path)
+
+        self.assertEqual(len(vertices), 6)
+        for corners, normal in zip(triangles, ([0, 0, 1], [0, 1, 0])):
+            np.testing.assert_allclose(normals[corners], [normal] * 3)
+        np.testing.assert_allclose(vertices[triangles[1]],
+                                   [[0, 0, 0], [0, 0, 1], [1, 0, 0]])
+
+    def test_relative_indices_and_texture_layouts(self):
+        """Negative indices and v/vt/vn corners resolve like positive ones"""
+        path = self.write_obj(
+            "v 0 0 0 1.0\nv 1 0 0 1.0\nv 0 1 0 1.0\n"
+            "vt 0 0\nvt 1 0\nvt 0 1\nvn 0 0 1\n"
+            "f -3/-3/-1 -2/-2/-1 -1/-1/-1\r\n"
+            "f 1/1/1 2/2/1 3/3/1")
+
+        vertices, normals, triangles = obj_reader.read_obj_arrays(path)
+
+        np.testing.assert_array_equal(triangles, [[0, 1, 2], [0, 1, 2]])
+        np.testing.assert_allclose(vertices, [[0, 0, 0], [1, 0, 0], [0, 1, 0]])
+        np.testing.assert_allclose(normals, [[0, 0, 1]] * 3)
+
+    def test_mixed_face_layouts(self):
+        """Faces with and without normals can be mixed in one file"""
+        path = self.write_obj(
+            "v 0 0 0\nv 1 0 0\nv 0 1 0\nv 1 1 0\nvn 0 0 -1\n"
+            "f 1//1 2//1 3//1\n"
+            "f 2 4 3\n")
+
+        vertices, normals, triangles = obj_reader.read_obj_arrays(path)
+
+        self.assertEqual(len(triangles), 2)
+        np.testing.assert_allclose(normals[triangles[0]], [[0, 0, -1]] * 3)
+        # Corners without vn get the computed smooth normal (+z here)
+        np.testing.assert_allclose(normals[triangles[1]], [[0, 0, 1]] * 3,
+                                   atol=1e-6)
+
+    def test_small_chunks_match_single_chunk(self):
+        """Chunk boundaries do not change the result"""
+        lines = [f"v {x} {y} {x * y}" for y in range(6) for x in range(6)]
+        lines += [f"f {i + 1} {i + 2} {i + 8} {i + 7}"
+                  for i in range(30) if (i + 1) % 6]
+        lines += ["vn 0 0 1", "f 1//1 2//1 -1//1"]
+        path = self.write_obj("\n".join(lines) + "\n")
+
+        expected = obj_reader.read_obj_arrays(path)
+        for chunk_bytes in (1, 7, 64):
+            for array, expected_array in zip(
+                    obj_reader.read_obj_arrays(path, chunk_bytes=chunk_bytes),
+                    expected):
+                np.testing.assert_array_equal(array, expected_array)
+
+    def test_trailing_comments_are_ignored(self):
+        """# comments after the values of a line do not reach the parser"""
+        path = self.write_obj(
+            "v 0 0 0 # origin\nv 1 0 0\nv 0 1 0#no space\nv 1 1 0\n"
+            "f 1 2 4 3 # quad\n# f 9 9 9\n")
+
+        vertices, _, triangles = obj_reader.read_obj_arrays(path)
+
+        self.assertEqual(len(vertices), 4)
+        np.testing.assert_array_equal(triangles, [[0, 1, 3], [0, 3, 2]])
+
+    def test_unparsable_file_goes_to_open3d_once(self):
+        """read_mesh_file parses the file once before the Open3D fallback"""
+        path = self.write_obj("v 0 0 0\nv 1 0 0\nv 0 1 0\nf 1 2 4\n")
+        arrays = (np.zeros((3, 3), np.float32), np.zeros((3, 3), np.float32),
+                  np.array([[0, 1, 2]], np.uint32))
+
+        with patch.object(readers, 'read_obj_arrays',
+                          wraps=readers.read_obj_arrays) as read_arrays, \
+                patch.object(readers, 'read_obj_open3d',
+                             return_value=arrays) as read_open3d:
+            result = readers.read_mesh_file(path)
+
+        self.assertEqual(read_arrays.call_count, 1)
+        read_open3d.assert_called_once_with(str(path))
+        np.testing.assert_array_equal(result["indices"], arrays[2])
+
+    def test_invalid_index_raises(self):
+        """Faces referring to missing vertices are rejected"""
+        path = self.write_obj("v 0 0 0\nv 1 0 0\nv 0 1 0\nf 1 2 4\n")
+
+        with self.assertRaises(ValueError):
+            obj_reader.read_obj_arrays(path)
+
+    def test_read_obj_to_json(self):
+        """read_obj_to_json returns the parsed mesh as lists"""
+        path = self.write_obj("v 0 0 0\nv 1 0 0\nv 0 1 0\nv 1 1 0\nf 1 2 4 3\n")
+
+        result = readers.read_obj_to_json(str(path))
+
+        self.assertNotIn("error", result)
+        self.assertEqual(result["indices"], [0, 1, 3, 0, 3, 2])
+        self.assertEqual(len(result["vertices"]), 12)
+        self.assertEqual(len(result["normals"]), 12)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,153 @@
+import unittest
+import json
+import shutil
+import tempfile
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import batch
+import comparison
+import outofcore
+from distance import SurfaceIndex
+from mesh_cache import MeshCache
+from tests.test_cad_processing import write_binary_stl
+from tests.test_regions import grid
+
+
+def wavy_corners(size, amplitude):
+    """(n, 3, 3) corners of a size x size grid displaced by a sine wave"""
+    vertices, triangles = grid(size)
+    vertices[:, 2] = amplitude * np.sin(vertices[:, 0] / 3.0)
+    return vertices[triangles]
+
+
+class TestOutOfCore(unittest.TestCase):
+    """Test suite for the tiled, memory-mapped comparison"""
+
+    def setUp(self):
+        """A wavy 30x30 grid A compared to a flat grid B"""
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.file_a = self.test_dir / "a.stl"
+        self.file_b = self.test_dir / "b.stl"
+        self.corners_a = wavy_corners(30, 0.3)
+        self.corners_b = wavy_corners(30, 0.0)
+        write_binary_stl(self.file_a, self.corners_a)
+        write_binary_stl(self.file_b, self.corners_b)
+
+        self.patches = [
+            patch.object(comparison, 'MESH_CACHE', MeshCache(self.test_dir / "cache")),
+            patch('distance._open3d_available', return_value=False)
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        """Clean up test fixtures"""
+        for p in self.patches:
+            p.stop()
+        shutil.rmtree(self.test_dir)
+
+    def test_streamed_stl_is_memory_mapped(self):
+        """Binary STL corners are copied once into .npy files"""
+        mesh = outofcore.convert_mesh(self.file_a)
+
+        self.assertIsInstance(mesh.vertices, np.memmap)
+        np.testing.assert_array_equal(mesh.vertices, self.corners_a.reshape(-1, 3))
+        np.testing.assert_array_equal(mesh.indices[1], [3, 4, 5])
+        self.assertEqual(outofcore.convert_mesh(self.file_a).directory, mesh.directory)
+
+    def test_tiles_match_the_in_memory_distances(self):
+        """Tiled distances equal a single index over the whole reference"""
+        out_dir = self.test_dir / "out"
+        result = outofcore.compare_files_out_of_core(
+            self.file_a, self.file_b, out_dir, align=False, max_distance=1.0,
+            tile_points=300)
+
+        self.assertNotIn("error", result)
+        self.assertGreater(result["tiles"], 4)
+
+        points = self.corners_a.reshape(-1, 3)
+        expected, _, _ = SurfaceIndex(self.corners_b.reshape(-1, 3),
+                                      np.arange(len(points)).reshape(-1, 3)).query(points)
+        deviation = np.load(out_dir / "deviation.npy", mmap_mode='r')
+        np.testing.assert_allclose(deviation, expected, atol=1e-6)
+        self.assertAlmostEqual(result["distance"]["max"], np.abs(expected).max(), places=5)
+        self.assertAlmostEqual(result["distance"]["rms"],
+                               np.sqrt(np.mean(expected ** 2)), places=5)
+
+        levels = np.load(out_dir / "deviation_levels.npy")
+        scale = result["deviation_levels"]
+        np.testing.assert_allclose(scale["offset"] + levels * scale["step"], expected,
+                                   atol=scale["step"])
+
+        summary = json.loads((out_dir / "summary.json").read_text())
+        self.assertEqual(summary["matching"], result["matching"])
+        self.assertEqual(sorted(path.name for path in out_dir.glob("order_*")), [])
+
+    def test_parts_smaller_than_the_halo_are_tiled(self):
+        """Parts smaller than max_distance still get tiles of tile_points"""
+        scale = 0.01
+        file_a = self.test_dir / "small_a.stl"
+        file_b = self.test_dir / "small_b.stl"
+        write_binary_stl(file_a, self.corners_a * scale)
+        write_binary_stl(file_b, self.corners_b * scale)
+        out_dir = self.test_dir / "small"
+        result = outofcore.compare_files_out_of_core(
+            file_a, file_b, out_dir, align=False, threshold=0.001,
+            max_distance=5.0, tile_points=300)
+
+        self.assertNotIn("error", result)
+        self.assertGreater(result["vertices_a"], 10 * 300)
+        self.assertGreater(result["tiles"], 4)
+
+        points = self.corners_a.reshape(-1, 3) * scale
+        index = SurfaceIndex(self.corners_b.reshape(-1, 3) * scale,
+                             np.arange(len(points)).reshape(-1, 3))
+        expected, _, _ = index.query(points)
+        deviation = np.load(out_dir / "deviation.npy")
+        np.testing.assert_allclose(deviation, expected, atol=1e-6)
+        nearest = np.load(out_dir / "nearest_levels_a.npy")
+        step = result["matching"]["distance_step"]
+        np.testing.assert_allclose(nearest * step, np.abs(points[:, 2]), atol=step)
+
+    def test_distances_beyond_the_halo_are_counted(self):
+        """Points further than max_distance are written as inf"""
+        out_dir = self.test_dir / "out"
+        result = outofcore.compare_files_out_of_core(
+            self.file_a, self.file_b, out_dir, align=False, threshold=0.1,
+            max_distance=0.2, tile_points=300)
+
+        deviation = np.load(out_dir / "deviation.npy")
+        self.assertGreater(result["distance"]["beyond"], 0)
+        self.assertEqual(np.count_nonzero(np.isinf(deviation)),
+                         result["distance"]["beyond"])
+        # Beyond points keep a level of their own instead of +max_distance
+        levels = np.load(out_dir / "deviation_levels.npy")
+        beyond_level = result["deviation_levels"]["beyond_level"]
+        np.testing.assert_array_equal(levels == beyond_level, np.isinf(deviation))
+        self.assertLessEqual(result["distance"]["max"], 0.2)
+
+        nearest = np.load(out_dir / "nearest_levels_a.npy")
+        self.assertEqual(result["matching"]["num_matching_a"],
+                         int(np.count_nonzero(nearest * result["matching"]["distance_step"]
+                                              <= 0.1 + 1e-6)))
+
+    def test_batch_option(self):
+        """batch.py writes each pair's results below the --out-of-core directory"""
+        pair = {"name": "wave", "file_a": str(self.file_a), "file_b": str(self.file_b)}
+        record = batch.compare_pair(pair, {"align": False, "source": "vertices",
+                                           "lod": 0, "out_of_core": self.test_dir / "ooc"})
+
+        self.assertEqual(record["status"], 'ok')
+        self.assertTrue(record["out_of_core"])
+        self.assertTrue((self.test_dir / "ooc" / "wave" / "summary.json").exists())
+
+
+if __name__ == '__main__':
+    unittest.main()
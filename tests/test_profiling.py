@@ -0,0 +1,92 @@
+import unittest
+import tempfile
+import json
+import shutil
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import comparison
+import profiling
+import readers
+from mesh_cache import MeshCache
+from tests.test_cad_processing import write_binary_stl
+
+
+class TestProfiling(unittest.TestCase):
+    """Test suite for per-stage profiling"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.log_path = self.test_dir / "profile.jsonl"
+        self.stl_path = self.test_dir / "part.stl"
+        write_binary_stl(self.stl_path, np.array(
+            [[[0, 0, 0], [1, 0, 0], [0, 1, 0]]], dtype=np.float32))
+
+    def tearDown(self):
+        """Disable profiling and clean up"""
+        profiling.set_enabled(False, '')
+        comparison.release_mesh("profile_A")
+        shutil.rmtree(self.test_dir)
+
+    def test_disabled_by_default(self):
+        """Results carry no profile unless profiling is enabled"""
+        profiling.set_enabled(False)
+
+        result = readers.read_stl_manual(str(self.stl_path))
+
+        self.assertNotIn("profile", result)
+
+    def test_stages_and_log(self):
+        """Stages of nested calls end up in one profile, which is logged"""
+        profiling.set_enabled(True, str(self.log_path))
+
+        result = readers.read_stl_manual(str(self.stl_path))
+
+        profile = result["profile"]
+        self.assertEqual(profile["function"], 'read_stl_manual')
+        stages = [stage["stage"] for stage in profile["stages"]]
+        self.assertIn('weld vertices', stages)
+        self.assertIn('tolist', stages)
+        for stage in profile["stages"]:
+            self.assertGreaterEqual(stage["wall_seconds"], 0.0)
+            self.assertIn("cpu_seconds", stage)
+            self.assertIn("rss_delta_bytes", stage)
+        self.assertEqual(profile["input"]["arg0_bytes"], 84 + 50)
+        self.assertEqual(profile["output"]["indices"], 3)
+
+        with open(self.log_path) as f:
+            logged = [json.loads(line) for line in f]
+        self.assertEqual(len(logged), 1)
+        self.assertEqual(logged[0]["stages"], profile["stages"])
+
+    def test_process_3d_file_profile(self):
+        """The outer call owns the profile; nested readers add stages"""
+        profiling.set_enabled(True)
+
+        # An empty cache of its own, so every loading stage runs
+        with patch.object(comparison, 'MESH_CACHE', MeshCache(self.test_dir / "cache")):
+            result = comparison.process_3d_file(str(self.stl_path), "profile_A",
+                                                transport='binary')
+
+        stages = [stage["stage"] for stage in result["profile"]["stages"]]
+        self.assertEqual(result["profile"]["function"], 'process_3d_file')
+        self.assertEqual(stages[-1], 'encoding')
+        self.assertIn('reading STL', stages)
+        self.assertEqual(result["profile"]["stages"][-1]["triangles"], 1)
+
+    def test_mark_outside_profile_is_noop(self):
+        """mark() and annotate() do nothing without a running profile"""
+        profiling.mark('stage', size=1)
+        profiling.annotate(size=2)
+        self.assertIsNone(profiling.current_profile())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+import unittest.mock
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import main
+from regions import deviation_regions
+
+
+def grid(size):
+    """Flat size x size grid of unit squares in z=0, two triangles each"""
+    ys, xs = np.mgrid[0:size + 1, 0:size + 1]
+    vertices = np.stack([xs.ravel(), ys.ravel(), np.zeros(xs.size)], axis=1)
+    corner = (np.arange(size)[:, None] * (size + 1) + np.arange(size)).ravel()
+    triangles = np.concatenate([
+        np.stack([corner, corner + 1, corner + size + 2], axis=1),
+        np.stack([corner, corner + size + 2, corner + size + 1], axis=1)])
+    return vertices.astype(np.float32), triangles.astype(np.uint32)
+
+
+class TestDeviationRegions(unittest.TestCase):
+    """Test suite for out-of-tolerance region clustering"""
+
+    def setUp(self):
+        """A 10x10 grid with one raised and one sunken vertex"""
+        self.vertices, self.triangles = grid(10)
+        self.deviations = np.zeros(len(self.vertices))
+        self.deviations[2 * 11 + 2] = 0.5     # (2, 2), six triangles around it
+        self.deviations[7 * 11 + 7] = -0.3    # (7, 7)
+        self.deviations[7 * 11 + 8] = -0.2    # (8, 7), joins the sunken region
+
+    def test_regions_by_sign(self):
+        """Each patch is one region with its own statistics, largest first"""
+        regions, total = deviation_regions(self.vertices, self.triangles,
+                                           self.deviations, 0.1)
+
+        self.assertEqual(total, 2)
+        under, over = regions
+        self.assertEqual(under["sign"], "under")
+        self.assertEqual(over["sign"], "over")
+        self.assertGreater(under["area"], over["area"])
+
+        self.assertEqual(over["triangle_count"], 6)
+        self.assertAlmostEqual(over["area"], 3.0)
+        self.assertAlmostEqual(over["max_deviation"], 0.5)
+        np.testing.assert_allclose(over["centroid"], [2, 2, 0])
+        self.assertEqual(over["bbox_min"], [1, 1, 0])
+        self.assertEqual(over["bbox_max"], [3, 3, 0])
+
+        self.assertAlmostEqual(under["max_deviation"], -0.3)
+        self.assertEqual(under["bbox_max"], [9, 8, 0])
+
+    def test_tolerance_area_and_limit(self):
+        """Regions below tolerance or min_area are dropped; limit caps the list"""
+        regions, total = deviation_regions(self.vertices, self.triangles,
+                                           self.deviations, 0.35)
+        self.assertEqual([region["sign"] for region in regions], ["over"])
+
+        regions, total = deviation_regions(self.vertices, self.triangles,
+                                           self.deviations, 0.1, min_area=3.5)
+        self.assertEqual((len(regions), total), (1, 1))
+
+        regions, total = deviation_regions(self.vertices, self.triangles,
+                                           self.deviations, 0.1, limit=1)
+        self.assertEqual((len(regions), total), (1, 2))
+
+        self.assertEqual(deviation_regions(self.vertices, self.triangles,
+                                           self.deviations, 1.0), ([], 0))
+
+    def test_find_deviation_regions(self):
+        """Regions of a stored mesh pair are measured against B's surface"""
+        vertices, triangles = grid(10)
+        raised = vertices.copy()
+        raised[2 * 11 + 2, 2] = 0.5
+        main.store_mesh("regions_A", {"vertices": raised, "indices": triangles})
+        main.store_mesh("regions_B", {"vertices": vertices, "indices": triangles})
+        try:
+            with unittest.mock.patch('distance._open3d_available', return_value=False):
+                result = main.find_deviation_regions("regions_A", "regions_B", 0.1)
+        finally:
+            main.release_mesh("regions_A")
+            main.release_mesh("regions_B")
+
+        self.assertNotIn("error", result)
+        self.assertEqual(result["region_count"], 1)
+        self.assertAlmostEqual(result["regions"][0]["max_deviation"], 0.5, places=5)
+
+
+if __name__ == '__main__':
+    unittest.main()
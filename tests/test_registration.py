@@ -0,0 +1,94 @@
+import unittest
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import registration
+from tests.test_cad_processing import module_available
+
+
+def rotation_matrix(axis, angle):
+    """Rotation about a unit axis (Rodrigues' formula)"""
+    axis = np.asarray(axis, dtype=np.float64)
+    axis /= np.linalg.norm(axis)
+    k = np.array([[0, -axis[2], axis[1]], [axis[2], 0, -axis[0]], [-axis[1], axis[0], 0]])
+    return np.eye(3) + np.sin(angle) * k + (1 - np.cos(angle)) * k @ k
+
+
+def asymmetric_points(count=4000, seed=0):
+    """Points in a box with clearly different extents and an off-centre bump"""
+    rng = np.random.default_rng(seed)
+    points = rng.random((count, 3)) * [100.0, 40.0, 10.0]
+    bump = rng.random((count // 4, 3)) * [10.0, 10.0, 10.0] + [80.0, 25.0, 10.0]
+    return np.vstack([points, bump])
+
+
+class TestRegistration(unittest.TestCase):
+    """Test suite for the registration pipeline"""
+
+    def test_apply_transform(self):
+        """Rotation and translation are applied to every point"""
+        transformation = np.eye(4)
+        transformation[:3, :3] = rotation_matrix([0, 0, 1], np.pi / 2)
+        transformation[:3, 3] = [1, 2, 3]
+
+        moved = registration.apply_transform(np.array([[1.0, 0, 0]]), transformation)
+
+        np.testing.assert_allclose(moved, [[1, 3, 3]], atol=1e-12)
+
+    def test_pca_alignment_recovers_large_rotation(self):
+        """PCA initialization handles parts far from their initial pose"""
+        target = asymmetric_points()
+        truth = np.eye(4)
+        truth[:3, :3] = rotation_matrix([0.3, 1.0, 0.2], 2.5)
+        truth[:3, 3] = [500.0, -200.0, 50.0]
+        source = registration.apply_transform(target, np.linalg.inv(truth))
+
+        transformation, fitness, _ = registration.pca_alignment(source, target)
+        aligned = registration.apply_transform(source, transformation)
+
+        self.assertGreater(fitness, 0.5)
+        self.assertLess(np.abs(aligned - target).max(), 5.0)
+
+    def test_pca_alignment_keeps_aligned_parts(self):
+        """Already aligned parts keep (close to) the identity"""
+        target = asymmetric_points()
+
+        transformation, fitness, rmse = registration.pca_alignment(target, target)
+
+        np.testing.assert_allclose(transformation, np.eye(4), atol=1e-9)
+        self.assertEqual(fitness, 1.0)
+        self.assertEqual(rmse, 0.0)
+
+    def test_register_without_extent_is_identity(self):
+        """A single target point gives the identity and an error, not ICP"""
+        source = asymmetric_points(100)
+        for target in (np.ones((1, 3)), np.ones((50, 3))):
+            transformation, stages = registration.register(source, target)
+
+            np.testing.assert_array_equal(transformation, np.eye(4))
+            self.assertEqual([stage["stage"] for stage in stages], ['degenerate'])
+            self.assertIn("error", stages[0])
+
+    @unittest.skipUnless(module_available('open3d'), "open3d is not available")
+    def test_register_refines_to_small_rmse(self):
+        """Multi-scale ICP after PCA converges onto the target"""
+        target = asymmetric_points(20000)
+        truth = np.eye(4)
+        truth[:3, :3] = rotation_matrix([1.0, 0.2, 0.0], 1.2)
+        truth[:3, 3] = [30.0, 10.0, -5.0]
+        source = registration.apply_transform(target, np.linalg.inv(truth))
+
+        transformation, stages = registration.register(source, target)
+
+        self.assertEqual(stages[0]["stage"], 'pca')
+        self.assertEqual(len(stages), 1 + len(registration.PYRAMID_LEVELS))
+        np.testing.assert_allclose(transformation, truth, atol=0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
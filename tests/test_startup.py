@@ -0,0 +1,100 @@
+import unittest
+import os
+import subprocess
+import sys
+import tempfile
+import shutil
+from pathlib import Path
+from unittest.mock import patch
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import main
+import profiling
+import startup
+
+REPO_DIR = Path(__file__).parent.parent
+
+
+def missing_module():
+    import module_that_does_not_exist  # noqa: F401
+
+
+def broken_module():
+    raise RuntimeError("no license")
+
+
+class TestWarmUp(unittest.TestCase):
+    """Test suite for the background warm-up of the heavy modules"""
+
+    def test_steps_record_state_and_time(self):
+        """Missing and failing modules finish the warm-up too"""
+        warm_up = startup.WarmUp([('math', lambda: None),
+                                  ('missing', missing_module),
+                                  ('broken', broken_module)])
+        self.assertFalse(warm_up.status()["ready"])
+
+        status = warm_up.start()
+        self.assertTrue(status["started"])
+        self.assertTrue(warm_up.wait(10))
+
+        status = warm_up.status()
+        self.assertEqual([m["state"] for m in status["modules"]],
+                         ['ready', 'unavailable', 'failed'])
+        self.assertIn("module_that_does_not_exist", status["modules"][1]["error"])
+        self.assertEqual(status["modules"][2]["error"], "no license")
+        self.assertTrue(all(m["seconds"] >= 0 for m in status["modules"]))
+        self.assertGreaterEqual(status["uptime"], status["first_paint"])
+
+    def test_start_runs_once(self):
+        calls = []
+        warm_up = startup.WarmUp([('count', lambda: calls.append(1))])
+
+        warm_up.start()
+        warm_up.start()
+        warm_up.wait(10)
+
+        self.assertEqual(calls, [1])
+
+    def test_profile_is_logged(self):
+        """With profiling enabled every step is a stage of the logged profile"""
+        log_dir = Path(tempfile.mkdtemp())
+        log_path = log_dir / "profile.jsonl"
+        previous = profiling.enabled()
+        try:
+            profiling.set_enabled(True, str(log_path))
+            startup.WarmUp([('a', lambda: None), ('b', lambda: None)]).run()
+        finally:
+            profiling.set_enabled(previous, '')
+        try:
+            self.assertIn('"function": "warm_up"', log_path.read_text())
+            self.assertIn('"stage": "b"', log_path.read_text())
+        finally:
+            shutil.rmtree(log_dir)
+
+    def test_main_exposes_startup_status(self):
+        with patch.object(main, 'WARM_UP', startup.WarmUp([('math', lambda: None)])):
+            main.start_warm_up()
+            main.WARM_UP.wait(10)
+            self.assertTrue(main.get_startup_status()["ready"])
+
+        self.assertIn(main.get_startup_status, main.EXPOSED_FUNCTIONS)
+
+    def test_import_main_does_not_load_eel(self):
+        """Eel and the heavy modules are only loaded when the app runs"""
+        code = ("import sys, main; print(sorted(m for m in ('eel', 'scipy', "
+                "'cadquery', 'open3d') if m in sys.modules))")
+        test_dir = Path(tempfile.mkdtemp())
+        try:
+            output = subprocess.run(
+                [sys.executable, '-c', code], cwd=test_dir, capture_output=True,
+                text=True, env=dict(os.environ, PYTHONPATH=str(REPO_DIR)), check=True)
+        finally:
+            shutil.rmtree(test_dir)
+
+        self.assertEqual(output.stdout.strip(), '[]')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import unittest
+import base64
+import tempfile
+import shutil
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import uploads
+from mesh_cache import MeshCache
+
+
+class TestUploads(unittest.TestCase):
+    """Test suite for chunked uploads"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.manager = uploads.UploadManager(self.test_dir / "uploads")
+        self.content = bytes(range(256)) * 1000
+
+    def tearDown(self):
+        """Clean up test fixtures"""
+        shutil.rmtree(self.test_dir)
+
+    def upload(self, filename="part.stl", chunk_size=10000):
+        upload_id = self.manager.begin(filename, len(self.content))
+        for offset in range(0, len(self.content), chunk_size):
+            chunk = self.content[offset:offset + chunk_size]
+            self.manager.append(upload_id, base64.b64encode(chunk).decode('ascii'), offset)
+        return self.manager.commit(upload_id)
+
+    def test_chunks_are_written_in_order(self):
+        """Committed uploads hold the full content under a unique name"""
+        path, digest = self.upload("sub/dir/my part.stl")
+
+        self.assertEqual(path.read_bytes(), self.content)
+        self.assertEqual(path.parent, self.test_dir / "uploads")
+        self.assertTrue(path.name.endswith("-my_part.stl"))
+        self.assertEqual(list(path.parent.glob("*.part")), [])
+
+        other_path, other_digest = self.upload("sub/dir/my part.stl")
+        self.assertNotEqual(other_path, path)
+        self.assertEqual(other_digest, digest)
+
+    def test_running_hash_matches_cache_key(self):
+        """The upload hash gives the same cache key without re-reading"""
+        path, _ = self.upload()
+        cache = MeshCache(self.test_dir / "cache")
+
+        self.assertEqual(
+            cache.key_for(path, {"pipeline": 1}, self.manager.digest_for(path)),
+            cache.key_for(path, {"pipeline": 1}))
+
+        self.manager.forget(path)
+        self.assertIsNone(self.manager.digest_for(path))
+
+    def test_out_of_order_and_oversized_chunks_are_rejected(self):
+        upload_id = self.manager.begin("part.stl", 4)
+        self.manager.append(upload_id, b"ab", 0)
+
+        with self.assertRaises(ValueError):
+            self.manager.append(upload_id, b"ab", 0)
+        with self.assertRaises(ValueError):
+            self.manager.append(upload_id, b"abc", 2)
+
+    def test_incomplete_upload_is_not_committed(self):
+        upload_id = self.manager.begin("part.stl", 10)
+        self.manager.append(upload_id, b"abc")
+
+        with self.assertRaises(ValueError):
+            self.manager.commit(upload_id)
+        self.assertEqual(list((self.test_dir / "uploads").iterdir()), [])
+
+    def test_abort_removes_partial_file(self):
+        upload_id = self.manager.begin("part.stl")
+        self.manager.append(upload_id, b"abc")
+
+        self.assertTrue(self.manager.abort(upload_id))
+        self.assertFalse(self.manager.abort(upload_id))
+        self.assertEqual(list((self.test_dir / "uploads").iterdir()), [])
+        with self.assertRaises(KeyError):
+            self.manager.append(upload_id, b"abc")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+"""Chunked uploads from the browser straight to disk
+
+Large files are sent as a sequence of base64 chunks (begin / append /
+commit) instead of one websocket message, so neither side ever holds more
+than a chunk in memory. Each chunk is written to a .part file as it arrives
+and fed into a running hash of the contents. The hash is the one
+MeshCache.key_for starts from, so the cache lookup after an upload does not
+have to read the file again.
+"""
+import base64
+import os
+import re
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from mesh_cache import content_hash
+
+# Uploads without a new chunk for this long are aborted on the next begin()
+UPLOAD_TIMEOUT = 600
+
+
+def safe_filename(filename):
+    """Base name of an uploaded file with unusual characters replaced"""
+    name = Path(str(filename).replace('\\', '/')).name
+    return re.sub(r'[^\w.\-]', '_', name) or 'upload'
+
+
+class Upload:
+    """State of one upload in progress"""
+
+    def __init__(self, upload_id, path, size):
+        self.id = upload_id
+        self.path = path
+        self.part_path = path.with_name(path.name + '.part')
+        self.size = size
+        self.received = 0
+        self.digest = content_hash()
+        self.updated = time.monotonic()
+        self.file = open(self.part_path, 'wb')
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+
+class UploadManager:
+    """Receives chunked uploads into upload_dir"""
+
+    def __init__(self, upload_dir):
+        self.upload_dir = Path(upload_dir)
+        self._uploads = {}
+        # Content hashes of committed uploads, keyed by their path
+        self._digests = {}
+        self._lock = threading.Lock()
+
+    def begin(self, filename, size=None):
+        """Start an upload and return its id"""
+        self._abort_stale()
+        self.upload_dir.mkdir(exist_ok=True)
+
+        upload_id = uuid.uuid4().hex[:12]
+        # The id prefix keeps uploads of equally named files apart
+        path = self.upload_dir / f"{upload_id}-{safe_filename(filename)}"
+        upload = Upload(upload_id, path, None if size is None else int(size))
+        with self._lock:
+            self._uploads[upload_id] = upload
+        return upload_id
+
+    def _get(self, upload_id):
+        upload = self._uploads.get(upload_id)
+        if upload is None:
+            raise KeyError(f"Unknown upload: {upload_id}")
+        return upload
+
+    def append(self, upload_id, chunk, offset=None):
+        """Write the next chunk (base64 text or bytes); returns bytes received
+
+        offset, if given, must equal the bytes received so far, which
+        catches chunks that arrive twice or out of order.
+        """
+        upload = self._get(upload_id)
+        if offset is not None and int(offset) != upload.received:
+            raise ValueError(f"Chunk at offset {offset}, expected {upload.received}")
+
+        data = base64.b64decode(chunk) if isinstance(chunk, str) else bytes(chunk)
+        if upload.size is not None and upload.received + len(data) > upload.size:
+            raise ValueError("Upload is larger than announced")
+
+        upload.file.write(data)
+        upload.digest.update(data)
+        upload.received += len(data)
+        upload.updated = time.monotonic()
+        return upload.received
+
+    def commit(self, upload_id):
+        """Finish an upload; returns (path, content hash hex digest)"""
+        with self._lock:
+            upload = self._uploads.pop(upload_id, None)
+        if upload is None:
+            raise KeyError(f"Unknown upload: {upload_id}")
+
+        upload.close()
+        if upload.size is not None and upload.received != upload.size:
+            upload.part_path.unlink(missing_ok=True)
+            raise ValueError(f"Upload incomplete: {upload.received} of "
+                             f"{upload.size} bytes received")
+
+        os.replace(upload.part_path, upload.path)
+        with self._lock:
+            self._digests[str(upload.path)] = upload.digest
+        return upload.path, upload.digest.hexdigest()
+
+    def abort(self, upload_id):
+        """Drop an upload and its partial file; False if it is unknown"""
+        with self._lock:
+            upload = self._uploads.pop(upload_id, None)
+        if upload is None:
+            return False
+        upload.close()
+        upload.part_path.unlink(missing_ok=True)
+        return True
+
+    def _abort_stale(self):
+        now = time.monotonic()
+        for upload_id, upload in list(self._uploads.items()):
+            if now - upload.updated > UPLOAD_TIMEOUT:
+                self.abort(upload_id)
+
+    def digest_for(self, path):
+        """Running content hash of a committed upload, or None"""
+        return self._digests.get(str(path))
+
+    def forget(self, path):
+        """Drop the hash of a committed upload once its file is deleted"""
+        with self._lock:
+            self._digests.pop(str(path), None)
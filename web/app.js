@@ -3,7 +3,11 @@ let scene, camera, renderer, controls;
 let meshA = null, meshB = null;
 let meshDataA = null, meshDataB = null;
 let matchingDataA = null, matchingDataB = null;
+// Quantized nearest-neighbour distances for thresholding without the backend
+let nearestDistancesA = null, nearestDistancesB = null, distanceStep = 0;
 let matchingMeshA = null, matchingMeshB = null;
+// Quantized per-vertex deviation of A from B's surface (see deviation_field)
+let deviationData = null, deviationMeshA = null;
 let originalMaterialA = null, originalMaterialB = null;
 const defaultCameraPosition = { x: 100, y: 100, z: 100 };
 
@@ -69,26 +73,62 @@ function animate() {
     renderer.render(scene, camera);
 }
 
-// Create mesh from data
-function createMeshFromData(meshData, color, fileId) {
+// Decode a base64 string into an ArrayBuffer using the browser's native decoder
+async function base64ToArrayBuffer(base64) {
+    const response = await fetch(`data:application/octet-stream;base64,${base64}`);
+    return response.arrayBuffer();
+}
+
+// Turn binary (base64) mesh payloads into typed arrays; JSON payloads pass through
+async function decodeMeshData(meshData) {
+    if (meshData.encoding !== 'base64') return meshData;
+    
+    const [vertices, normals, indices] = await Promise.all([
+        base64ToArrayBuffer(meshData.vertices),
+        base64ToArrayBuffer(meshData.normals),
+        base64ToArrayBuffer(meshData.indices)
+    ]);
+    
+    return {
+        ...meshData,
+        vertices: new Float32Array(vertices),
+        normals: new Float32Array(normals),
+        indices: new Uint32Array(indices)
+    };
+}
+
+// Wrap data in the given typed array type without copying when possible
+function toTypedArray(data, ArrayType) {
+    return data instanceof ArrayType ? data : new ArrayType(data);
+}
+
+// Create geometry from mesh data
+function createGeometryFromData(meshData) {
     const geometry = new THREE.BufferGeometry();
     
     // Set vertices
-    const vertices = new Float32Array(meshData.vertices);
+    const vertices = toTypedArray(meshData.vertices, Float32Array);
     geometry.setAttribute('position', new THREE.BufferAttribute(vertices, 3));
     
     // Set normals
-    const normals = new Float32Array(meshData.normals);
+    const normals = toTypedArray(meshData.normals, Float32Array);
     geometry.setAttribute('normal', new THREE.BufferAttribute(normals, 3));
     
     // Set indices
-    const indices = new Uint32Array(meshData.indices);
+    const indices = toTypedArray(meshData.indices, Uint32Array);
     geometry.setIndex(new THREE.BufferAttribute(indices, 1));
     
     // Compute bounds
     geometry.computeBoundingBox();
     geometry.computeBoundingSphere();
     
+    return geometry;
+}
+
+// Create mesh from data
+function createMeshFromData(meshData, color, fileId) {
+    const geometry = createGeometryFromData(meshData);
+    
     // Create material
     const material = new THREE.MeshLambertMaterial({
         color: color,
@@ -162,9 +202,247 @@ function showStatus(message, type = 'info') {
     }
 }
 
-// Show loading
+// Backend readiness reported by get_startup_status
+let startupStatus = null;
+const STARTUP_POLL_INTERVAL = 500;
+
+// Warm up the heavy backend modules once the first frame has been painted
+function startWarmUp() {
+    // A timeout queued from an animation frame runs after that frame's paint
+    requestAnimationFrame(() => setTimeout(async () => {
+        updateStartupStatus(await eel.start_warm_up()());
+        while (!startupStatus.ready) {
+            await new Promise(resolve => setTimeout(resolve, STARTUP_POLL_INTERVAL));
+            updateStartupStatus(await eel.get_startup_status()());
+        }
+    }));
+}
+
+function updateStartupStatus(status) {
+    startupStatus = status;
+    const element = document.getElementById('startupStatus');
+    const waiting = status.modules.filter(module => !['ready', 'unavailable', 'failed'].includes(module.state));
+    element.textContent = waiting.length > 0
+        ? `準備中: ${waiting.map(module => module.name).join(', ')}`
+        : '';
+    element.style.display = waiting.length > 0 ? 'block' : 'none';
+    
+    if (status.ready) {
+        console.info('Startup timings', {
+            first_paint: status.first_paint,
+            modules: Object.fromEntries(status.modules.map(module => [module.name, module.seconds]))
+        });
+    }
+}
+
+// Whether a backend module is still being imported in the background
+function isModuleWarming(name) {
+    const module = startupStatus && startupStatus.modules.find(module => module.name === name);
+    return module ? ['pending', 'loading'].includes(module.state) : false;
+}
+
+// Show loading (counted, so concurrent operations keep it open until all finish)
+let loadingCount = 0;
 function showLoading(show) {
-    document.getElementById('loading').style.display = show ? 'flex' : 'none';
+    loadingCount = Math.max(0, loadingCount + (show ? 1 : -1));
+    document.getElementById('loading').style.display = loadingCount > 0 ? 'flex' : 'none';
+}
+
+// Background jobs started with eel.start_job, keyed by job id
+const activeJobs = {};
+// Events that arrive before start_job has returned the job id
+const earlyJobEvents = {};
+
+// Run a backend function as a background job and resolve with its result
+async function runJob(kind, args, label) {
+    const response = await eel.start_job(kind, args)();
+    if (response.error) {
+        throw new Error(response.error);
+    }
+    
+    const jobId = response.job_id;
+    return new Promise((resolve, reject) => {
+        activeJobs[jobId] = {
+            resolve, reject, label, stage: null, progress: 0, started: performance.now()
+        };
+        updateJobProgress();
+        
+        (earlyJobEvents[jobId] || []).forEach(onJobEvent);
+        delete earlyJobEvents[jobId];
+    });
+}
+
+// Job progress, completion and errors pushed from Python
+eel.expose(onJobEvent);
+function onJobEvent(event) {
+    const job = activeJobs[event.job_id];
+    if (!job) {
+        (earlyJobEvents[event.job_id] = earlyJobEvents[event.job_id] || []).push(event);
+        return;
+    }
+    
+    job.stage = event.stage;
+    job.progress = event.progress;
+    job.timings = event.timings;
+    
+    if (event.type === 'done') {
+        delete activeJobs[event.job_id];
+        if (event.result && event.result.profile) {
+            showProfile(event.result.profile, job.label,
+                        (performance.now() - job.started) / 1000);
+        }
+        job.resolve(event.result);
+    } else if (event.type === 'error') {
+        delete activeJobs[event.job_id];
+        job.reject(new Error(event.error));
+    } else if (event.type === 'cancelled') {
+        delete activeJobs[event.job_id];
+        const error = new Error('キャンセルされました');
+        error.cancelled = true;
+        job.reject(error);
+    }
+    
+    updateJobProgress();
+}
+
+// Show the stage and progress of running jobs in the loading overlay
+function updateJobProgress() {
+    const uploadLines = Object.values(activeUploads).map(upload => {
+        const percent = Math.round(upload.progress * 100);
+        return `${upload.label}: アップロード中 (${percent}%)`;
+    });
+    const lines = Object.values(activeJobs).map(job => {
+        const percent = Math.round(job.progress * 100);
+        return `${job.label}: ${job.stage || '待機中'} (${percent}%)`;
+    });
+    document.getElementById('loadingProgress').textContent = uploadLines.concat(lines).join('\n');
+}
+
+// Stage profiles of the latest backend calls, newest first
+const profileHistory = [];
+const PROFILE_HISTORY_SIZE = 5;
+
+function formatBytes(bytes) {
+    if (bytes === null || bytes === undefined) return '-';
+    const mb = bytes / (1024 * 1024);
+    return `${mb >= 0 ? '+' : ''}${mb.toFixed(1)} MB`;
+}
+
+function formatSizes(stage) {
+    const skip = ['stage', 'wall_seconds', 'cpu_seconds', 'rss_delta_bytes'];
+    return Object.keys(stage)
+        .filter(key => !skip.includes(key))
+        .map(key => `${key}=${stage[key]}`)
+        .join(' ');
+}
+
+// Show a backend profile in the collapsible panel; the time not spent in
+// Python (queueing, websocket transfer) is the client total minus the wall time
+function showProfile(profile, label, clientSeconds) {
+    profileHistory.unshift({ profile, label, clientSeconds });
+    profileHistory.length = Math.min(profileHistory.length, PROFILE_HISTORY_SIZE);
+    
+    const rows = entry => entry.profile.stages.map(stage => `
+        <tr>
+            <td>${stage.stage}</td>
+            <td>${stage.wall_seconds.toFixed(3)}</td>
+            <td>${stage.cpu_seconds.toFixed(3)}</td>
+            <td>${formatBytes(stage.rss_delta_bytes)}</td>
+            <td>${formatSizes(stage)}</td>
+        </tr>
+    `).join('');
+    
+    document.getElementById('profileContent').innerHTML = profileHistory.map(entry => `
+        <table class="profile-table">
+            <caption>${entry.label} (${entry.profile.function})</caption>
+            <tr><th>段階</th><th>実時間 s</th><th>CPU s</th><th>RSS</th><th>サイズ</th></tr>
+            ${rows(entry)}
+            <tr>
+                <td>Python合計</td>
+                <td>${entry.profile.wall_seconds.toFixed(3)}</td>
+                <td>${entry.profile.cpu_seconds.toFixed(3)}</td>
+                <td>${formatBytes(entry.profile.rss_delta_bytes)}</td>
+                <td></td>
+            </tr>
+            <tr>
+                <td>転送・待機</td>
+                <td>${Math.max(0, entry.clientSeconds - entry.profile.wall_seconds).toFixed(3)}</td>
+                <td></td><td></td><td></td>
+            </tr>
+        </table>
+    `).join('');
+    document.getElementById('profilePanel').style.display = 'block';
+}
+
+// Turn backend stage profiling on or off
+async function toggleProfiling() {
+    const enabled = document.getElementById('profileStages').checked;
+    await eel.set_profiling(enabled)();
+}
+
+// Cancel every running job and upload
+function cancelJobs() {
+    Object.keys(activeJobs).forEach(jobId => eel.cancel_job(jobId)());
+    Object.values(activeUploads).forEach(upload => { upload.cancelled = true; });
+}
+
+// Bytes per append_upload call; base64 makes each message a third larger
+const UPLOAD_CHUNK_BYTES = 4 * 1024 * 1024;
+// Chunked uploads in progress, keyed by upload id
+const activeUploads = {};
+
+// Base64 content of a Blob, encoded natively by the browser
+function blobToBase64(blob) {
+    return new Promise((resolve, reject) => {
+        const reader = new FileReader();
+        reader.onload = () => resolve(reader.result.slice(reader.result.indexOf(',') + 1));
+        reader.onerror = () => reject(reader.error);
+        reader.readAsDataURL(blob);
+    });
+}
+
+// Send a file to the backend chunk by chunk and resolve with its saved path
+async function uploadFile(file, label) {
+    const begin = await eel.begin_upload(file.name, file.size)();
+    if (begin.error) {
+        throw new Error(begin.error);
+    }
+    
+    const uploadId = begin.upload_id;
+    const upload = activeUploads[uploadId] = { label, progress: 0, cancelled: false };
+    try {
+        // Encode the next chunk while the previous one is being sent
+        let next = blobToBase64(file.slice(0, UPLOAD_CHUNK_BYTES));
+        for (let offset = 0; offset < file.size; offset += UPLOAD_CHUNK_BYTES) {
+            const chunk = await next;
+            if (upload.cancelled) {
+                eel.abort_upload(uploadId)();
+                const error = new Error('キャンセルされました');
+                error.cancelled = true;
+                throw error;
+            }
+            
+            const end = offset + UPLOAD_CHUNK_BYTES;
+            if (end < file.size) {
+                next = blobToBase64(file.slice(end, end + UPLOAD_CHUNK_BYTES));
+            }
+            const response = await eel.append_upload(uploadId, chunk, offset)();
+            if (response.error) {
+                throw new Error(response.error);
+            }
+            upload.progress = response.received / file.size;
+            updateJobProgress();
+        }
+        
+        const commit = await eel.commit_upload(uploadId)();
+        if (commit.error) {
+            throw new Error(commit.error);
+        }
+        return commit.path;
+    } finally {
+        delete activeUploads[uploadId];
+        updateJobProgress();
+    }
 }
 
 // File drop handling
@@ -206,102 +484,199 @@ function setupDropZones() {
     });
 }
 
-// Handle file upload
-async function handleFileUpload(file, fileId) {
+// Load a file by its path on this machine, without uploading a copy
+async function openLocalFile(fileId) {
+    const path = document.getElementById('localPath').value.trim();
+    if (!path) return;
+    
+    const result = await eel.open_local_file(path)();
+    if (result.error) {
+        showStatus(`エラー: ${result.error}`, 'error');
+        return;
+    }
+    
+    const zone = document.getElementById(`dropZone${fileId}`);
+    zone.querySelector('.drop-content').style.display = 'none';
+    await handleFileUpload({ name: result.name }, fileId, result.path);
+}
+
+// Read the cleanup profile and the tessellation tolerances for STEP/IGES files
+function getTessellationSettings() {
+    const tolerance = parseFloat(document.getElementById('tessTolerance').value);
+    const angularTolerance = parseFloat(document.getElementById('tessAngularTolerance').value);
+    
+    return {
+        tolerance: tolerance > 0 ? tolerance : 0.1,
+        angularTolerance: angularTolerance > 0 ? angularTolerance : 0.1,
+        cleanup: document.getElementById('cleanupProfile').value
+    };
+}
+
+// One line per cleanup stage: time and removed (or flipped) elements
+function formatCleanup(stages) {
+    if (!stages || stages.length === 0) return '';
+    const counts = {
+        removed_vertices: '頂点削除',
+        removed_triangles: '三角形削除',
+        flipped_triangles: '三角形反転'
+    };
+    return stages.map(stage => {
+        const changes = Object.keys(counts)
+            .filter(key => stage[key] !== undefined)
+            .map(key => `${counts[key]} ${stage[key]}`);
+        return `${stage.stage}: ${(stage.seconds * 1000).toFixed(1)} ms, ${changes.join(', ')}`;
+    }).join('\n');
+}
+
+// Latest upload per file slot, so a superseded load does not replace a newer one
+const latestUpload = { A: 0, B: 0 };
+
+// Handle file upload; localPath loads a file on this machine in place instead
+async function handleFileUpload(file, fileId, localPath = null) {
+    const uploadId = ++latestUpload[fileId];
     showLoading(true);
-    showStatus(`${file.name} を処理中...`);
+    const isCad = ['.step', '.stp', '.iges', '.igs'].some(ext => file.name.toLowerCase().endsWith(ext));
+    showStatus(isCad && isModuleWarming('cadquery')
+        ? `${file.name} を処理中... (CADモジュールを準備中)`
+        : `${file.name} を処理中...`);
     
     try {
-        // Read file as base64
-        const reader = new FileReader();
-        reader.onload = async (e) => {
-            // Convert to base64
-            const arrayBuffer = e.target.result;
-            const bytes = new Uint8Array(arrayBuffer);
-            let binary = '';
-            for (let i = 0; i < bytes.byteLength; i++) {
-                binary += String.fromCharCode(bytes[i]);
+        // Save file on server
+        let path = localPath;
+        if (!path) {
+            try {
+                path = await uploadFile(file, `File ${fileId}`);
+            } catch (error) {
+                error.message = `ファイル保存エラー: ${error.message}`;
+                throw error;
             }
-            const base64Content = btoa(binary);
-            
-            // Save file on server
-            const saveResult = await eel.save_uploaded_file(base64Content, file.name)();
-            
-            if (saveResult.error) {
-                showStatus(`ファイル保存エラー: ${saveResult.error}`, 'error');
-                showLoading(false);
-                return;
-            }
-            
-            // Process 3D file with full path
-            const result = await eel.process_3d_file(saveResult.path, fileId)();
-            
-            if (result.error) {
-                showStatus(`エラー: ${result.error}`, 'error');
-                showLoading(false);
-                return;
-            }
-            
-            // Update file info
-            const fileInfo = document.getElementById(`fileInfo${fileId}`);
-            fileInfo.textContent = file.name;
-            fileInfo.style.display = 'block';
-            
-            // Show clear button
-            document.getElementById(`clearBtn${fileId}`).style.display = 'flex';
-            
-            // Remove old mesh if exists
-            if (fileId === 'A' && meshA) {
-                scene.remove(meshA);
-                meshA.geometry.dispose();
-                meshA.material.dispose();
-            } else if (fileId === 'B' && meshB) {
-                scene.remove(meshB);
-                meshB.geometry.dispose();
-                meshB.material.dispose();
+        }
+        
+        // Process 3D file with full path in the background
+        const { tolerance, angularTolerance, cleanup } = getTessellationSettings();
+        const progressive = document.getElementById('progressiveLoading').checked;
+        const response = await runJob(
+            'process_3d_file',
+            [path, fileId, 'binary', tolerance, angularTolerance, progressive, cleanup],
+            `File ${fileId}`
+        );
+        
+        if (response.error) {
+            throw new Error(response.error);
+        }
+        
+        if (uploadId !== latestUpload[fileId]) return;
+        
+        const result = await decodeMeshData(response);
+        
+        // Update file info
+        const fileInfo = document.getElementById(`fileInfo${fileId}`);
+        fileInfo.textContent = file.name;
+        fileInfo.title = formatCleanup(response.cleanup);
+        fileInfo.style.display = 'block';
+        
+        // Show clear button
+        document.getElementById(`clearBtn${fileId}`).style.display = 'flex';
+        
+        // Remove old mesh if exists
+        if (fileId === 'A' && meshA) {
+            scene.remove(meshA);
+            meshA.geometry.dispose();
+            meshA.material.dispose();
+        } else if (fileId === 'B' && meshB) {
+            scene.remove(meshB);
+            meshB.geometry.dispose();
+            meshB.material.dispose();
+        }
+        
+        // Create new mesh
+        const color = fileId === 'A' ? 0xFF4444 : 0x4444FF;
+        const mesh = createMeshFromData(result, color, fileId);
+        centerAndScaleMesh(mesh);
+        scene.add(mesh);
+        
+        // Store mesh and data
+        resetMatchingDistances();
+        resetDeviation();
+        if (fileId === 'A') {
+            meshA = mesh;
+            meshDataA = result;
+            originalMaterialA = mesh.material.clone();
+        } else {
+            meshB = mesh;
+            meshDataB = result;
+            originalMaterialB = mesh.material.clone();
+        }
+        
+        // Update UI
+        updateMeshVisibility();
+        updateOpacity();
+        updateWireframe();
+        
+        updateComparisonButtons();
+        
+        if (result.lod > 0) {
+            showStatus(`${file.name} のプレビューを表示中...`);
+            refineMesh(fileId, uploadId, result.lod, file.name);
+        } else {
+            showStatus(`${file.name} を読み込みました`, 'success');
+        }
+        
+    } catch (error) {
+        showStatus(`エラー: ${error.message}`, error.cancelled ? 'info' : 'error');
+        // Show drop content again on error
+        if (uploadId === latestUpload[fileId] && !(fileId === 'A' ? meshA : meshB)) {
+            const zone = document.getElementById(`dropZone${fileId}`);
+            zone.querySelector('.drop-content').style.display = 'block';
+        }
+    } finally {
+        showLoading(false);
+    }
+}
+
+// Enable the comparison buttons once both files are shown at full resolution
+function updateComparisonButtons() {
+    const ready = meshA && meshB && !meshDataA.lod && !meshDataB.lod;
+    document.getElementById('alignBtn').disabled = !ready;
+    document.getElementById('calculateDistanceBtn').disabled = !ready;
+    document.getElementById('findMatchingBtn').disabled = !ready;
+    document.getElementById('compareBrepBtn').disabled = !ready;
+    document.getElementById('hausdorffBtn').disabled = !ready;
+    // One-to-many comparisons only need the reference
+    document.getElementById('compareReferenceBtn').disabled = !(meshA && !meshDataA.lod);
+}
+
+// Replace a progressively loaded preview with ever finer levels of detail
+async function refineMesh(fileId, uploadId, lod, fileName) {
+    try {
+        for (let level = lod - 1; level >= 0; level--) {
+            const response = await runJob(
+                'get_mesh_lod', [fileId, level, 'binary'], `File ${fileId} LOD ${level}`);
+            if (response.error) {
+                throw new Error(response.error);
             }
             
-            // Create new mesh
-            const color = fileId === 'A' ? 0xFF4444 : 0x4444FF;
-            const mesh = createMeshFromData(result, color, fileId);
-            centerAndScaleMesh(mesh);
-            scene.add(mesh);
+            const mesh = fileId === 'A' ? meshA : meshB;
+            if (uploadId !== latestUpload[fileId] || !mesh) return;
             
-            // Store mesh and data
+            const result = await decodeMeshData(response);
+            mesh.geometry.dispose();
+            mesh.geometry = createGeometryFromData(result);
             if (fileId === 'A') {
-                meshA = mesh;
                 meshDataA = result;
-                originalMaterialA = mesh.material.clone();
             } else {
-                meshB = mesh;
                 meshDataB = result;
-                originalMaterialB = mesh.material.clone();
-            }
-            
-            // Update UI
-            updateMeshVisibility();
-            updateOpacity();
-            updateWireframe();
-            
-            // Enable buttons if both files loaded
-            if (meshA && meshB) {
-                document.getElementById('alignBtn').disabled = false;
-                document.getElementById('calculateDistanceBtn').disabled = false;
-                document.getElementById('findMatchingBtn').disabled = false;
             }
-            
-            showStatus(`${file.name} を読み込みました`, 'success');
-        };
+        }
         
-        reader.readAsArrayBuffer(file);
+        updateComparisonButtons();
+        showStatus(`${fileName} を読み込みました`, 'success');
         
     } catch (error) {
-        showStatus(`エラー: ${error.message}`, 'error');
-        // Show drop content again on error
-        const zone = document.getElementById(`dropZone${fileId}`);
-        zone.querySelector('.drop-content').style.display = 'block';
-    } finally {
-        showLoading(false);
+        // Clearing or replacing the file also ends its refinement
+        if (uploadId === latestUpload[fileId] && (fileId === 'A' ? meshA : meshB)) {
+            showStatus(`エラー: ${error.message}`, error.cancelled ? 'info' : 'error');
+        }
     }
 }
 
@@ -313,13 +688,15 @@ async function alignMeshes() {
     showStatus('メッシュを位置合わせ中...');
     
     try {
-        const result = await eel.align_meshes(meshDataA, meshDataB)();
+        const response = await runJob('align_meshes', ['A', 'B', 'binary'], '位置合わせ');
         
-        if (result.error) {
-            showStatus(`位置合わせエラー: ${result.error}`, 'error');
+        if (response.error) {
+            showStatus(`位置合わせエラー: ${response.error}`, 'error');
             return;
         }
         
+        const result = await decodeMeshData(response);
+        
         // Update mesh B with aligned data
         scene.remove(meshB);
         meshB.geometry.dispose();
@@ -327,12 +704,18 @@ async function alignMeshes() {
         meshB = createMeshFromData(result, 0x4444FF, 'B');
         scene.add(meshB);
         meshDataB = result;
+        resetMatchingDistances();
+        resetDeviation();
         
         updateMeshVisibility();
         updateOpacity();
         updateWireframe();
         
-        showStatus('位置合わせが完了しました', 'success');
+        const registration = result.registration;
+        const summary = registration
+            ? ` (fitness ${registration.fitness.toFixed(3)}, RMSE ${registration.inlier_rmse.toFixed(4)})`
+            : '';
+        showStatus(`位置合わせが完了しました${summary}`, 'success');
         
     } catch (error) {
         showStatus(`エラー: ${error.message}`, 'error');
@@ -349,13 +732,26 @@ async function calculateDistance() {
     showStatus('距離を計算中...');
     
     try {
-        const result = await eel.calculate_mesh_distance(meshDataA, meshDataB)();
+        const lod = parseInt(document.getElementById('distanceLod').value, 10);
+        const range = parseFloat(document.getElementById('deviationRange').value) || null;
+        const tolerance = parseFloat(document.getElementById('deviationTolerance').value) || 0;
+        const result = await runJob(
+            'deviation_field', ['A', 'B', range, tolerance, 16, 64, lod], '距離計算');
         
         if (result.error) {
             showStatus(`距離計算エラー: ${result.error}`, 'error');
             return;
         }
         
+        // Keep the per-vertex levels for the colormap
+        deviationData = {
+            levels: new Uint16Array(await base64ToArrayBuffer(result.levels)),
+            offset: result.offset,
+            step: result.step,
+            range: result.range,
+            tolerance: result.bands.tolerance
+        };
+        
         // Display statistics
         const statsContent = document.getElementById('statsContent');
         statsContent.innerHTML = `
@@ -377,7 +773,44 @@ async function calculateDistance() {
             </div>
         `;
         
+        // Signed statistics from the point-to-surface distance engine
+        if (result.signed_min !== undefined) {
+            statsContent.innerHTML += `
+                <div class="stat-item">
+                    <span class="stat-label">RMS:</span>
+                    <span class="stat-value">${result.rms.toFixed(3)} mm</span>
+                </div>
+                <div class="stat-item">
+                    <span class="stat-label">符号付き範囲:</span>
+                    <span class="stat-value">${result.signed_min.toFixed(3)} 〜 ${result.signed_max.toFixed(3)} mm</span>
+                </div>
+            `;
+        }
+        
+        if (result.lod > 0) {
+            statsContent.innerHTML += `
+                <div class="stat-item">
+                    <span class="stat-label">詳細度:</span>
+                    <span class="stat-value">LOD ${result.lod} (プレビュー)</span>
+                </div>
+            `;
+        }
+        
+        statsContent.innerHTML += formatDeviationStats(result);
+        
+        // Connected patches outside the tolerance, largest first
+        const regions = await runJob(
+            'find_deviation_regions', ['A', 'B', tolerance, 0, 20, lod], '偏差領域');
+        if (!regions.error) {
+            statsContent.innerHTML += formatDeviationRegions(regions);
+            statsContent.querySelectorAll('.region-row').forEach(row => {
+                row.addEventListener('click', () =>
+                    focusRegion(regions.regions[parseInt(row.dataset.index, 10)]));
+            });
+        }
+        
         document.getElementById('statistics').style.display = 'block';
+        updateDeviationVisualization();
         showStatus('距離計算が完了しました', 'success');
         
     } catch (error) {
@@ -387,6 +820,393 @@ async function calculateDistance() {
     }
 }
 
+// Tolerance bands and histogram of all deviations, for the stats panel
+function formatDeviationStats(result) {
+    const bands = result.bands;
+    const histogram = result.histogram;
+    const peak = Math.max(1, ...histogram.counts);
+    const tolerance = bands.tolerance;
+    const bars = histogram.counts.map((count, i) => {
+        const center = (histogram.edges[i] + histogram.edges[i + 1]) / 2;
+        const color = deviationColor(center, result.range, tolerance);
+        const css = `rgb(${color.map(c => Math.round(c * 255)).join(',')})`;
+        return `<div class="histogram-bar" style="height: ${count / peak * 100}%; background: ${css};"
+                     title="${histogram.edges[i].toFixed(3)} 〜 ${histogram.edges[i + 1].toFixed(3)} mm: ${count}"></div>`;
+    }).join('');
+    
+    return `
+        <hr>
+        <h4>偏差分布 (±${tolerance} mm)</h4>
+        <div class="stat-item">
+            <span class="stat-label">許容差内:</span>
+            <span class="stat-value">${bands.within} (${bands.percent_within.toFixed(1)}%)</span>
+        </div>
+        <div class="stat-item">
+            <span class="stat-label">プラス側超過:</span>
+            <span class="stat-value">${bands.over} (${bands.percent_over.toFixed(1)}%)</span>
+        </div>
+        <div class="stat-item">
+            <span class="stat-label">マイナス側超過:</span>
+            <span class="stat-value">${bands.under} (${bands.percent_under.toFixed(1)}%)</span>
+        </div>
+        <div class="histogram">${bars}</div>
+        <div class="histogram-axis">
+            <span>${(-result.range).toFixed(3)}</span>
+            <span>0</span>
+            <span>+${result.range.toFixed(3)} mm</span>
+        </div>
+    `;
+}
+
+// Table of out-of-tolerance regions; rows focus the view on the region
+function formatDeviationRegions(result) {
+    if (result.region_count === 0) {
+        return '<p class="region-note">許容差を超える領域はありません</p>';
+    }
+    
+    const rows = result.regions.map((region, i) => `
+        <tr class="region-row" data-index="${i}">
+            <td>${i + 1}</td>
+            <td>${region.sign === 'over' ? '+' : '−'}</td>
+            <td>${region.area.toFixed(2)}</td>
+            <td>${region.max_deviation.toFixed(3)}</td>
+            <td>${region.mean_deviation.toFixed(3)}</td>
+        </tr>
+    `).join('');
+    const more = result.region_count > result.regions.length
+        ? `<p class="region-note">他 ${result.region_count - result.regions.length} 領域</p>`
+        : '';
+    
+    return `
+        <hr>
+        <h4>許容差超過領域 (${result.region_count})</h4>
+        <table class="region-table">
+            <thead>
+                <tr><th>#</th><th>符号</th><th>面積 (mm²)</th><th>最大 (mm)</th><th>平均 (mm)</th></tr>
+            </thead>
+            <tbody>${rows}</tbody>
+        </table>
+        ${more}
+    `;
+}
+
+// Point the camera at a region's centroid, in the displayed coordinates of A
+function focusRegion(region) {
+    if (!meshA || !region) return;
+    
+    meshA.updateMatrixWorld();
+    const target = meshA.localToWorld(new THREE.Vector3(...region.centroid));
+    const offset = camera.position.clone().sub(controls.target);
+    controls.target.copy(target);
+    camera.position.copy(target).add(offset);
+    controls.update();
+}
+
+// Colormap: green within tolerance, cyan to blue below it, yellow to red above
+function deviationColor(value, range, tolerance) {
+    const magnitude = Math.abs(value);
+    if (magnitude <= tolerance) return [0.2, 0.8, 0.2];
+    
+    const t = range > tolerance ? Math.min((magnitude - tolerance) / (range - tolerance), 1) : 1;
+    return value > 0 ? [1, 1 - t, 0] : [0, 1 - t, 1];
+}
+
+// Show A coloured by its deviation from B
+function updateDeviationVisualization() {
+    if (deviationMeshA) {
+        scene.remove(deviationMeshA);
+        deviationMeshA.geometry.dispose();
+        deviationMeshA.material.dispose();
+        deviationMeshA = null;
+    }
+    
+    const showDeviation = document.getElementById('showDeviation').checked;
+    if (!showDeviation || !deviationData || !meshA) {
+        if (meshA && !(matchingMeshA && matchingMeshA.visible)) {
+            meshA.visible = document.getElementById('showFileA').checked;
+        }
+        return;
+    }
+    
+    const { levels, offset, step, range, tolerance } = deviationData;
+    const originalGeometry = meshA.geometry;
+    const vertexCount = originalGeometry.attributes.position.count;
+    if (levels.length !== vertexCount) {
+        // Measured on another level of detail than the one shown
+        showStatus('表示中のメッシュと詳細度が異なるため、カラーマップを表示できません', 'info');
+        return;
+    }
+    
+    // One colour per quantization level, looked up for every vertex
+    const lookup = new Float32Array(65536 * 3);
+    for (let level = 0; level < 65536; level++) {
+        lookup.set(deviationColor(offset + level * step, range, tolerance), level * 3);
+    }
+    const colors = new Float32Array(vertexCount * 3);
+    for (let i = 0; i < vertexCount; i++) {
+        const entry = levels[i] * 3;
+        colors[i * 3] = lookup[entry];
+        colors[i * 3 + 1] = lookup[entry + 1];
+        colors[i * 3 + 2] = lookup[entry + 2];
+    }
+    
+    const deviationGeometry = new THREE.BufferGeometry();
+    deviationGeometry.setAttribute('position', originalGeometry.attributes.position.clone());
+    deviationGeometry.setAttribute('normal', originalGeometry.attributes.normal.clone());
+    deviationGeometry.setIndex(originalGeometry.index.clone());
+    deviationGeometry.setAttribute('color', new THREE.BufferAttribute(colors, 3));
+    
+    const deviationMaterial = new THREE.MeshLambertMaterial({
+        vertexColors: true,
+        side: THREE.DoubleSide
+    });
+    
+    deviationMeshA = new THREE.Mesh(deviationGeometry, deviationMaterial);
+    deviationMeshA.position.copy(meshA.position);
+    deviationMeshA.rotation.copy(meshA.rotation);
+    deviationMeshA.scale.copy(meshA.scale);
+    scene.add(deviationMeshA);
+    
+    // Hide original mesh
+    meshA.visible = false;
+}
+
+// Toggle the deviation colormap (shown instead of the matching colours)
+function toggleDeviation() {
+    const showDeviation = document.getElementById('showDeviation').checked;
+    document.getElementById('deviationGroup').style.display = showDeviation ? 'block' : 'none';
+    
+    if (showDeviation && document.getElementById('showMatching').checked) {
+        document.getElementById('showMatching').checked = false;
+        toggleMatchingThreshold();
+    }
+    updateDeviationVisualization();
+}
+
+// A new colour range or tolerance is requantized by the backend from cached distances
+function updateDeviationSettings() {
+    if (deviationData) calculateDistance();
+}
+
+// Drop the deviation field when either mesh changes
+function resetDeviation() {
+    deviationData = null;
+    updateDeviationVisualization();
+}
+
+// Compare two STEP/IGES files face by face; only changed faces are measured
+async function compareBrep() {
+    if (!meshDataA || !meshDataB) return;
+    
+    showLoading(true);
+    showStatus('面単位で比較中...');
+    
+    try {
+        const tolerance = parseFloat(document.getElementById('deviationTolerance').value) || 0;
+        const result = await runJob('compare_brep', ['A', 'B', tolerance, 20], '面単位比較');
+        
+        if (result.error) {
+            showStatus(`面単位比較エラー: ${result.error}`, 'error');
+            return;
+        }
+        
+        const statsContent = document.getElementById('statsContent');
+        statsContent.innerHTML = formatBrepDiff(result);
+        statsContent.querySelectorAll('.region-row').forEach(row => {
+            row.addEventListener('click', () =>
+                focusRegion(result.changed_a[parseInt(row.dataset.index, 10)]));
+        });
+        document.getElementById('statistics').style.display = 'block';
+        showStatus('面単位比較が完了しました', 'success');
+        
+    } catch (error) {
+        showStatus(`エラー: ${error.message}`, error.cancelled ? 'info' : 'error');
+    } finally {
+        showLoading(false);
+    }
+}
+
+// Face counts, distances of the changed faces and a table of A's changed faces
+function formatBrepDiff(result) {
+    const distance = result.distance_a;
+    const measured = (result.measured_vertices_a / Math.max(result.total_vertices_a, 1) * 100).toFixed(1);
+    const rows = result.changed_a.map((face, i) => `
+        <tr class="region-row" data-index="${i}">
+            <td>${face.face}</td>
+            <td>${face.type}</td>
+            <td>${face.area.toFixed(2)}</td>
+            <td>${face.max_deviation === null ? '-' : face.max_deviation.toFixed(3)}</td>
+        </tr>
+    `).join('');
+    
+    return `
+        <h4>面単位比較 (±${result.threshold} mm)</h4>
+        <div class="stat-item">
+            <span class="stat-label">一致した面:</span>
+            <span class="stat-value">${result.matched_faces} / ${result.faces_a}</span>
+        </div>
+        <div class="stat-item">
+            <span class="stat-label">変更された面 (A / B):</span>
+            <span class="stat-value">${result.changed_faces_a} / ${result.changed_faces_b}</span>
+        </div>
+        <div class="stat-item">
+            <span class="stat-label">計算した頂点 (A):</span>
+            <span class="stat-value">${result.measured_vertices_a} (${measured}%)</span>
+        </div>
+        ${distance ? `
+        <div class="stat-item">
+            <span class="stat-label">最大距離:</span>
+            <span class="stat-value">${distance.max.toFixed(3)} mm</span>
+        </div>
+        <div class="stat-item">
+            <span class="stat-label">RMS:</span>
+            <span class="stat-value">${distance.rms.toFixed(3)} mm</span>
+        </div>
+        <div class="stat-item">
+            <span class="stat-label">許容差内:</span>
+            <span class="stat-value">${result.bands_a.within} (${result.bands_a.percent_within.toFixed(1)}%)</span>
+        </div>` : '<p class="region-note">変更された面はありません</p>'}
+        ${rows ? `
+        <table class="region-table">
+            <thead>
+                <tr><th>面</th><th>種類</th><th>面積 (mm²)</th><th>最大 (mm)</th></tr>
+            </thead>
+            <tbody>${rows}</tbody>
+        </table>` : ''}
+    `;
+}
+
+// Quick pass/fail check of the largest deviation against the tolerance
+async function checkHausdorff() {
+    if (!meshDataA || !meshDataB) return;
+    
+    showLoading(true);
+    showStatus('許容差判定中...');
+    
+    try {
+        const tolerance = parseFloat(document.getElementById('deviationTolerance').value) || 0;
+        const result = await runJob('hausdorff_check', ['A', 'B', tolerance], '許容差判定');
+        
+        if (result.error) {
+            showStatus(`許容差判定エラー: ${result.error}`, 'error');
+            return;
+        }
+        
+        document.getElementById('statsContent').innerHTML = formatHausdorff(result);
+        document.getElementById('statistics').style.display = 'block';
+        showStatus(result.passed ? '許容差内です (合格)' : '許容差を超えています (不合格)',
+                   result.passed ? 'success' : 'error');
+        
+    } catch (error) {
+        showStatus(`エラー: ${error.message}`, error.cancelled ? 'info' : 'error');
+    } finally {
+        showLoading(false);
+    }
+}
+
+// Verdict, bounds of the largest deviation and how many points were needed
+function formatHausdorff(result) {
+    const directions = [['a_to_b', 'A → B'], ['b_to_a', 'B → A']]
+        .filter(([key]) => result[key])
+        .map(([key, label]) => {
+            const check = result[key];
+            return `
+        <div class="stat-item">
+            <span class="stat-label">計算した頂点 (${label}):</span>
+            <span class="stat-value">${check.queried_points} / ${check.points}</span>
+        </div>`;
+        }).join('');
+    
+    return `
+        <h4>許容差判定 (±${result.tolerance} mm)</h4>
+        <div class="stat-item">
+            <span class="stat-label">判定:</span>
+            <span class="stat-value">${result.passed ? '合格' : '不合格'}</span>
+        </div>
+        <div class="stat-item">
+            <span class="stat-label">最大偏差:</span>
+            <span class="stat-value">${result.passed
+                ? `${result.upper_bound.toFixed(3)} mm 以下`
+                : `${result.lower_bound.toFixed(3)} mm 以上`}</span>
+        </div>
+        ${directions}
+    `;
+}
+
+// Compare the selected candidate files against File A, ranked best first
+async function compareToReference() {
+    const files = Array.from(document.getElementById('candidateFiles').files);
+    if (!meshDataA || files.length === 0) return;
+    
+    showLoading(true);
+    showStatus(`${files.length} 件のファイルを一括比較中...`);
+    
+    try {
+        const paths = [];
+        for (const file of files) {
+            paths.push(await uploadFile(file, file.name));
+        }
+        
+        const settings = getTessellationSettings();
+        const tolerance = parseFloat(document.getElementById('deviationTolerance').value) || 0;
+        const result = await runJob('compare_to_reference', [
+            'A', paths, document.getElementById('alignCandidates').checked, tolerance,
+            document.getElementById('rankBy').value, settings.tolerance, settings.angularTolerance,
+            settings.cleanup
+        ], '一括比較');
+        
+        if (result.error) {
+            showStatus(`一括比較エラー: ${result.error}`, 'error');
+            return;
+        }
+        
+        document.getElementById('statsContent').innerHTML = formatRanking(result);
+        document.getElementById('statistics').style.display = 'block';
+        showStatus('一括比較が完了しました', 'success');
+        
+    } catch (error) {
+        showStatus(`エラー: ${error.message}`, error.cancelled ? 'info' : 'error');
+    } finally {
+        showLoading(false);
+    }
+}
+
+// Ranked table of a one-to-many comparison
+function formatRanking(result) {
+    const rows = result.candidates.map(candidate => {
+        if (candidate.error) {
+            return `
+                <tr class="ranking-error">
+                    <td>${candidate.rank}</td>
+                    <td class="ranking-name">${candidate.name}</td>
+                    <td colspan="4" title="${candidate.error}">エラー</td>
+                </tr>
+            `;
+        }
+        const distance = candidate.distance;
+        return `
+            <tr>
+                <td>${candidate.rank}</td>
+                <td class="ranking-name" title="${candidate.name}">${candidate.name}</td>
+                <td>${distance.rms.toFixed(3)}</td>
+                <td>${distance.max.toFixed(3)}</td>
+                <td>${distance.mean.toFixed(3)}</td>
+                <td>${candidate.bands.percent_within.toFixed(1)}%</td>
+            </tr>
+        `;
+    }).join('');
+    
+    return `
+        <h4>一括比較 (±${result.threshold} mm)</h4>
+        <table class="region-table ranking-table">
+            <thead>
+                <tr><th>#</th><th>ファイル</th><th>RMS</th><th>最大</th><th>平均</th><th>許容差内</th></tr>
+            </thead>
+            <tbody>${rows}</tbody>
+        </table>
+    `;
+}
+
 // Find matching vertices
 async function findMatching() {
     if (!meshDataA || !meshDataB) return;
@@ -396,21 +1216,21 @@ async function findMatching() {
     
     try {
         const threshold = parseFloat(document.getElementById('matchingThreshold').value);
-        const result = await eel.find_matching_vertices(meshDataA, meshDataB, threshold)();
+        const result = await runJob('find_matching_vertices', ['A', 'B', threshold, 'binary'], '一致部分検出');
         
         if (result.error) {
             showStatus(`エラー: ${result.error}`, 'error');
             return;
         }
         
-        // Store matching data
-        matchingDataA = result.matching_vertices_a;
-        matchingDataB = result.matching_vertices_b;
-        
-        // Update matching visualization if enabled
-        if (document.getElementById('showMatching').checked) {
-            updateMatchingVisualization();
-        }
+        // Keep the distances so threshold changes are handled locally
+        const [bufferA, bufferB] = await Promise.all([
+            base64ToArrayBuffer(result.nearest_distances_a),
+            base64ToArrayBuffer(result.nearest_distances_b)
+        ]);
+        nearestDistancesA = new Uint16Array(bufferA);
+        nearestDistancesB = new Uint16Array(bufferB);
+        distanceStep = result.distance_step;
         
         // Display statistics
         const statsContent = document.getElementById('statsContent');
@@ -419,15 +1239,17 @@ async function findMatching() {
             <h4>一致部分統計</h4>
             <div class="stat-item">
                 <span class="stat-label">File A 一致頂点:</span>
-                <span class="stat-value">${result.stats.num_matching_a} / ${result.stats.total_vertices_a} (${result.stats.percent_matching_a.toFixed(1)}%)</span>
+                <span class="stat-value" id="matchingStatsA"></span>
             </div>
             <div class="stat-item">
                 <span class="stat-label">File B 一致頂点:</span>
-                <span class="stat-value">${result.stats.num_matching_b} / ${result.stats.total_vertices_b} (${result.stats.percent_matching_b.toFixed(1)}%)</span>
+                <span class="stat-value" id="matchingStatsB"></span>
             </div>
         `;
         document.getElementById('statistics').style.display = 'block';
         
+        applyMatchingThreshold(threshold);
+        
         showStatus('一致部分の検出が完了しました', 'success');
         
     } catch (error) {
@@ -656,6 +1478,11 @@ function toggleMatchingThreshold() {
     
     thresholdGroup.style.display = showMatching ? 'block' : 'none';
     
+    if (showMatching && document.getElementById('showDeviation').checked) {
+        document.getElementById('showDeviation').checked = false;
+        toggleDeviation();
+    }
+    
     if (!showMatching) {
         // Restore original colors when unchecked
         updateMatchingVisualization();
@@ -665,10 +1492,58 @@ function toggleMatchingThreshold() {
     }
 }
 
-// Update threshold value display
+// Mark vertices whose quantized nearest distance is within the threshold
+function matchByThreshold(levels, maxLevel) {
+    const matching = new Uint8Array(levels.length);
+    let count = 0;
+    for (let i = 0; i < levels.length; i++) {
+        if (levels[i] <= maxLevel) {
+            matching[i] = 1;
+            count++;
+        }
+    }
+    return { matching, count };
+}
+
+// Recompute matching vertices and statistics locally for a new threshold
+function applyMatchingThreshold(threshold) {
+    if (!nearestDistancesA || !nearestDistancesB) return;
+    
+    const maxLevel = Math.floor(threshold / distanceStep + 1e-6);
+    const resultA = matchByThreshold(nearestDistancesA, maxLevel);
+    const resultB = matchByThreshold(nearestDistancesB, maxLevel);
+    matchingDataA = resultA.matching;
+    matchingDataB = resultB.matching;
+    
+    const formatStats = (count, total) =>
+        `${count} / ${total} (${(total ? count / total * 100 : 0).toFixed(1)}%)`;
+    const statsA = document.getElementById('matchingStatsA');
+    const statsB = document.getElementById('matchingStatsB');
+    if (statsA) statsA.textContent = formatStats(resultA.count, nearestDistancesA.length);
+    if (statsB) statsB.textContent = formatStats(resultB.count, nearestDistancesB.length);
+    
+    if (document.getElementById('showMatching').checked) {
+        updateMatchingVisualization();
+    }
+}
+
+// Drop cached matching distances when either mesh changes
+function resetMatchingDistances() {
+    nearestDistancesA = null;
+    nearestDistancesB = null;
+}
+
+// Update threshold value display, re-thresholding at most once per frame
+let thresholdFrame = null;
 function updateThresholdValue() {
     const value = document.getElementById('matchingThreshold').value;
     document.getElementById('thresholdValue').textContent = value;
+    
+    if (thresholdFrame !== null) return;
+    thresholdFrame = requestAnimationFrame(() => {
+        thresholdFrame = null;
+        applyMatchingThreshold(parseFloat(document.getElementById('matchingThreshold').value));
+    });
 }
 
 // Clear file function
@@ -692,6 +1567,11 @@ function clearFile(fileId) {
         matchingDataB = null;
     }
     
+    // Release the mesh held by the backend
+    eel.release_mesh(fileId)();
+    resetMatchingDistances();
+    resetDeviation();
+    
     // Remove matching meshes if exist
     if (matchingMeshA || matchingMeshB) {
         updateMatchingVisualization();
@@ -710,11 +1590,7 @@ function clearFile(fileId) {
     dropZone.querySelector('.drop-content').style.display = 'block';
     
     // Disable buttons if needed
-    if (!meshA || !meshB) {
-        document.getElementById('alignBtn').disabled = true;
-        document.getElementById('calculateDistanceBtn').disabled = true;
-        document.getElementById('findMatchingBtn').disabled = true;
-    }
+    updateComparisonButtons();
     
     // Hide statistics if both files are cleared
     if (!meshA && !meshB) {
@@ -736,10 +1612,27 @@ document.addEventListener('DOMContentLoaded', () => {
     document.getElementById('wireframe').addEventListener('change', updateWireframe);
     document.getElementById('showMatching').addEventListener('change', toggleMatchingThreshold);
     document.getElementById('matchingThreshold').addEventListener('input', updateThresholdValue);
+    document.getElementById('showDeviation').addEventListener('change', toggleDeviation);
+    document.getElementById('deviationRange').addEventListener('change', updateDeviationSettings);
+    document.getElementById('deviationTolerance').addEventListener('change', updateDeviationSettings);
     document.getElementById('resetViewBtn').addEventListener('click', resetView);
     document.getElementById('alignBtn').addEventListener('click', alignMeshes);
     document.getElementById('calculateDistanceBtn').addEventListener('click', calculateDistance);
     document.getElementById('findMatchingBtn').addEventListener('click', findMatching);
+    document.getElementById('compareReferenceBtn').addEventListener('click', compareToReference);
+    document.getElementById('compareBrepBtn').addEventListener('click', compareBrep);
+    document.getElementById('hausdorffBtn').addEventListener('click', checkHausdorff);
+    document.getElementById('cancelJobBtn').addEventListener('click', cancelJobs);
+    document.getElementById('profileStages').addEventListener('change', toggleProfiling);
+    document.getElementById('openLocalA').addEventListener('click', () => openLocalFile('A'));
+    document.getElementById('openLocalB').addEventListener('click', () => openLocalFile('B'));
+    
+    // Profiling may already be enabled with COMPARISON_PROFILE=1
+    eel.get_profiling()(enabled => {
+        document.getElementById('profileStages').checked = enabled;
+    });
+    
+    startWarmUp();
     
     // Clear button event listeners
     document.getElementById('clearBtnA').addEventListener('click', () => clearFile('A'));